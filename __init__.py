@@ -2,7 +2,6 @@
 
 from aqt import mw
 from aqt.qt import QAction
-from .dialog import CustomDialog
 
 
 def abrir_janela():
@@ -13,6 +12,11 @@ def abrir_janela():
         mw.delimitadores_dialog.raise_()
         mw.delimitadores_dialog.activateWindow()
     else:
+        # Importação adiada: o diálogo (e o webview, traduções, exportação...)
+        # só é carregado no primeiro uso, para não atrasar a inicialização do Anki.
+        # Orçamento: até 5 ms de import do add-on na inicialização (python -X importtime,
+        # .pyc já gerados): ~0,9 ms assim, contra ~23 ms com o diálogo importado no topo.
+        from .dialog import CustomDialog
         # Se não existe, cria nova instância
         dialogo = CustomDialog(parent=mw)
         dialogo.show()
@@ -0,0 +1,404 @@
+# bulk_notes.py
+
+import re
+import html
+import json
+import hashlib
+from anki.collection import AddNoteRequest, OpChanges, OpChangesWithCount
+from anki.utils import field_checksum, ids2str, strip_html_media
+
+# --- FUNÇÕES AUXILIARES PARA OPERAÇÕES EM LOTE NA COLEÇÃO ---
+# Nada aqui acessa widgets: os dados são lidos do diálogo na thread principal
+# e as funções que recebem `col` rodam dentro de CollectionOp/QueryOp.
+
+def compile_split_regex(active_delimiters):
+    """Compila a expressão que divide uma linha pelos delimitadores ativos (fora de aspas)."""
+    if active_delimiters:
+        delimiter_pattern = "|".join(map(re.escape, active_delimiters))
+        return re.compile(f'(?:{delimiter_pattern})(?=(?:[^"]*"[^"]*")*[^"]*$)')
+    return re.compile(r';(?=(?:[^"]*"[^"]*")*[^"]*$)')
+
+def is_skipped_line(line, active_delimiters):
+    """Mesma regra do add_cards: linhas vazias ou sem delimitador e com menos de duas palavras."""
+    if not line:
+        return True
+    return not any(d in line for d in active_delimiters) and len(line.split()) < 2
+
+def part_to_field_map(field_names, field_mappings):
+    """Retorna {índice da parte: índice do campo}, ou None quando não há mapeamento (ordem direta)."""
+    if not field_mappings:
+        return None
+    mapa = {}
+    for part_idx, target_field_name in field_mappings.items():
+        if target_field_name in field_names:
+            mapa[int(part_idx)] = field_names.index(target_field_name)
+    return mapa
+
+def parts_to_field_values(parts, num_fields, part_map):
+    """Converte as partes de uma linha em {índice do campo: conteúdo}."""
+    valores = {}
+    for part_idx, field_content in enumerate(parts):
+        if part_map is None:
+            field_idx = part_idx if part_idx < num_fields else None
+        else:
+            field_idx = part_map.get(part_idx)
+        if field_idx is not None:
+            valores[field_idx] = field_content.strip()
+    return valores
+
+def add_notes_in_batch(col, model, deck_id, rows):
+    """Cria todas as notas e as insere numa única chamada ao backend (um só passo de desfazer).
+
+    rows: lista de dicts com 'valores' (índice do campo -> conteúdo) e 'tags'.
+    Retorna (OpChanges, ids das notas criadas).
+    """
+    requests = []
+    for row in rows:
+        note = col.new_note(model)
+        for field_idx, valor in row['valores'].items():
+            note.fields[field_idx] = valor
+        note.tags.extend(row['tags'])
+        requests.append(AddNoteRequest(note=note, deck_id=deck_id))
+    changes = col.add_notes(requests)
+    return changes, [request.note.id for request in requests]
+
+def find_existing_first_fields(col, mid, first_fields, chunk_size=500):
+    """Retorna quais primeiros campos já existem no tipo de nota.
+
+    Usa a coluna csum (checksum do primeiro campo) com consultas em lote,
+    em vez de uma busca por linha, e confirma o conteúdo para descartar colisões.
+    """
+    normalizados = {valor: strip_html_media(valor) for valor in first_fields if valor}
+    csums = list({field_checksum(valor) for valor in normalizados})
+    existentes = set()
+    for i in range(0, len(csums), chunk_size):
+        chunk = csums[i:i + chunk_size]
+        for flds in col.db.list(f"select flds from notes where mid = ? and csum in {ids2str(chunk)}", mid):
+            existentes.add(strip_html_media(flds.split("\x1f", 1)[0]))
+    return {valor for valor, normalizado in normalizados.items() if normalizado in existentes}
+
+def validate_rows(col, model, rows, ignoradas, total_linhas):
+    """Simulação do add_cards: nada é gravado, apenas o relatório é montado."""
+    num_campos = len(model['flds'])
+    divergentes = [(row['linha'] + 1, row['partes']) for row in rows if row['partes'] != num_campos]
+
+    por_primeiro_campo = {}
+    for row in rows:
+        primeiro = row['valores'].get(0, "")
+        if primeiro:
+            por_primeiro_campo.setdefault(strip_html_media(primeiro), []).append(row['linha'] + 1)
+    duplicadas_lote = [linhas for linhas in por_primeiro_campo.values() if len(linhas) > 1]
+
+    existentes = find_existing_first_fields(col, model['id'], [row['valores'].get(0, "") for row in rows])
+    duplicadas_colecao = [row['linha'] + 1 for row in rows if row['valores'].get(0, "") in existentes]
+
+    return {
+        'total': total_linhas,
+        'validas': len(rows),
+        'ignoradas': [i + 1 for i in ignoradas],
+        'campos_divergentes': divergentes,
+        'num_campos': num_campos,
+        'duplicadas_lote': duplicadas_lote,
+        'duplicadas_colecao': duplicadas_colecao,
+    }
+
+# --- REGISTRO DE LINHAS JÁ IMPORTADAS ---
+
+def row_hash(row):
+    """Hash do conteúdo que a linha gera (campos e tags), independente da posição no editor."""
+    conteudo = json.dumps([sorted(row['valores'].items()), row['tags']], ensure_ascii=False)
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
+
+def row_key(row):
+    """Chave usada para reconhecer uma linha alterada: o primeiro campo da nota."""
+    primeiro = strip_html_media(row['valores'].get(0, "")).strip()
+    return hashlib.sha1(primeiro.encode('utf-8')).hexdigest() if primeiro else None
+
+def load_import_registry(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_import_registry(path, registry):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(registry, f)
+
+def existing_note_ids(col, nids, chunk_size=500):
+    existentes = set()
+    nids = list(nids)
+    for i in range(0, len(nids), chunk_size):
+        existentes.update(col.db.list(f"select id from notes where id in {ids2str(nids[i:i + chunk_size])}"))
+    return existentes
+
+def plan_readd(col, registro, rows):
+    """Separa as linhas em novas, alteradas (com a nota correspondente) e já importadas.
+
+    registro: {hash da linha: {'nid': id da nota, 'chave': hash do primeiro campo}}.
+    Entradas cujas notas foram apagadas são descartadas do registro.
+    """
+    existentes = existing_note_ids(col, {entrada['nid'] for entrada in registro.values()})
+    for h in [h for h, entrada in registro.items() if entrada['nid'] not in existentes]:
+        del registro[h]
+    hashes = [row_hash(row) for row in rows]
+    # Uma chave já casada por uma linha inalterada continua válida: outra linha com o mesmo
+    # primeiro campo é nova, nunca uma edição daquela nota
+    chaves_casadas = {registro[h].get('chave') for h in hashes if h in registro}
+    por_chave = {}
+    for h, entrada in registro.items():
+        chave = entrada.get('chave')
+        if chave and chave not in chaves_casadas:
+            por_chave.setdefault(chave, []).append((h, entrada['nid']))
+
+    novas, alteradas, inalteradas = [], [], 0
+    usadas = set()
+    for row, h in zip(rows, hashes):
+        if h in registro:
+            inalteradas += 1
+            continue
+        chave = row_key(row)
+        # Só é alteração se a chave aponta para uma única nota, ainda não reclamada por outra linha
+        candidatas = por_chave.get(chave, [])
+        if len(candidatas) == 1 and chave not in usadas:
+            usadas.add(chave)
+            hash_antigo, nid = candidatas[0]
+            alteradas.append((row, nid, hash_antigo))
+        else:
+            novas.append(row)
+    return novas, alteradas, inalteradas
+
+def apply_readd(col, model, deck_id, novas, alteradas, undo_label):
+    """Insere as linhas novas e atualiza as notas das alteradas num único passo de desfazer.
+
+    Retorna (OpChanges, ids das notas criadas, na ordem de `novas`).
+    """
+    if not novas and not alteradas:
+        return OpChanges(), []
+    pos = col.add_custom_undo_entry(undo_label)
+    nids = []
+    if novas:
+        _, nids = add_notes_in_batch(col, model, deck_id, novas)
+    if alteradas:
+        notas = []
+        for row, nid, _ in alteradas:
+            note = col.get_note(nid)
+            for field_idx in range(len(note.fields)):
+                note.fields[field_idx] = row['valores'].get(field_idx, "")
+            note.tags.extend(tag for tag in row['tags'] if tag not in note.tags)
+            notas.append(note)
+        col.update_notes(notas)
+    return col.merge_undo_entries(pos), nids
+
+# --- CARREGAMENTO EM LOTE DE NOTAS EXISTENTES ---
+
+# Um único passe com as substituições que o show_all_cards fazia em cinco etapas:
+# [sound:x] -> <audio>, alt="" removido de <img>, ';' dentro de style="" e espaços repetidos
+_NORMALIZE_RE = re.compile(
+    r'\[sound:([^\]]+)\]'
+    r'|(<img[^>]*)alt="[^"]*"([^>]*>)'
+    r'|style="([^"]*)"'
+    r'|\s+'
+)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def _normalize_match(match):
+    if match.group(1) is not None:
+        return f'<audio controls=""><source src="{_WHITESPACE_RE.sub(" ", match.group(1))}" type="audio/mpeg"></audio>'
+    if match.group(2) is not None:
+        return normalize_field(match.group(2) + match.group(3))
+    if match.group(4) is not None:
+        return 'style="' + _WHITESPACE_RE.sub(" ", match.group(4).replace(";", " ")) + '"'
+    return " "
+
+def normalize_field(valor):
+    """Converte o conteúdo bruto de um campo para uma linha do editor."""
+    return _NORMALIZE_RE.sub(_normalize_match, valor).strip()
+
+def fetch_note_lines(col, nids, delimiter, progress=None, chunk_size=1000):
+    """Monta as linhas do editor para as notas dadas, buscando os campos em lote.
+
+    Retorna uma lista de (nid, nome do tipo de nota, linha, valores normalizados),
+    na ordem de `nids`, sem as notas cujo conteúdo não tem nenhuma letra.
+    """
+    modelos = {}  # mid -> (nome, número de campos)
+    separador = f" {delimiter} "
+    resultado = []
+    nids = list(nids)
+    for i in range(0, len(nids), chunk_size):
+        chunk = nids[i:i + chunk_size]
+        por_id = {nid: (mid, flds) for nid, mid, flds in col.db.all(f"select id, mid, flds from notes where id in {ids2str(chunk)}")}
+        for nid in chunk:
+            if nid not in por_id:
+                continue
+            mid, flds = por_id[nid]
+            if mid not in modelos:
+                modelo = col.models.get(mid)
+                modelos[mid] = (modelo['name'], len(modelo['flds']))
+            nome, num_campos = modelos[mid]
+            valores = [normalize_field(html.unescape(valor)) for valor in flds.split("\x1f")[:num_campos]]
+            valores += [""] * (num_campos - len(valores))
+            linha = separador.join(valores)
+            if any(c.isalpha() for c in linha):
+                resultado.append((nid, nome, linha, valores))
+        if progress:
+            progress(min(i + chunk_size, len(nids)), len(nids))
+    return resultado
+
+# Mesma expressão que html.unescape usa para as referências de caractere
+_ENTITY_RE = re.compile(r'&(#[0-9]+;?|#[xX][0-9a-fA-F]+;?|[^\t\n\f <&#;]{1,32};?)')
+
+def _mapped_sub(regex, repl, texto):
+    """regex.sub que devolve também, para cada caractere do resultado, o trecho (início, fim) de origem.
+
+    Caracteres fora das ocorrências (ou de ocorrências que a substituição não muda) mapeiam
+    para si mesmos; os gerados por uma substituição mapeiam todos para a ocorrência inteira.
+    """
+    saida = []
+    mapa = []
+    pos = 0
+    for match in regex.finditer(texto):
+        saida.append(texto[pos:match.start()])
+        mapa.extend((k, k + 1) for k in range(pos, match.start()))
+        novo = repl(match)
+        saida.append(novo)
+        if novo == match.group(0):
+            mapa.extend((k, k + 1) for k in range(match.start(), match.end()))
+        else:
+            mapa.extend([(match.start(), match.end())] * len(novo))
+        pos = match.end()
+    saida.append(texto[pos:])
+    mapa.extend((k, k + 1) for k in range(pos, len(texto)))
+    return "".join(saida), mapa
+
+def _normalize_with_map(bruto):
+    """normalize_field(html.unescape(bruto)) com o trecho do campo bruto de cada caractere."""
+    desescapado, mapa_entidades = _mapped_sub(_ENTITY_RE, lambda m: html.unescape(m.group(0)), bruto)
+    normalizado, mapa_normal = _mapped_sub(_NORMALIZE_RE, _normalize_match, desescapado)
+    mapa = [(mapa_entidades[ini][0], mapa_entidades[fim - 1][1]) for ini, fim in mapa_normal]
+    inicio = len(normalizado) - len(normalizado.lstrip())
+    fim = len(normalizado.rstrip())
+    return normalizado[inicio:fim], mapa[inicio:fim]
+
+def apply_field_edit(bruto, antigo, novo):
+    """Aplica ao conteúdo bruto de um campo a edição feita na forma do editor (antigo -> novo).
+
+    Só o trecho alterado é reescrito, então mídia, entidades HTML e quebras de linha fora
+    dele ficam como estavam. Se a alteração toca um trecho que o editor converteu
+    ([sound:...] em <audio>, uma entidade, um grupo de espaços, alt= de <img>, style=),
+    esse trecho inteiro é gravado como aparece no editor: essa conversão não tem volta.
+    Devolve None se o campo mudou desde que a linha foi carregada.
+    """
+    normalizado, mapa = _normalize_with_map(bruto)
+    if normalizado != antigo:
+        return None
+    if antigo == novo:
+        return bruto
+    if not mapa:
+        return novo
+    prefixo = 0
+    limite = min(len(antigo), len(novo))
+    while prefixo < limite and antigo[prefixo] == novo[prefixo]:
+        prefixo += 1
+    sufixo = 0
+    while sufixo < limite - prefixo and antigo[-1 - sufixo] == novo[-1 - sufixo]:
+        sufixo += 1
+    ini, fim = prefixo, len(antigo) - sufixo
+    # Não corta um trecho convertido ao meio: a alteração passa a cobri-lo inteiro
+    while 0 < ini < len(mapa) and mapa[ini - 1] == mapa[ini]:
+        ini -= 1
+    while 0 < fim < len(mapa) and mapa[fim - 1] == mapa[fim]:
+        fim += 1
+    trecho_novo = novo[ini:len(novo) - (len(antigo) - fim)]
+    bruto_ini = mapa[ini][0] if ini < len(mapa) else mapa[-1][1]
+    bruto_fim = mapa[fim - 1][1] if fim > ini else bruto_ini
+    return bruto[:bruto_ini] + trecho_novo + bruto[bruto_fim:]
+
+def update_linked_notes(col, alteracoes, conflitos=None):
+    """Grava os campos alterados de notas existentes numa única atualização em lote.
+
+    alteracoes: {nid: {índice do campo: (valor carregado, valor editado)}}, ambos na forma
+    do editor. Cada edição é aplicada sobre o conteúdo bruto do campo (apply_field_edit);
+    os campos não listados não são tocados. As notas cujo campo mudou desde o carregamento
+    não são gravadas e seus ids vão para a lista conflitos.
+    """
+    notas = []
+    for nid, campos in alteracoes.items():
+        note = col.get_note(nid)
+        novos = {}
+        for field_idx, (antigo, novo) in campos.items():
+            if field_idx >= len(note.fields):
+                continue
+            valor = apply_field_edit(note.fields[field_idx], antigo, novo)
+            if valor is None:
+                novos = None
+                break
+            novos[field_idx] = valor
+        if novos is None:
+            if conflitos is not None:
+                conflitos.append(nid)
+            continue
+        for field_idx, valor in novos.items():
+            note.fields[field_idx] = valor
+        notas.append(note)
+    return col.update_notes(notas)
+
+# --- SUBSTITUIÇÃO EM TODA A COLEÇÃO ---
+
+def _field_indexes(col, cache, mid, field_name):
+    """Índices dos campos afetados no tipo de nota (todos quando field_name é vazio)."""
+    if mid not in cache:
+        nomes = [fld['name'] for fld in col.models.get(mid)['flds']]
+        if field_name:
+            cache[mid] = [nomes.index(field_name)] if field_name in nomes else []
+        else:
+            cache[mid] = list(range(len(nomes)))
+    return cache[mid]
+
+def _snippet(texto, inicio, fim, contexto=40):
+    return ("…" if inicio > contexto else "") + texto[max(0, inicio - contexto):fim + contexto] + ("…" if fim + contexto < len(texto) else "")
+
+def preview_collection_replace(col, query, regex, replacement, field_name, max_amostras=20, chunk_size=1000):
+    """Conta as ocorrências da busca nas notas do escopo e separa algumas amostras (nada é gravado)."""
+    nids = list(col.find_notes(query))
+    cache = {}
+    afetadas = []
+    total = 0
+    amostras = []
+    for i in range(0, len(nids), chunk_size):
+        for nid, mid, flds in col.db.all(f"select id, mid, flds from notes where id in {ids2str(nids[i:i + chunk_size])}"):
+            valores = flds.split("\x1f")
+            ocorrencias = 0
+            for field_idx in _field_indexes(col, cache, mid, field_name):
+                if field_idx >= len(valores):
+                    continue
+                valor = valores[field_idx]
+                for match in regex.finditer(valor):
+                    ocorrencias += 1
+                    if len(amostras) < max_amostras:
+                        antes = _snippet(valor, match.start(), match.end())
+                        amostras.append((nid, antes, regex.sub(replacement, antes)))
+            if ocorrencias:
+                afetadas.append(nid)
+                total += ocorrencias
+    return {'nids': afetadas, 'total': total, 'escopo': len(nids), 'amostras': amostras}
+
+def apply_collection_replace(col, nids, regex, replacement, field_name):
+    """Aplica a substituição nas notas afetadas com um único update_notes (um passo de desfazer).
+
+    Devolve OpChangesWithCount com o número de notas realmente alteradas: as que mudaram
+    depois da prévia ou em que a substituição não muda nada ficam de fora.
+    """
+    cache = {}
+    notas = []
+    for nid in nids:
+        note = col.get_note(nid)
+        alterada = False
+        for field_idx in _field_indexes(col, cache, note.mid, field_name):
+            novo = regex.sub(replacement, note.fields[field_idx])
+            if novo != note.fields[field_idx]:
+                note.fields[field_idx] = novo
+                alterada = True
+        if alterada:
+            notas.append(note)
+    return OpChangesWithCount(count=len(notas), changes=col.update_notes(notas))
@@ -9,20 +9,27 @@ import re
 import urllib.parse
 import base64
 import logging
+import time
 from PyQt6.QtCore import QTimer
 from aqt import mw
 from aqt.qt import *
-from aqt.utils import showInfo, showWarning
-from aqt.webview import QWebEngineView
+from aqt.operations import CollectionOp, QueryOp
+from aqt.utils import showInfo, showWarning, showText, tooltip
 from anki.utils import strip_html
 from .highlighter import HtmlTagHighlighter
-from .media_manager import MediaManagerDialog
-from .visualizar import VisualizarCards
-from .utils import CONFIG_FILE
+from .utils import CONFIG_FILE, IMPORT_REGISTRY_FILE
 from .exporthtml import *
+from .exportcache import clear_fragment_cache
+from .bulk_notes import (
+    compile_split_regex, is_skipped_line, part_to_field_map, parts_to_field_values, validate_rows,
+    row_hash, row_key, load_import_registry, save_import_registry, plan_readd, apply_readd,
+    fetch_note_lines, update_linked_notes, preview_collection_replace, apply_collection_replace,
+)
 from .english import TRANSLATIONS
 
-import webbrowser
+# MediaManagerDialog, VisualizarCards, webview_pool e webbrowser são
+# importados apenas no primeiro uso (ver manage_media, view_cards_dialog,
+# _ensure_preview_widget e export_to_html).
 
 # Configuração de logging
 logging.basicConfig(filename="delimitadores.log", level=logging.DEBUG)
@@ -89,12 +96,39 @@ class LineNumberArea(QWidget):
             block_number += 1
 
 
+class NoteLink(QTextBlockUserData):
+    """Vínculo oculto entre uma linha do editor e a nota que a originou (modo edição)."""
+    def __init__(self, nid, valores):
+        super().__init__()
+        self.nid = nid
+        self.valores = list(valores)
+
+
 class CustomDialog(QDialog):
+    # Ordenações oferecidas ao carregar notas existentes (texto, ordem SQL do find_notes)
+    SHOW_SORT_ORDERS = [
+        ("Criação (antigas primeiro)", "n.id asc"),
+        ("Criação (recentes primeiro)", "n.id desc"),
+        ("Modificação (recentes primeiro)", "n.mod desc"),
+        ("Campo de ordenação (A-Z)", "n.sfld collate nocase asc"),
+    ]
+    # Opções da exportação (salvas em 'export_options' no config)
+    EXPORT_OPTIONS_PADRAO = {
+        'cards_por_pagina': 0,
+        'pdf_tamanho': 'A4',
+        'pdf_cards_por_linha': 3,
+        'pdf_margem_mm': 10,
+        'pdf_cards_por_lote': 200,
+        'cache_fragmentos': True,
+        'limite_embutir_mb': 100,
+    }
+
     def __init__(self, parent=None):
         if not mw:
             showWarning("A janela principal do Anki não está disponível!")
             return
         logging.debug("Inicializando CustomDialog")
+        self._t_inicio = time.perf_counter()
         super().__init__(mw, Qt.WindowType.Window | Qt.WindowType.WindowMinimizeButtonHint | Qt.WindowType.WindowCloseButtonHint | Qt.WindowType.WindowMaximizeButtonHint)
         
         self.current_language = 'pt'  # Padrão
@@ -121,11 +155,91 @@ class CustomDialog(QDialog):
         self.card_notetypes = []
         self.real_text = ""
         self.last_preview_html = ""
+        self.preview_widget = None
+        self._preview_pendente = False
+        self._selecao_pendente = {}
+        self._import_registry = None
+        self.export_options = dict(self.EXPORT_OPTIONS_PADRAO)
+        self._show_nids = []
+        self._show_offset = 0
+        self._show_carregando = False
+        self._primeira_pintura = False
+        self._estagios_iniciados = False
+        # Etapas executadas em ciclos seguintes do loop de eventos, depois da primeira pintura
+        self._estagios_pendentes = [
+            self._estagio_listas,
+            self._estagio_numeracao,
+            self._estagio_mapeamentos,
+            self._estagio_preview,
+        ]
         
         self.setup_ui()
         self.load_settings()
-        self.retranslate_ui() # Aplica o idioma carregado
+        self.retranslate_ui(atualizar=False) # Aplica o idioma carregado
         self.setWindowState(Qt.WindowState.WindowMaximized)
+        logging.debug(f"CustomDialog construído em {(time.perf_counter() - self._t_inicio) * 1000:.1f} ms")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._primeira_pintura:
+            self._primeira_pintura = True
+            logging.debug(f"Primeira pintura em {(time.perf_counter() - self._t_inicio) * 1000:.1f} ms")
+            QTimer.singleShot(0, self._iniciar_estagios)
+
+    def _iniciar_estagios(self):
+        if self._estagios_iniciados:
+            return
+        self._estagios_iniciados = True
+        self._executar_proximo_estagio()
+
+    def _executar_proximo_estagio(self):
+        """Executa uma etapa pendente da construção por ciclo do loop de eventos."""
+        if not self._estagios_pendentes:
+            return
+        estagio = self._estagios_pendentes.pop(0)
+        inicio = time.perf_counter()
+        try:
+            estagio()
+        except Exception as e:
+            logging.error(f"Erro na etapa {estagio.__name__}: {str(e)}")
+        logging.debug(f"{estagio.__name__}: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+        if self._estagios_pendentes:
+            QTimer.singleShot(0, self._executar_proximo_estagio)
+        else:
+            logging.debug(f"CustomDialog completo em {(time.perf_counter() - self._t_inicio) * 1000:.1f} ms")
+            # Com a janela pronta, deixa um webview aquecido para o "Visualizar Cards"
+            QTimer.singleShot(500, self._prewarm_webview)
+
+    def _prewarm_webview(self):
+        from .webview_pool import prewarm
+        prewarm()
+
+    def _estagio_listas(self):
+        self.lista_decks.addItems([d.name for d in mw.col.decks.all_names_and_ids()])
+        self.lista_notetypes.addItems(mw.col.models.all_names())
+        for key, lista in [('deck_selecionado', self.lista_decks), ('modelo_selecionado', self.lista_notetypes)]:
+            nome = self._selecao_pendente.get(key)
+            if nome:
+                items = lista.findItems(nome, Qt.MatchFlag.MatchExactly)
+                if items:
+                    lista.blockSignals(True)
+                    lista.setCurrentItem(items[0])
+                    lista.blockSignals(False)
+        self._selecao_pendente = {}
+
+    def _estagio_numeracao(self):
+        self.clean_input_text()
+        self.update_line_numbers()
+        self.update_card_count()
+
+    def _estagio_mapeamentos(self):
+        self.update_field_mappings()
+
+    def _estagio_preview(self):
+        if self.preview_group.isVisible() and self.preview_group.width() > 0:
+            self._ensure_preview_widget()
+        else:
+            self.update_preview()
 
     def _t(self, key):
         """Função auxiliar para obter a tradução."""
@@ -190,7 +304,17 @@ class CustomDialog(QDialog):
         media_layout.addWidget(self.manage_media_button)
         
         self.export_html_button = QPushButton(self._t("Exportar para HTML"), self)
-        self.export_html_button.clicked.connect(self.export_to_html)
+        self.export_menu = QMenu(self)
+        self.export_arquivo_action = self.export_menu.addAction(self._t("Arquivo Único (delimit.html)"))
+        self.export_arquivo_action.triggered.connect(lambda: self.export_to_html('arquivo'))
+        self.export_pasta_action = self.export_menu.addAction(self._t("Pasta (index.html + media/)"))
+        self.export_pasta_action.triggered.connect(lambda: self.export_to_html('pasta'))
+        self.export_pdf_action = self.export_menu.addAction(self._t("PDF..."))
+        self.export_pdf_action.triggered.connect(self.export_to_pdf)
+        self.export_menu.addSeparator()
+        self.export_opcoes_action = self.export_menu.addAction(self._t("Opções de Exportação..."))
+        self.export_opcoes_action.triggered.connect(self.edit_export_options)
+        self.export_html_button.setMenu(self.export_menu)
         self.export_html_button.setToolTip(self._t("Exportar cards para arquivo HTML"))
         media_layout.addWidget(self.export_html_button)
         
@@ -202,6 +326,27 @@ class CustomDialog(QDialog):
         self.show_button.clicked.connect(self.show_all_cards)
         self.show_button.setToolTip(self._t("Mostra todos os cards do deck em 'Digite seus cards'"))
         media_layout.addWidget(self.show_button)
+
+        self.show_query_input = QLineEdit(self)
+        self.show_query_input.setPlaceholderText(self._t("Busca do Anki (vazio = deck selecionado)"))
+        self.show_query_input.returnPressed.connect(self.show_all_cards)
+        self.show_query_input.textChanged.connect(self.schedule_save)
+        media_layout.addWidget(self.show_query_input)
+
+        self.show_sort_combo = QComboBox(self)
+        for texto, _ in self.SHOW_SORT_ORDERS:
+            self.show_sort_combo.addItem(self._t(texto))
+        self.show_sort_combo.currentIndexChanged.connect(self.schedule_save)
+        media_layout.addWidget(self.show_sort_combo)
+
+        self.show_page_size = QSpinBox(self)
+        self.show_page_size.setRange(0, 1000000)
+        self.show_page_size.setSingleStep(100)
+        self.show_page_size.setValue(500)
+        self.show_page_size.setSpecialValueText(self._t("Todas"))
+        self.show_page_size.setToolTip(self._t("Notas por página (as próximas carregam ao rolar até o fim)"))
+        self.show_page_size.valueChanged.connect(self.schedule_save)
+        media_layout.addWidget(self.show_page_size)
         
         top_layout.addLayout(media_layout)
         
@@ -255,6 +400,7 @@ class CustomDialog(QDialog):
         self.txt_entrada.line_number_area_width = self.line_number_area_width
         self.txt_entrada.textChanged.connect(self.update_line_number_area_width)
         self.txt_entrada.verticalScrollBar().valueChanged.connect(lambda: self.txt_entrada.line_number_area.update())
+        self.txt_entrada.verticalScrollBar().valueChanged.connect(self._load_next_page_at_end)
         self.txt_entrada.cursorPositionChanged.connect(self.highlight_current_line)
         self.txt_entrada.resizeEvent = lambda event: self.custom_resize_event(event)
         self.txt_entrada.textChanged.connect(self.schedule_save)
@@ -307,6 +453,13 @@ class CustomDialog(QDialog):
         preview_header_layout = QHBoxLayout()
         self.preview_label = QLabel(self._t("Preview:"))
         preview_header_layout.addWidget(self.preview_label)
+        # Ordinal do card exibido; só o ordinal escolhido é renderizado
+        self.preview_ord_combo = QComboBox(self)
+        self.preview_ord_combo.setToolTip(self._t("Card da nota a visualizar"))
+        self.preview_ord_combo.currentIndexChanged.connect(self.on_preview_ord_changed)
+        preview_header_layout.addWidget(self.preview_ord_combo)
+        self.preview_ms_label = QLabel("")
+        preview_header_layout.addWidget(self.preview_ms_label)
         preview_header_layout.addStretch()
         
         self.zoom_in_preview_button = ForceLabelButton("+", parent=self)
@@ -321,15 +474,9 @@ class CustomDialog(QDialog):
         
         preview_layout.addLayout(preview_header_layout)
         
-        self.preview_widget = QWebEngineView()
-        settings = self.preview_widget.settings()
-        for attr in [QWebEngineSettings.WebAttribute.LocalContentCanAccessFileUrls,
-                     QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls,
-                     QWebEngineSettings.WebAttribute.AllowRunningInsecureContent]:
-            settings.setAttribute(attr, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.PlaybackRequiresUserGesture, False)
-        self.preview_widget.setMinimumWidth(0)
-        preview_layout.addWidget(self.preview_widget)
+        # O QWebEngineView só é criado quando o painel de preview aparece pela primeira vez
+        self.preview_layout = preview_layout
+        self.preview_group.installEventFilter(self)
         
         self.fields_splitter.addWidget(self.preview_group)
         self.fields_splitter.setSizes([700, 300])
@@ -349,6 +496,18 @@ class CustomDialog(QDialog):
         self.chk_repetir_tags.stateChanged.connect(self.schedule_save)
         options_layout.addWidget(self.chk_num_tags)
         options_layout.addWidget(self.chk_repetir_tags)
+        self.chk_atualizar_alteradas = QCheckBox(self._t("Atualizar Notas Alteradas"))
+        self.chk_atualizar_alteradas.setToolTip(self._t("Ao adicionar de novo, linhas já importadas e editadas atualizam a nota existente em vez de criar outra"))
+        self.chk_atualizar_alteradas.stateChanged.connect(self.schedule_save)
+        options_layout.addWidget(self.chk_atualizar_alteradas)
+        self.chk_export_todos_cards = QCheckBox(self._t("Exportar Todos os Cards"))
+        self.chk_export_todos_cards.setToolTip(self._t("Exporta todos os cards gerados por cada nota (verso, clozes), não só o primeiro"))
+        self.chk_export_todos_cards.stateChanged.connect(self.schedule_save)
+        options_layout.addWidget(self.chk_export_todos_cards)
+        self.chk_modo_edicao = QCheckBox(self._t("Modo Edição"))
+        self.chk_modo_edicao.setToolTip(self._t("Ao usar 'Mostrar', mantém cada linha vinculada à sua nota para gravar as correções de volta"))
+        self.chk_modo_edicao.stateChanged.connect(self.schedule_save)
+        options_layout.addWidget(self.chk_modo_edicao)
         
         self.toggle_tags_button = QPushButton(self._t("Mostrar Etiquetas"), self)
         self.toggle_tags_button.clicked.connect(self.toggle_tags)
@@ -394,10 +553,10 @@ class CustomDialog(QDialog):
             ("Refazer", self.txt_entrada.redo, "Refazer (Ctrl+Y)"),
         ]
         self.botoes_formatacao_widgets = []
-        for texto, funcao, tooltip in self.botoes_formatacao_defs:
+        for texto, funcao, dica in self.botoes_formatacao_defs:
             btn = QPushButton(self._t(texto))
             btn.clicked.connect(funcao)
-            btn.setToolTip(self._t(tooltip))
+            btn.setToolTip(self._t(dica))
             if texto == "Destaque":
                 btn.setStyleSheet("background-color: yellow; color: black;")
             btn_layout.addWidget(btn)
@@ -417,6 +576,16 @@ class CustomDialog(QDialog):
         self.replace_button = QPushButton(self._t("Substituir Tudo"), self)
         self.replace_button.clicked.connect(self.replace_text)
         search_layout.addWidget(self.replace_button)
+        self.replace_field_input = QLineEdit(self)
+        self.replace_field_input.setPlaceholderText(self._t("Campo (vazio = todos)"))
+        self.replace_field_input.setMaximumWidth(150)
+        search_layout.addWidget(self.replace_field_input)
+        self.chk_replace_regex = QCheckBox(self._t("Regex"), self)
+        search_layout.addWidget(self.chk_replace_regex)
+        self.replace_collection_button = QPushButton(self._t("Substituir na Coleção"), self)
+        self.replace_collection_button.clicked.connect(self.replace_in_collection)
+        self.replace_collection_button.setToolTip(self._t("Substitui nas notas da busca do Anki (ou do deck selecionado), com prévia antes de gravar"))
+        search_layout.addWidget(self.replace_collection_button)
         self.zoom_in_button = QPushButton("+", self)
         self.zoom_in_button.clicked.connect(self.zoom_in)
         search_layout.addWidget(self.zoom_in_button)
@@ -432,10 +601,10 @@ class CustomDialog(QDialog):
             ("Remover Cloze", self.remove_cloze, 2, "Remover Cloze (sem atalho)")
         ]
         self.cloze_buttons_widgets = []
-        for text, func, col, tooltip in self.cloze_buttons_defs:
+        for text, func, col, dica in self.cloze_buttons_defs:
             btn = QPushButton(self._t(text), self)
             btn.clicked.connect(func)
-            btn.setToolTip(self._t(tooltip))
+            btn.setToolTip(self._t(dica))
             cloze_layout.addWidget(btn, 0, col)
             self.cloze_buttons_widgets.append(btn)
         bottom_layout.addLayout(cloze_layout)
@@ -448,7 +617,8 @@ class CustomDialog(QDialog):
         self.decks_modelos_splitter = QSplitter(Qt.Orientation.Horizontal)
         self.decks_group = QGroupBox(self._t("Decks"))
         decks_layout = QVBoxLayout(self.decks_group)
-        self.scroll_decks, self.lista_decks = self.criar_lista_rolavel([d.name for d in mw.col.decks.all_names_and_ids()], 100)
+        # Listas preenchidas em _estagio_listas, depois da primeira pintura
+        self.scroll_decks, self.lista_decks = self.criar_lista_rolavel([], 100)
         self.lista_decks.currentItemChanged.connect(self.schedule_save)
         decks_layout.addWidget(self.scroll_decks)
         self.decks_search_input = QLineEdit(self)
@@ -464,7 +634,7 @@ class CustomDialog(QDialog):
         self.decks_modelos_splitter.addWidget(self.decks_group)
         self.modelos_group = QGroupBox(self._t("Modelos ou Tipos de Notas"))
         modelos_layout = QVBoxLayout(self.modelos_group)
-        self.scroll_notetypes, self.lista_notetypes = self.criar_lista_rolavel(mw.col.models.all_names(), 100)
+        self.scroll_notetypes, self.lista_notetypes = self.criar_lista_rolavel([], 100)
         self.lista_notetypes.currentItemChanged.connect(self.update_field_mappings)
         self.lista_notetypes.currentItemChanged.connect(self.update_preview)
         self.lista_notetypes.currentItemChanged.connect(self.schedule_save)
@@ -512,10 +682,18 @@ class CustomDialog(QDialog):
         self.btn_toggle = QPushButton(self._t("Ocultar Decks/Modelos/Delimitadores"))
         self.btn_toggle.clicked.connect(self.toggle_group)
         bottom_buttons_layout.addWidget(self.btn_toggle)
+        self.btn_dry_run = QPushButton(self._t("Simular"))
+        self.btn_dry_run.clicked.connect(self.dry_run_add_cards)
+        self.btn_dry_run.setToolTip(self._t("Verifica linhas ignoradas, campos divergentes e duplicatas sem adicionar nada"))
+        bottom_buttons_layout.addWidget(self.btn_dry_run)
         self.btn_add = QPushButton(self._t("Adicionar Cards (Ctrl+R)"))
         self.btn_add.clicked.connect(self.add_cards)
         self.btn_add.setToolTip(self._t("Adicionar Cards (Ctrl+R)"))
         bottom_buttons_layout.addWidget(self.btn_add)
+        self.btn_salvar_notas = QPushButton(self._t("Salvar nas Notas"))
+        self.btn_salvar_notas.clicked.connect(self.save_edits_to_notes)
+        self.btn_salvar_notas.setToolTip(self._t("Grava as linhas editadas de volta nas notas vinculadas (Modo Edição)"))
+        bottom_buttons_layout.addWidget(self.btn_salvar_notas)
         bottom_layout.addLayout(bottom_buttons_layout)
         bottom_layout.addStretch()
         
@@ -566,20 +744,34 @@ class CustomDialog(QDialog):
             self.retranslate_ui()
             self.schedule_save()
 
-    def retranslate_ui(self):
-        """Atualiza todo o texto da UI para o idioma atual."""
+    def retranslate_ui(self, atualizar=True):
+        """Atualiza todo o texto da UI para o idioma atual.
+
+        Com atualizar=False (construção do diálogo) o contador, o preview e o
+        mapeamento de campos ficam para as etapas adiadas.
+        """
         self.setWindowTitle(self._t("Adicionar Cards com Delimitadores"))
         self.lang_label.setText(self._t("Idioma:"))
         self.save_status_label.setText(self._t("Pronto"))
-        self.update_card_count() # Atualiza o contador com o texto correto
+        if atualizar:
+            self.update_card_count() # Atualiza o contador com o texto correto
         
         self.image_button.setText(self._t("Adicionar Imagem, Som ou Vídeo"))
         self.manage_media_button.setText(self._t("Gerenciar Mídia"))
         self.export_html_button.setText(self._t("Exportar para HTML"))
         self.export_html_button.setToolTip(self._t("Exportar cards para arquivo HTML"))
+        self.export_arquivo_action.setText(self._t("Arquivo Único (delimit.html)"))
+        self.export_pasta_action.setText(self._t("Pasta (index.html + media/)"))
+        self.export_opcoes_action.setText(self._t("Opções de Exportação..."))
+        self.export_pdf_action.setText(self._t("PDF..."))
         self.view_cards_button.setText(self._t("Visualizar Cards"))
         self.show_button.setText(self._t("Mostrar"))
         self.show_button.setToolTip(self._t("Mostra todos os cards do deck em 'Digite seus cards'"))
+        self.show_query_input.setPlaceholderText(self._t("Busca do Anki (vazio = deck selecionado)"))
+        for i, (texto, _) in enumerate(self.SHOW_SORT_ORDERS):
+            self.show_sort_combo.setItemText(i, self._t(texto))
+        self.show_page_size.setSpecialValueText(self._t("Todas"))
+        self.show_page_size.setToolTip(self._t("Notas por página (as próximas carregam ao rolar até o fim)"))
         
         self.cards_label.setText(self._t("Digite seus cards:"))
         for btn in self.color_buttons:
@@ -592,9 +784,16 @@ class CustomDialog(QDialog):
         self.txt_tags.setPlaceholderText(self._t("Digite as etiquetas aqui (uma linha por card)..."))
         
         self.preview_label.setText(self._t("Preview:"))
+        self.preview_ord_combo.setToolTip(self._t("Card da nota a visualizar"))
+        self.chk_export_todos_cards.setText(self._t("Exportar Todos os Cards"))
+        self.chk_export_todos_cards.setToolTip(self._t("Exporta todos os cards gerados por cada nota (verso, clozes), não só o primeiro"))
         
         self.chk_num_tags.setText(self._t("Numerar Tags"))
         self.chk_repetir_tags.setText(self._t("Repetir Tags"))
+        self.chk_atualizar_alteradas.setText(self._t("Atualizar Notas Alteradas"))
+        self.chk_modo_edicao.setText(self._t("Modo Edição"))
+        self.chk_modo_edicao.setToolTip(self._t("Ao usar 'Mostrar', mantém cada linha vinculada à sua nota para gravar as correções de volta"))
+        self.chk_atualizar_alteradas.setToolTip(self._t("Ao adicionar de novo, linhas já importadas e editadas atualizam a nota existente em vez de criar outra"))
         
         is_visible = self.etiquetas_group.isVisible()
         self.toggle_tags_button.setText(self._t("Ocultar Etiquetas") if is_visible else self._t("Mostrar Etiquetas"))
@@ -604,19 +803,22 @@ class CustomDialog(QDialog):
         self.toggle_view_button.setToolTip(self._t("Alterna entre a edição de texto livre e uma grade estilo planilha."))
 
         for i, btn in enumerate(self.botoes_formatacao_widgets):
-            texto, _, tooltip = self.botoes_formatacao_defs[i]
+            texto, _, dica = self.botoes_formatacao_defs[i]
             btn.setText(self._t(texto))
-            btn.setToolTip(self._t(tooltip))
+            btn.setToolTip(self._t(dica))
 
         self.search_input.setPlaceholderText(self._t("Pesquisar... Ctrl+P"))
         self.search_button.setText(self._t("Pesquisar"))
         self.replace_input.setPlaceholderText(self._t("Substituir tudo por... Ctrl+Shift+R"))
         self.replace_button.setText(self._t("Substituir Tudo"))
+        self.replace_field_input.setPlaceholderText(self._t("Campo (vazio = todos)"))
+        self.replace_collection_button.setText(self._t("Substituir na Coleção"))
+        self.replace_collection_button.setToolTip(self._t("Substitui nas notas da busca do Anki (ou do deck selecionado), com prévia antes de gravar"))
 
         for i, btn in enumerate(self.cloze_buttons_widgets):
-            text, _, _, tooltip = self.cloze_buttons_defs[i]
+            text, _, _, dica = self.cloze_buttons_defs[i]
             btn.setText(self._t(text))
-            btn.setToolTip(self._t(tooltip))
+            btn.setToolTip(self._t(dica))
 
         self.decks_group.setTitle(self._t("Decks"))
         self.decks_search_input.setPlaceholderText(self._t("Pesquisar decks..."))
@@ -637,17 +839,47 @@ class CustomDialog(QDialog):
         self.btn_toggle.setText(self._t("Ocultar Decks/Modelos/Delimitadores") if is_group_visible else self._t("Mostrar Decks/Modelos/Delimitadores"))
         self.btn_add.setText(self._t("Adicionar Cards (Ctrl+R)"))
         self.btn_add.setToolTip(self._t("Adicionar Cards (Ctrl+R)"))
+        self.btn_dry_run.setText(self._t("Simular"))
+        self.btn_salvar_notas.setText(self._t("Salvar nas Notas"))
+        self.btn_salvar_notas.setToolTip(self._t("Grava as linhas editadas de volta nas notas vinculadas (Modo Edição)"))
+        self.btn_dry_run.setToolTip(self._t("Verifica linhas ignoradas, campos divergentes e duplicatas sem adicionar nada"))
 
+        if not atualizar:
+            return
         # Atualiza o preview, pois ele pode conter mensagens de erro/status
         self.update_preview()
         # Atualiza o mapeamento de campos, pois os combos precisam ser recriados com o texto traduzido
         self.update_field_mappings()
 
+    def _ensure_preview_widget(self):
+        """Cria o webview do preview sob demanda e aplica o conteúdo pendente."""
+        if self.preview_widget is not None:
+            return self.preview_widget
+        from .webview_pool import borrow_webview
+        self.preview_widget = borrow_webview()
+        self.preview_widget.setMinimumWidth(0)
+        self.preview_widget.show()
+        self.preview_layout.addWidget(self.preview_widget)
+        if self._preview_pendente:
+            self.update_preview()
+        elif self.last_preview_html:
+            self.preview_widget.setHtml(self.last_preview_html)
+        return self.preview_widget
+
+    def _set_preview_html(self, preview_html):
+        self.last_preview_html = preview_html
+        if self.preview_widget is not None:
+            self.preview_widget.setHtml(preview_html)
+
     def zoom_in_preview(self):
+        if self.preview_widget is None:
+            return
         current_zoom = self.preview_widget.zoomFactor()
         self.preview_widget.setZoomFactor(current_zoom + 0.1)
     
     def zoom_out_preview(self):
+        if self.preview_widget is None:
+            return
         current_zoom = self.preview_widget.zoomFactor()
         self.preview_widget.setZoomFactor(max(0.1, current_zoom - 0.1))
 
@@ -746,6 +978,10 @@ class CustomDialog(QDialog):
         self.txt_entrada.setExtraSelections(extra_selections)
 
     def _save_in_real_time(self):
+        if self._estagios_pendentes:
+            # Listas e mapeamentos ainda não carregados: salvar agora perderia a seleção
+            self.save_timer.start(500)
+            return
         try:
             if os.path.exists(CONFIG_FILE):
                 shutil.copy2(CONFIG_FILE, CONFIG_FILE + ".bak")
@@ -760,7 +996,14 @@ class CustomDialog(QDialog):
                 'field_images': self.field_images, 
                 'window_geometry': window_geometry, 
                 'last_preview_html': getattr(self, 'last_preview_html', ''),
-                'language': self.current_language
+                'language': self.current_language,
+                'atualizar_alteradas': self.chk_atualizar_alteradas.isChecked(),
+                'export_todos_cards': self.chk_export_todos_cards.isChecked(),
+                'show_query': self.show_query_input.text(),
+                'show_ordem': self.show_sort_combo.currentIndex(),
+                'show_pagina': self.show_page_size.value(),
+                'modo_edicao': self.chk_modo_edicao.isChecked(),
+                'export_options': self.export_options
             }
             with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
                 json.dump(dados, f, ensure_ascii=False, indent=2)
@@ -788,6 +1031,8 @@ class CustomDialog(QDialog):
 
     def showEvent(self, event):
         super().showEvent(event)
+        # Garantia caso a janela seja exibida sem pintar (ex.: minimizada)
+        QTimer.singleShot(250, self._iniciar_estagios)
         if self.etiquetas_group.isVisible():
             self.txt_tags.setFocus()
             cursor = self.txt_tags.textCursor()
@@ -928,7 +1173,7 @@ class CustomDialog(QDialog):
                             partes[i] += f' <img src="{nome}">' if parte else f'<img src="{nome}">'
                 active_delimiter = next((chk.simbolo for chk in self.chk_delimitadores.values() if chk.isChecked()), ';')
                 linhas[current_line] = active_delimiter.join(partes)
-                self.txt_entrada.setPlainText('\n'.join(linhas))
+                self._set_text_keeping_links('\n'.join(linhas))
         self.schedule_save()
         self.update_preview()
 
@@ -971,7 +1216,7 @@ class CustomDialog(QDialog):
                 cursor = self.txt_entrada.textCursor()
                 pos = cursor.position()
                 self.txt_entrada.blockSignals(True)
-                self.txt_entrada.setPlainText(new_text)
+                self._set_text_keeping_links(new_text)
                 self.txt_entrada.blockSignals(False)
                 cursor.setPosition(pos)
                 self.txt_entrada.setTextCursor(cursor)
@@ -999,27 +1244,29 @@ class CustomDialog(QDialog):
         return re.split(regex, line_text)
 
     def update_preview(self):
+        if self.preview_widget is None:
+            # Painel ainda não exibido: renderiza quando o webview for criado
+            self._preview_pendente = True
+            return
+        self._preview_pendente = False
         cursor = self.txt_entrada.textCursor()
         self.current_line = cursor.blockNumber()
         
         linhas = self.txt_entrada.toPlainText().strip().split('\n')
         if not linhas or self.current_line >= len(linhas):
             preview_html = f"<html><body><p>{self._t('Nenhum conteúdo para exibir.')}</p></body></html>"
-            self.preview_widget.setHtml(preview_html)
-            self.last_preview_html = preview_html
+            self._set_preview_html(preview_html)
             return
 
         linha = linhas[self.current_line].strip()
         if not linha:
             preview_html = f"<html><body><p>{self._t('Linha vazia.')}</p></body></html>"
-            self.preview_widget.setHtml(preview_html)
-            self.last_preview_html = preview_html
+            self._set_preview_html(preview_html)
             return
 
         if not self.lista_notetypes.currentItem() or not self.lista_decks.currentItem():
             preview_html = f"<html><body><p>{self._t('Selecione um deck e um tipo de nota para visualizar.')}</p></body></html>"
-            self.preview_widget.setHtml(preview_html)
-            self.last_preview_html = preview_html
+            self._set_preview_html(preview_html)
             return
 
         note = None
@@ -1043,10 +1290,12 @@ class CustomDialog(QDialog):
                         note.fields[field_idx] = field_content.strip()
 
             mw.col.add_note(note, deck_id)
-            card = note.cards()[0]
+            cards = sorted(note.cards(), key=lambda c: c.ord)
+            self._fill_preview_ords([c.ord for c in cards])
+            card = cards[self.preview_ord_combo.currentIndex()]
 
-            raw_front_html = card.render_output(True, False).question_text
-            raw_back_html = get_pure_back_content(card)
+            _, raw_front_html, raw_back_html, ms = render_note_cards(note, ords={card.ord})[0]
+            self.preview_ms_label.setText(self._t("{:.0f} ms").format(ms))
             raw_css = note.model().get("css", "")
 
             processed_front = embed_media_in_html(raw_front_html, note)
@@ -1092,22 +1341,36 @@ class CustomDialog(QDialog):
             </html>
             """
             
-            self.preview_widget.setHtml(final_html)
-            self.last_preview_html = final_html
+            self._set_preview_html(final_html)
 
         except Exception as e:
             logging.error(f"Erro no update_preview: {str(e)}")
             error_html = f"<html><body><p style='color:red;'><b>{self._t('Erro na pré-visualização:')}</b><br>{html.escape(str(e))}</p></body></html>"
-            self.preview_widget.setHtml(error_html)
-            self.last_preview_html = error_html
+            self._set_preview_html(error_html)
         
         finally:
             if note and note.id:
                 mw.col.remove_notes([note.id])
 
+    def _fill_preview_ords(self, ords):
+        """Atualiza o combo de ordinais mantendo a escolha atual quando ela ainda existe."""
+        rotulos = [self._t("Card {}").format(o + 1) for o in ords]
+        if rotulos == [self.preview_ord_combo.itemText(i) for i in range(self.preview_ord_combo.count())]:
+            return
+        atual = self.preview_ord_combo.currentIndex()
+        self.preview_ord_combo.blockSignals(True)
+        self.preview_ord_combo.clear()
+        self.preview_ord_combo.addItems(rotulos)
+        self.preview_ord_combo.setCurrentIndex(min(max(atual, 0), len(rotulos) - 1))
+        self.preview_ord_combo.blockSignals(False)
+
+    def on_preview_ord_changed(self, index):
+        if index >= 0:
+            self.update_preview()
+
     def restore_last_preview(self):
         if hasattr(self, 'last_preview_html') and self.last_preview_html:
-            self.preview_widget.setHtml(self.last_preview_html)
+            self._set_preview_html(self.last_preview_html)
 
     def apply_text_color(self, color):
         cursor = self.txt_entrada.textCursor()
@@ -1136,6 +1399,7 @@ class CustomDialog(QDialog):
     def clear_all(self):
         reply = QMessageBox.question(self, self._t("Confirmação"), self._t("Tem certeza de que deseja limpar tudo? Isso não pode ser desfeito."), QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
+            self._stop_paging()
             self.txt_entrada.clear()
             self.txt_tags.clear()
             self.search_input.clear()
@@ -1147,6 +1411,7 @@ class CustomDialog(QDialog):
                 chk.setChecked(False)
             self.chk_num_tags.setChecked(False)
             self.chk_repetir_tags.setChecked(False)
+            self.chk_atualizar_alteradas.setChecked(False)
             self.cloze_2_count = 1
             self.zoom_factor = 1.0
             self.txt_entrada.zoomOut(int((self.zoom_factor - 1.0) * 10))
@@ -1186,74 +1451,153 @@ class CustomDialog(QDialog):
         deck_id = mw.col.decks.id_for_name(deck_name)
         model = mw.col.models.by_name(notetype_item.text())
         
-        contador = 0
-        linhas_tags = self.txt_tags.toPlainText().strip().split('\n')
+        rows, _ = self._build_note_rows(linhas, model)
+        if not rows:
+            showWarning(self._t("Nenhum card válido para adicionar!"))
+            return
+
+        # Linhas já importadas nesta combinação de modelo/deck são puladas
+        registro = self._get_import_registry().setdefault(f"{model['id']}:{deck_id}", {})
+        atualizar_alteradas = self.chk_atualizar_alteradas.isChecked()
+        undo_label = self._t("Adicionar Cards com Delimitadores")
+        resultado = {}
+
+        def op(col):
+            novas, alteradas, inalteradas = plan_readd(col, registro, rows)
+            if not atualizar_alteradas:
+                novas += [row for row, _, _ in alteradas]
+                alteradas = []
+            changes, nids = apply_readd(col, model, deck_id, novas, alteradas, undo_label)
+            resultado.update(novas=novas, alteradas=alteradas, inalteradas=inalteradas, nids=nids)
+            return changes
+
+        def on_success(changes):
+            for row, nid in zip(resultado['novas'], resultado['nids']):
+                registro[row_hash(row)] = {'nid': nid, 'chave': row_key(row)}
+            for row, nid, hash_antigo in resultado['alteradas']:
+                registro.pop(hash_antigo, None)
+                registro[row_hash(row)] = {'nid': nid, 'chave': row_key(row)}
+            self._save_import_registry()
+            mensagem = self._t("{} cards adicionados com sucesso!").format(len(resultado['novas']))
+            if resultado['alteradas']:
+                mensagem += "\n" + self._t("{} notas atualizadas.").format(len(resultado['alteradas']))
+            if resultado['inalteradas']:
+                mensagem += "\n" + self._t("{} linhas já importadas foram ignoradas.").format(resultado['inalteradas'])
+            showInfo(mensagem)
+
+        def on_failure(exc):
+            logging.error(f"Erro ao adicionar cards em lote: {str(exc)}")
+            showWarning(self._t("Erro ao adicionar cards: {}").format(str(exc)))
+
+        # Uma única inserção em lote, em segundo plano e como um só passo de desfazer;
+        # o CollectionOp notifica a janela principal, dispensando mw.reset()
+        CollectionOp(parent=self, op=op).success(on_success).failure(on_failure).with_progress(self._t("Adicionando cards...")).run_in_background()
+
+    def _get_import_registry(self):
+        if self._import_registry is None:
+            self._import_registry = load_import_registry(IMPORT_REGISTRY_FILE)
+        return self._import_registry
+
+    def _save_import_registry(self):
+        try:
+            save_import_registry(IMPORT_REGISTRY_FILE, self._get_import_registry())
+        except Exception as e:
+            logging.error(f"Erro ao salvar registro de linhas importadas: {str(e)}")
 
-        mw.progress.start(label="Adicionando cards...", max=len(linhas))
+    def _build_note_rows(self, linhas, model):
+        """Converte as linhas do editor em dicts (linha, valores, tags, partes) para inserção em lote.
 
+        Retorna também os índices das linhas não vazias que serão ignoradas.
+        """
+        active_delimiters = [chk.simbolo for chk in self.chk_delimitadores.values() if chk.isChecked()]
+        if not active_delimiters:
+            active_delimiters = [';']
+        split_regex = compile_split_regex(active_delimiters)
+        field_names = [f['name'] for f in model['flds']]
+        part_map = part_to_field_map(field_names, self.field_mappings)
+        linhas_tags = self.txt_tags.toPlainText().strip().split('\n')
+        numerar_tags = self.chk_num_tags.isChecked()
+
+        rows = []
+        ignoradas = []
         for i, linha in enumerate(linhas):
-            mw.progress.update(value=i + 1)
             linha = linha.strip()
-            if not linha:
+            if is_skipped_line(linha, active_delimiters):
+                if linha:
+                    ignoradas.append(i)
                 continue
-            
-            active_delimiters = [chk.simbolo for chk in self.chk_delimitadores.values() if chk.isChecked()]
-            if not active_delimiters:
-                active_delimiters = [';']
-            
-            if not any(d in linha for d in active_delimiters) and len(linha.split()) < 2:
-                continue
-
-            nota = mw.col.new_note(model)
-            
-            parts = self._get_split_parts(linha)
-            
-            if not self.field_mappings:
-                for idx, field_content in enumerate(parts):
-                    if idx < len(nota.fields):
-                        nota.fields[idx] = field_content.strip()
-            else:
-                field_names = [f['name'] for f in model['flds']]
-                for part_idx, field_content in enumerate(parts):
-                    target_field_name = self.field_mappings.get(str(part_idx))
-                    if target_field_name and target_field_name in field_names:
-                        field_idx = field_names.index(target_field_name)
-                        nota.fields[field_idx] = field_content.strip()
-            
+            parts = split_regex.split(linha)
+            valores = parts_to_field_values(parts, len(field_names), part_map)
+            tags = []
             if i < len(linhas_tags):
                 tags_for_card = [tag.strip() for tag in linhas_tags[i].split(',') if tag.strip()]
-                if tags_for_card:
-                    if self.chk_num_tags.isChecked():
-                        nota.tags.extend([f"{tag}{i + 1}" for tag in tags_for_card])
-                    else:
-                        nota.tags.extend(tags_for_card)
-            
-            try:
-                mw.col.add_note(nota, deck_id)
-                contador += 1
-            except Exception as e:
-                logging.error(f"Erro ao adicionar card da linha {i+1}: {str(e)}")
-
-        mw.progress.finish()
-        showInfo(self._t("{} cards adicionados com sucesso!").format(contador))
-        mw.reset()
+                if numerar_tags:
+                    tags = [f"{tag}{i + 1}" for tag in tags_for_card]
+                else:
+                    tags = tags_for_card
+            rows.append({'linha': i, 'valores': valores, 'tags': tags, 'partes': len(parts)})
+        return rows, ignoradas
 
-    def show_all_cards(self):
-        def clean_tags(text):
-            text = re.sub(r'(<img[^>]*)alt="[^"]*"([^>]*>)', r'\1\2', text)
-            text = re.sub(r'style="([^"]*);([^"]*)"', r'style="\1 \2"', text)
-            return text
-        if not self.lista_decks.currentItem():
-            showWarning(self._t("Selecione um deck primeiro!"))
+    def dry_run_add_cards(self):
+        """Simula o add_cards e mostra o que seria ignorado, divergente ou duplicado."""
+        deck_item = self.lista_decks.currentItem()
+        notetype_item = self.lista_notetypes.currentItem()
+        if not deck_item or not notetype_item:
+            showWarning(self._t("Selecione um deck e um modelo!"))
             return
-        deck_name = self.lista_decks.currentItem().text()
-        deck_id = mw.col.decks.id_for_name(deck_name)
-        if not deck_id:
-            showWarning(self._t("Deck '{}' não encontrado!").format(deck_name))
+        linhas_texto = self.txt_entrada.toPlainText().strip()
+        if not linhas_texto:
+            showWarning(self._t("Digite algum conteúdo!"))
             return
-        note_ids = mw.col.find_notes(f"deck:\"{deck_name}\"")
-        if not note_ids:
-            showWarning(self._t("Nenhum card encontrado no deck '{}'!").format(deck_name))
+
+        linhas = linhas_texto.split('\n')
+        model = mw.col.models.by_name(notetype_item.text())
+        rows, ignoradas = self._build_note_rows(linhas, model)
+
+        QueryOp(
+            parent=self,
+            op=lambda col: validate_rows(col, model, rows, ignoradas, len(linhas)),
+            success=self._show_dry_run_report,
+        ).with_progress(self._t("Verificando cards...")).run_in_background()
+
+    def _show_dry_run_report(self, relatorio):
+        def resumo(numeros, limite=50):
+            texto = ", ".join(str(n) for n in numeros[:limite])
+            if len(numeros) > limite:
+                texto += self._t(" ... (+{} linhas)").format(len(numeros) - limite)
+            return texto or "-"
+
+        partes = [
+            self._t("Linhas: {} | Cards válidos: {}").format(relatorio['total'], relatorio['validas']),
+            "",
+            self._t("Linhas que serão ignoradas ({}):").format(len(relatorio['ignoradas'])),
+            resumo(relatorio['ignoradas']),
+            "",
+            self._t("Linhas com número de partes diferente dos {} campos do modelo ({}):").format(
+                relatorio['num_campos'], len(relatorio['campos_divergentes'])),
+            resumo([self._t("{} ({} partes)").format(linha, n) for linha, n in relatorio['campos_divergentes']]),
+            "",
+            self._t("Linhas duplicadas entre si ({} grupos):").format(len(relatorio['duplicadas_lote'])),
+            resumo([" = ".join(str(n) for n in grupo) for grupo in relatorio['duplicadas_lote']]),
+            "",
+            self._t("Linhas cujo primeiro campo já existe no tipo de nota ({}):").format(len(relatorio['duplicadas_colecao'])),
+            resumo(relatorio['duplicadas_colecao']),
+        ]
+        showText("\n".join(partes), parent=self, title=self._t("Simulação de Adição"))
+
+    def show_all_cards(self):
+        query = self.show_query_input.text().strip()
+        if not query:
+            if not self.lista_decks.currentItem():
+                showWarning(self._t("Selecione um deck primeiro!"))
+                return
+            deck_name = self.lista_decks.currentItem().text()
+            deck_id = mw.col.decks.id_for_name(deck_name)
+            if not deck_id:
+                showWarning(self._t("Deck '{}' não encontrado!").format(deck_name))
+                return
+            query = f"deck:\"{deck_name}\""
+        if self._show_carregando:
             return
         current_text = self.txt_entrada.toPlainText()
         try:
@@ -1262,42 +1606,214 @@ class CustomDialog(QDialog):
         except Exception as e:
             logging.error(f"Erro ao salvar estado antes de 'Mostrar': {str(e)}")
             showWarning(self._t("Erro ao salvar estado antes de 'Mostrar': {}").format(str(e)))
-        card_lines = []
-        self.card_notetypes = []
-        for nid in note_ids:
-            note = mw.col.get_note(nid)
-            note_model = mw.col.models.get(note.mid)
-            note_type_name = note_model['name']
-            self.card_notetypes.append(note_type_name)
-            campos = [fld['name'] for fld in note_model['flds']]
-            field_values = []
-            for campo in campos:
-                if campo in note:
-                    field_value = html.unescape(note[campo])
-                    field_value = re.sub(r'\[sound:([^\]]+)\]', r'<audio controls=""><source src="\1" type="audio/mpeg"></audio>', field_value)
-                    field_value = clean_tags(field_value)
-                    field_value = field_value.replace('\n', ' ').replace('\u00A0', ' ')
-                    field_value = field_value.replace(' ', ' ')
-                    field_value = re.sub(r'\s+', ' ', field_value).strip()
-                    field_values.append(field_value)
-                else:
-                    field_values.append("")
-            
-            active_delimiter = next((chk.simbolo for chk in self.chk_delimitadores.values() if chk.isChecked()), ';')
-            card_line = f" {active_delimiter} ".join(field_values)
-            if any(c.isalpha() for c in card_line):
-                card_lines.append(card_line)
-        final_text = "\n".join(card_lines)
-        final_text = final_text.replace(' ', ' ').replace('\u00A0', ' ')
-        final_text = clean_tags(final_text)
-        self.txt_entrada.blockSignals(True)
-        self.txt_entrada.setPlainText(final_text)
-        self.txt_entrada.blockSignals(False)
+
+        ordem = self.SHOW_SORT_ORDERS[self.show_sort_combo.currentIndex()][1]
+        tamanho_pagina = self.show_page_size.value()
+        active_delimiter = next((chk.simbolo for chk in self.chk_delimitadores.values() if chk.isChecked()), ';')
+        label = self._t("Carregando notas... {}/{}")
+
+        def op(col):
+            nids = list(col.find_notes(query, order=ordem))
+            pagina = nids[:tamanho_pagina] if tamanho_pagina else nids
+            def progresso(feitos, total):
+                mw.taskman.run_on_main(lambda: mw.progress.update(label=label.format(feitos, total), value=feitos, max=total))
+            return nids, fetch_note_lines(col, pagina, active_delimiter, progresso), len(pagina)
+
+        def on_success(resultado):
+            nids, linhas, carregadas = resultado
+            if not nids:
+                self._show_carregando = False
+                showWarning(self._t("Nenhuma nota encontrada para a busca '{}'!").format(query))
+                return
+            self._show_nids = nids
+            self._show_offset = carregadas
+            self._show_loaded_lines(linhas, substituir=True)
+
+        def on_failure(exc):
+            self._show_carregando = False
+            showWarning(self._t("Erro na busca '{}': {}").format(query, str(exc)))
+
+        self._show_carregando = True
+        QueryOp(parent=self, op=op, success=on_success).failure(on_failure).with_progress(self._t("Carregando notas...")).run_in_background()
+
+    def _load_next_page_at_end(self, value):
+        if value < self.txt_entrada.verticalScrollBar().maximum():
+            return
+        if self._show_carregando or self._show_offset >= len(self._show_nids):
+            return
+        tamanho_pagina = self.show_page_size.value() or len(self._show_nids)
+        pagina = self._show_nids[self._show_offset:self._show_offset + tamanho_pagina]
+        active_delimiter = next((chk.simbolo for chk in self.chk_delimitadores.values() if chk.isChecked()), ';')
+
+        def on_success(linhas):
+            self._show_offset += len(pagina)
+            self._show_loaded_lines(linhas, substituir=False)
+
+        def on_failure(exc):
+            self._show_carregando = False
+            logging.error(f"Erro ao carregar próxima página: {str(exc)}")
+
+        self._show_carregando = True
+        QueryOp(
+            parent=self,
+            op=lambda col: fetch_note_lines(col, pagina, active_delimiter),
+            success=on_success,
+        ).failure(on_failure).run_in_background()
+
+    def _show_loaded_lines(self, resultado, substituir=True):
+        nomes = [nome for _, nome, _, _ in resultado]
+        self.card_notetypes = nomes if substituir else self.card_notetypes + nomes
+        vinculos = None
+        if self.chk_modo_edicao.isChecked():
+            vinculos = [(nid, valores) for nid, _, _, valores in resultado]
+        self._stream_lines_into_editor([linha for _, _, linha, _ in resultado], self._finish_show_all_cards, substituir, vinculos=vinculos)
+
+    def _finish_show_all_cards(self):
+        self._show_carregando = False
         self.previous_text = self.txt_entrada.toPlainText()
         self.update_line_numbers()
         self.update_card_count()
         self.update_preview()
         self._save_in_real_time()
+        if self._show_offset < len(self._show_nids):
+            self.save_status_label.setText(self._t("{} de {} notas carregadas").format(self._show_offset, len(self._show_nids)))
+            # Se a página não enche o editor não há barra de rolagem para chegar ao fim:
+            # continua carregando até aparecer uma (o layout assenta no próximo ciclo)
+            QTimer.singleShot(0, self._fill_editor_with_pages)
+
+    def _fill_editor_with_pages(self):
+        if self.txt_entrada.verticalScrollBar().maximum() == 0:
+            self._load_next_page_at_end(0)
+
+    def _snapshot_note_links(self):
+        """Copia os vínculos de nota por linha (os blocos são recriados por setPlainText)."""
+        vinculos = []
+        block = self.txt_entrada.document().firstBlock()
+        while block.isValid():
+            data = block.userData()
+            vinculos.append((data.nid, data.valores) if isinstance(data, NoteLink) else None)
+            block = block.next()
+        return vinculos
+
+    def _set_text_keeping_links(self, new_text, vinculos=None, avisar=True):
+        """setPlainText que preserva os vínculos do modo edição.
+
+        Sem vinculos, os atuais são mantidos se o número de linhas não mudar; quem sabe como as
+        linhas se alinham passa a lista (um item por linha do novo texto, None onde não há
+        vínculo). Se os vínculos não puderem ser mantidos, o usuário é avisado (avisar=False
+        para quem vai restaurá-los depois).
+        """
+        if vinculos is None:
+            vinculos = self._snapshot_note_links()
+        self.txt_entrada.setPlainText(new_text)
+        if not any(vinculos):
+            return
+        document = self.txt_entrada.document()
+        if document.blockCount() != len(vinculos):
+            if avisar:
+                showWarning(self._t("O número de linhas mudou: as linhas deixaram de estar vinculadas às notas de origem e não poderão mais ser salvas nelas."))
+            return
+        block = document.firstBlock()
+        for vinculo in vinculos:
+            if vinculo:
+                block.setUserData(NoteLink(*vinculo))
+            block = block.next()
+
+    def save_edits_to_notes(self):
+        """Grava nas notas de origem as linhas alteradas no modo edição, num único passo de desfazer."""
+        if self.stacked_editor.currentIndex() == 1:
+            self.switch_to_text_view()
+            self.toggle_view_button.setText(self._t("📝 Editar em Grade"))
+        active_delimiters = [chk.simbolo for chk in self.chk_delimitadores.values() if chk.isChecked()]
+        split_regex = compile_split_regex(active_delimiters or [';'])
+
+        alteracoes = {}
+        blocos_alterados = []
+        divergentes = 0
+        block = self.txt_entrada.document().firstBlock()
+        while block.isValid():
+            data = block.userData()
+            if isinstance(data, NoteLink):
+                partes = [parte.strip() for parte in split_regex.split(block.text().strip())]
+                if len(partes) != len(data.valores):
+                    divergentes += 1
+                else:
+                    campos = {idx: (data.valores[idx], parte) for idx, parte in enumerate(partes) if parte != data.valores[idx]}
+                    if campos:
+                        alteracoes[data.nid] = campos
+                        blocos_alterados.append((data, partes))
+            block = block.next()
+
+        if not alteracoes:
+            mensagem = self._t("Nenhuma nota vinculada foi alterada.")
+            if divergentes:
+                mensagem += "\n" + self._t("{} linhas ignoradas porque o número de campos mudou.").format(divergentes)
+            showInfo(mensagem)
+            return
+
+        conflitos = []
+
+        def on_success(changes):
+            for data, partes in blocos_alterados:
+                if data.nid not in conflitos:
+                    data.valores = partes
+            mensagem = self._t("{} notas atualizadas.").format(len(alteracoes) - len(conflitos))
+            if divergentes:
+                mensagem += "\n" + self._t("{} linhas ignoradas porque o número de campos mudou.").format(divergentes)
+            if conflitos:
+                mensagem += "\n" + self._t("{} notas não foram salvas porque foram alteradas fora do editor depois de carregadas.").format(len(conflitos))
+            showInfo(mensagem)
+
+        CollectionOp(
+            parent=self,
+            op=lambda col: update_linked_notes(col, alteracoes, conflitos),
+        ).success(on_success).with_progress(self._t("Salvando alterações nas notas...")).run_in_background()
+
+    def _stop_paging(self):
+        self._show_nids = []
+        self._show_offset = 0
+
+    def _stream_lines_into_editor(self, linhas, ao_terminar, substituir=True, tamanho_bloco=2000, vinculos=None):
+        """Insere as linhas no editor em blocos, um por ciclo do loop de eventos, para não travar a UI.
+
+        vinculos: lista opcional de (nid, valores) alinhada com `linhas`, gravada em cada bloco de texto.
+        """
+        self.txt_entrada.blockSignals(True)
+        self.txt_entrada.setReadOnly(True)
+        self.txt_entrada.setUndoRedoEnabled(False)
+        if substituir:
+            self.txt_entrada.clear()
+        total = len(linhas)
+        inicio = [0]
+
+        def inserir_bloco():
+            pos = inicio[0]
+            bloco = "\n".join(linhas[pos:pos + tamanho_bloco])
+            document = self.txt_entrada.document()
+            cursor = QTextCursor(document)
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            primeiro_bloco = 0
+            if bloco and not document.isEmpty():
+                bloco = "\n" + bloco
+                primeiro_bloco = document.blockCount()
+            cursor.insertText(bloco)
+            if vinculos:
+                text_block = document.findBlockByNumber(primeiro_bloco)
+                for nid, valores in vinculos[pos:pos + tamanho_bloco]:
+                    text_block.setUserData(NoteLink(nid, valores))
+                    text_block = text_block.next()
+            inicio[0] = pos + tamanho_bloco
+            self.save_status_label.setText(self._t("Carregando {}/{}").format(min(inicio[0], total), total))
+            if inicio[0] < total:
+                QTimer.singleShot(0, inserir_bloco)
+                return
+            self.txt_entrada.setUndoRedoEnabled(True)
+            self.txt_entrada.setReadOnly(False)
+            self.txt_entrada.blockSignals(False)
+            self.save_status_label.setText(self._t("Pronto"))
+            ao_terminar()
+
+        inserir_bloco()
 
     def restore_pre_show_state(self):
         if os.path.exists(self.pre_show_state_file):
@@ -1305,6 +1821,7 @@ class CustomDialog(QDialog):
                 with open(self.pre_show_state_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
                     pre_show_text = data.get('pre_show_text', '')
+                    self._stop_paging()
                     self.txt_entrada.blockSignals(True)
                     self.txt_entrada.setPlainText(pre_show_text)
                     self.txt_entrada.blockSignals(False)
@@ -1663,6 +2180,11 @@ class CustomDialog(QDialog):
         self.update_preview()
 
     def eventFilter(self, obj, event):
+        if obj == getattr(self, 'preview_group', None) and self.preview_widget is None:
+            if not self._estagios_pendentes and event.type() in (QEvent.Type.Show, QEvent.Type.Resize) and self.preview_group.width() > 0:
+                # Adia para o próximo ciclo para não bloquear a pintura da janela
+                QTimer.singleShot(0, self._ensure_preview_widget)
+            return super().eventFilter(obj, event)
         if obj == self.txt_entrada:
             if event.type() == QEvent.Type.KeyPress and event.matches(QKeySequence.StandardKey.Paste):
                 self.paste_html()
@@ -1747,29 +2269,216 @@ class CustomDialog(QDialog):
         self.highlight_current_line()
         self.update_preview()
 
-    def copy_media_files(self, dest_folder):
-        media_files = set()
-        text = self.txt_entrada.toPlainText()
-        for pattern in [r'src="([^"]+)"', r'<source src="([^"]+)"', r'<video src="([^"]+)"']:
-            media_files.update(re.findall(pattern, text))
+    def copy_media_files(self, dest_folder, file_names=None):
+        """Coloca em dest_folder os arquivos de mídia (os citados no editor se file_names for None).
+
+        Usa hardlink/reflink quando possível e pula os que já estão lá com o mesmo conteúdo;
+        devolve quantos arquivos foram tratados em cada modo.
+        """
+        if file_names is None:
+            file_names = set()
+            text = self.txt_entrada.toPlainText()
+            for pattern in [r'src="([^"]+)"', r'<source src="([^"]+)"', r'<video src="([^"]+)"']:
+                file_names.update(re.findall(pattern, text))
         media_dir = mw.col.media.dir()
-        for file_name in media_files:
+        modos = {}
+        for file_name in file_names:
             src = os.path.join(media_dir, file_name)
             dst = os.path.join(dest_folder, file_name)
-            if os.path.exists(src) and not os.path.exists(dst):
-                shutil.copy2(src, dst)
+            if os.path.exists(src):
+                modo = link_media_file(src, dst)
+                modos[modo] = modos.get(modo, 0) + 1
+        return modos
+
+    def export_to_html(self, modo='arquivo'):
+        """Exporta para ~/Desktop/delimit.html (modo 'arquivo') ou para index.html + media/ (modo 'pasta').
+
+        Na pasta, com 'cards_por_pagina' nas opções, a exportação é dividida em páginas e a
+        primeira é aberta assim que fica pronta.
+        """
+        import webbrowser
+        try:
+            tempos = {}
+            arquivos_midia = None
+            abrir_no_fim = True
+            if modo == 'pasta':
+                pasta = QFileDialog.getExistingDirectory(self, self._t("Escolha a pasta da exportação"), os.path.expanduser("~/Desktop"))
+                if not pasta:
+                    return
+                desktop_path = os.path.join(pasta, "index.html")
+                arquivos_midia = set()
+            else:
+                desktop_path = os.path.join(os.path.expanduser("~/Desktop"), "delimit.html")
+
+            if modo == 'pasta' and self.export_options['cards_por_pagina'] > 0:
+                def abrir_primeira_pagina(caminho):
+                    # A mídia usada até aqui já vai para media/ para a página abrir completa
+                    media_folder = os.path.join(pasta, "media")
+                    os.makedirs(media_folder, exist_ok=True)
+                    self.copy_media_files(media_folder, set(arquivos_midia))
+                    webbrowser.open(f"file://{os.path.abspath(caminho)}")
+                abrir_no_fim = False
+                resultado = write_paginated_export(self, self._t, pasta, self.export_options['cards_por_pagina'], arquivos_midia,
+                                                   all_ords=self.chk_export_todos_cards.isChecked(), stats=tempos,
+                                                   ao_primeira_pagina=abrir_primeira_pagina,
+                                                   cache=self.export_options['cache_fragmentos'])
+            else:
+                resultado = write_export_html(self, self._t, desktop_path, all_ords=self.chk_export_todos_cards.isChecked(),
+                                              stats=tempos, arquivos_midia=arquivos_midia,
+                                              cache=self.export_options['cache_fragmentos'],
+                                              limite_embutir=self.export_options['limite_embutir_mb'] * 1024 * 1024)
+            if not resultado:
+                return
+            resumo = ", ".join(self._t("Card {}: {:.0f} ms").format(o + 1, ms) for o, ms in sorted(tempos.items()))
+            logging.info(f"Tempo de renderização por ordinal na exportação: {resumo}")
+            segundos = max(resultado['segundos'], 0.001)
+            desempenho = self._t("{} cards, {:.1f} MB em {:.1f} s ({:.0f} cards/s)").format(
+                resultado['cards'], resultado['bytes'] / 1048576, segundos, resultado['cards'] / segundos)
+            if resultado.get('do_cache'):
+                desempenho += "<br>" + self._t("{} linhas reaproveitadas do cache").format(resultado['do_cache'])
+            if resultado.get('paginas'):
+                desempenho += "<br>" + self._t("{} páginas em {}").format(resultado['paginas'], desktop_path)
+            if arquivos_midia:
+                media_folder = os.path.join(os.path.dirname(desktop_path), "media")
+                os.makedirs(media_folder, exist_ok=True)
+                modos = self.copy_media_files(media_folder, arquivos_midia)
+                desempenho += "<br>" + self._t("Mídia: {} vinculados, {} clonados, {} copiados, {} já existentes").format(
+                    modos.get('hardlink', 0), modos.get('reflink', 0), modos.get('copia', 0), modos.get('existente', 0))
+            logging.info(f"Exportação: {desempenho}")
+            tooltip(f"{desempenho}<br>{resumo}", parent=self)
+            if abrir_no_fim:
+                webbrowser.open(f"file://{os.path.abspath(desktop_path)}")
+        except Exception as e:
+            QMessageBox.critical(self, self._t("Erro na Exportação"), self._t("Ocorreu um erro durante a exportação: {}").format(str(e)))
+
+    def export_to_pdf(self):
+        """Exporta em PDF: gera as páginas HTML em lotes numa pasta temporária e imprime cada uma."""
+        import tempfile
+        from .exportpdf import PdfExporter
+        destino, _ = QFileDialog.getSaveFileName(self, self._t("Salvar PDF"), os.path.join(os.path.expanduser("~/Desktop"), "delimit.pdf"), "PDF (*.pdf)")
+        if not destino:
+            return
+        opcoes = self.export_options
+        pasta = tempfile.mkdtemp(prefix="delimit_pdf_")
+        # Diálogo modal: setValue processa os eventos, então Cancelar funciona durante a geração
+        progresso = QProgressDialog(self._t("Gerando as páginas do PDF..."), self._t("Cancelar"), 0, 0, self)
+        progresso.setWindowModality(Qt.WindowModality.WindowModal)
+        progresso.setMinimumDuration(0)
+
+        def andamento(feitas, total):
+            progresso.setMaximum(total)
+            progresso.setValue(feitas)
+            return progresso.wasCanceled()
 
-    def export_to_html(self):
         try:
-            html_content = generate_export_html(self, self._t)
-            if not html_content:
+            arquivos_midia = set()
+            layout = {'cards_per_row': opcoes['pdf_cards_por_linha'], 'page_size': opcoes['pdf_tamanho'], 'margin_mm': opcoes['pdf_margem_mm']}
+            resultado = write_paginated_export(self, self._t, pasta, opcoes['pdf_cards_por_lote'], arquivos_midia,
+                                               all_ords=self.chk_export_todos_cards.isChecked(),
+                                               layout=layout, cache=opcoes['cache_fragmentos'],
+                                               progresso=andamento)
+            progresso.close()
+            if not resultado or not resultado['paginas'] or resultado['cancelado']:
+                shutil.rmtree(pasta, ignore_errors=True)
                 return
-            desktop_path = os.path.join(os.path.expanduser("~/Desktop"), "delimit.html")
-            with open(desktop_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            webbrowser.open(f"file://{os.path.abspath(desktop_path)}")
+            if arquivos_midia:
+                media_folder = os.path.join(pasta, "media")
+                os.makedirs(media_folder, exist_ok=True)
+                self.copy_media_files(media_folder, arquivos_midia)
         except Exception as e:
+            progresso.close()
+            shutil.rmtree(pasta, ignore_errors=True)
             QMessageBox.critical(self, self._t("Erro na Exportação"), self._t("Ocorreu um erro durante a exportação: {}").format(str(e)))
+            return
+
+        def ao_terminar(sucesso, arquivos):
+            shutil.rmtree(pasta, ignore_errors=True)
+            self._pdf_exporter = None
+            if sucesso:
+                tooltip(self._t("PDF salvo: {}").format("<br>".join(arquivos)), parent=self)
+            elif not exportador.cancelado:
+                showWarning(self._t("Não foi possível gerar o PDF."))
+
+        paginas = [os.path.join(pasta, f"page-{numero:04d}.html") for numero in range(1, resultado['paginas'] + 1)]
+        exportador = PdfExporter(self, self._t, paginas, destino, opcoes['pdf_tamanho'], opcoes['pdf_margem_mm'], ao_terminar)
+        self._pdf_exporter = exportador
+        exportador.start()
+
+    def edit_export_options(self):
+        """Diálogo com as opções da exportação; as mudanças são salvas com o resto do config."""
+        dialogo = QDialog(self)
+        dialogo.setWindowTitle(self._t("Opções de Exportação"))
+        form = QFormLayout(dialogo)
+
+        pagina_spin = QSpinBox(dialogo)
+        pagina_spin.setRange(0, 100000)
+        pagina_spin.setSingleStep(50)
+        pagina_spin.setSpecialValueText(self._t("Não dividir"))
+        pagina_spin.setValue(self.export_options['cards_por_pagina'])
+        pagina_spin.setToolTip(self._t("Na exportação em pasta, divide em páginas com este número de cards, com índice e navegação"))
+        form.addRow(self._t("Cards por página:"), pagina_spin)
+
+        limite_spin = QSpinBox(dialogo)
+        limite_spin.setRange(0, 100000)
+        limite_spin.setSingleStep(10)
+        limite_spin.setSuffix(" MB")
+        limite_spin.setSpecialValueText(self._t("Sem limite"))
+        limite_spin.setValue(self.export_options['limite_embutir_mb'])
+        limite_spin.setToolTip(self._t("No arquivo único, mídias maiores que isto são vinculadas à pasta de mídia do Anki em vez de embutidas"))
+        form.addRow(self._t("Embutir mídias até:"), limite_spin)
+
+        cache_layout = QHBoxLayout()
+        chk_cache = QCheckBox(self._t("Reaproveitar cards das linhas que não mudaram"), dialogo)
+        chk_cache.setChecked(self.export_options['cache_fragmentos'])
+        chk_cache.setToolTip(self._t("Guarda em disco os cards já processados; a próxima exportação só renderiza as linhas alteradas"))
+        cache_layout.addWidget(chk_cache)
+        limpar_cache_btn = QPushButton(self._t("Limpar cache"), dialogo)
+        def limpar_cache():
+            clear_fragment_cache()
+            tooltip(self._t("Cache de exportação apagado."), parent=dialogo)
+        limpar_cache_btn.clicked.connect(limpar_cache)
+        cache_layout.addWidget(limpar_cache_btn)
+        form.addRow(self._t("Cache:"), cache_layout)
+
+        from .exportpdf import PDF_PAGE_SIZES
+        pdf_tamanho_combo = QComboBox(dialogo)
+        pdf_tamanho_combo.addItems(list(PDF_PAGE_SIZES))
+        pdf_tamanho_combo.setCurrentText(self.export_options['pdf_tamanho'])
+        form.addRow(self._t("PDF - tamanho da página:"), pdf_tamanho_combo)
+
+        pdf_linha_spin = QSpinBox(dialogo)
+        pdf_linha_spin.setRange(1, 8)
+        pdf_linha_spin.setValue(self.export_options['pdf_cards_por_linha'])
+        form.addRow(self._t("PDF - cards por linha:"), pdf_linha_spin)
+
+        pdf_margem_spin = QSpinBox(dialogo)
+        pdf_margem_spin.setRange(0, 50)
+        pdf_margem_spin.setSuffix(" mm")
+        pdf_margem_spin.setValue(self.export_options['pdf_margem_mm'])
+        form.addRow(self._t("PDF - margens:"), pdf_margem_spin)
+
+        pdf_lote_spin = QSpinBox(dialogo)
+        pdf_lote_spin.setRange(10, 5000)
+        pdf_lote_spin.setSingleStep(50)
+        pdf_lote_spin.setValue(self.export_options['pdf_cards_por_lote'])
+        pdf_lote_spin.setToolTip(self._t("Cards impressos de cada vez; os PDFs dos lotes são juntados no final"))
+        form.addRow(self._t("PDF - cards por lote:"), pdf_lote_spin)
+
+        botoes = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel, dialogo)
+        botoes.accepted.connect(dialogo.accept)
+        botoes.rejected.connect(dialogo.reject)
+        form.addRow(botoes)
+
+        if dialogo.exec() != QDialog.DialogCode.Accepted:
+            return
+        self.export_options['cards_por_pagina'] = pagina_spin.value()
+        self.export_options['pdf_tamanho'] = pdf_tamanho_combo.currentText()
+        self.export_options['pdf_cards_por_linha'] = pdf_linha_spin.value()
+        self.export_options['pdf_margem_mm'] = pdf_margem_spin.value()
+        self.export_options['pdf_cards_por_lote'] = pdf_lote_spin.value()
+        self.export_options['cache_fragmentos'] = chk_cache.isChecked()
+        self.export_options['limite_embutir_mb'] = limite_spin.value()
+        self.schedule_save()
 
     def update_tag_numbers(self):
         linhas_tags = self.txt_tags.toPlainText().strip().split('\n')
@@ -1859,15 +2568,25 @@ class CustomDialog(QDialog):
             showWarning(self._t("Texto '{}' não encontrado.").format(search_query))
         self.update_preview()
 
+    def _literal_replace(self):
+        """Busca literal (sem diferenciar maiúsculas) e substituição literal usadas no editor e na coleção.
+
+        O texto buscado vale como digitado, inclusive espaços nas pontas.
+        """
+        search_query = self.search_input.text()
+        texto_substituto = self.replace_input.text()
+        return re.compile(re.escape(search_query), re.IGNORECASE), lambda match: texto_substituto
+
     def replace_text(self):
-        search_query = self.search_input.text().strip()
+        search_query = self.search_input.text()
         replace_text_str = self.replace_input.text()
         if not search_query:
             showWarning(self._t("Por favor, insira um texto para pesquisar."))
             return
         full_text = self.txt_entrada.toPlainText()
-        replaced_text = re.sub(re.escape(search_query), replace_text_str, full_text, flags=re.IGNORECASE)
-        self.txt_entrada.setPlainText(replaced_text)
+        regex, replacement = self._literal_replace()
+        replaced_text = regex.sub(replacement, full_text)
+        self._set_text_keeping_links(replaced_text)
         self.previous_text = replaced_text
         self.update_preview()
         if replace_text_str:
@@ -1875,6 +2594,55 @@ class CustomDialog(QDialog):
         else:
             showInfo(self._t("Todas as ocorrências de '{}' foram removidas.").format(search_query))
 
+    def replace_in_collection(self):
+        """Localizar/substituir em todas as notas do escopo: prévia em segundo plano e gravação em lote."""
+        search_query = self.search_input.text()
+        if not search_query:
+            showWarning(self._t("Por favor, insira um texto para pesquisar."))
+            return
+        query = self.show_query_input.text().strip()
+        if not query:
+            if not self.lista_decks.currentItem():
+                showWarning(self._t("Selecione um deck primeiro!"))
+                return
+            query = f"deck:\"{self.lista_decks.currentItem().text()}\""
+        field_name = self.replace_field_input.text().strip()
+        if self.chk_replace_regex.isChecked():
+            try:
+                regex = re.compile(search_query, re.IGNORECASE)
+            except re.error as e:
+                showWarning(self._t("Expressão regular inválida: {}").format(str(e)))
+                return
+            replacement = self.replace_input.text()
+        else:
+            regex, replacement = self._literal_replace()
+
+        def on_preview(previa):
+            if not previa['total']:
+                showInfo(self._t("Nenhuma ocorrência encontrada em {} notas.").format(previa['escopo']))
+                return
+            caixa = QMessageBox(self)
+            caixa.setWindowTitle(self._t("Substituir na Coleção"))
+            caixa.setText(self._t("{} ocorrências em {} de {} notas ({}). Aplicar a substituição?").format(
+                previa['total'], len(previa['nids']), previa['escopo'], query))
+            caixa.setDetailedText("\n\n".join(f"[{nid}] {antes}\n→ {depois}" for nid, antes, depois in previa['amostras']))
+            caixa.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            caixa.setDefaultButton(QMessageBox.StandardButton.No)
+            if caixa.exec() != QMessageBox.StandardButton.Yes:
+                return
+            CollectionOp(
+                parent=self,
+                op=lambda col: apply_collection_replace(col, previa['nids'], regex, replacement, field_name),
+            ).success(
+                lambda resultado: showInfo(self._t("{} notas atualizadas.").format(resultado.count))
+            ).with_progress(self._t("Substituindo nas notas...")).run_in_background()
+
+        QueryOp(
+            parent=self,
+            op=lambda col: preview_collection_replace(col, query, regex, replacement, field_name),
+            success=on_preview,
+        ).with_progress(self._t("Procurando ocorrências...")).run_in_background()
+
     def zoom_in(self):
         self.txt_entrada.zoomIn(1)
         self.zoom_factor += 0.1
@@ -1926,9 +2694,16 @@ class CustomDialog(QDialog):
         clipboard = QApplication.clipboard()
         copied_text = clipboard.text().strip().split("\n")
         current_widget = self.txt_entrada if self.txt_entrada.styleSheet() else self.txt_tags if self.txt_tags.styleSheet() else self.txt_entrada
-        current_text = current_widget.toPlainText().strip().split("\n")
+        texto_atual = current_widget.toPlainText()
+        current_text = texto_atual.strip().split("\n")
         result_lines = [f"{current_text[i] if i < len(current_text) else ''}{copied_text[i] if i < len(copied_text) else ''}".strip() for i in range(max(len(current_text), len(copied_text)))]
-        current_widget.setPlainText("\n".join(result_lines))
+        if current_widget is self.txt_entrada:
+            # As linhas continuam alinhadas às originais (menos as vazias cortadas do início)
+            cortadas = texto_atual[:len(texto_atual) - len(texto_atual.lstrip())].count("\n")
+            vinculos = self._snapshot_note_links()[cortadas:cortadas + len(result_lines)]
+            self._set_text_keeping_links("\n".join(result_lines), vinculos + [None] * (len(result_lines) - len(vinculos)))
+        else:
+            current_widget.setPlainText("\n".join(result_lines))
         self.previous_text = self.txt_entrada.toPlainText()
         self.update_preview()
 
@@ -1954,7 +2729,7 @@ class CustomDialog(QDialog):
         self.update_preview()
 
     def remove_cloze(self):
-        self.txt_entrada.setPlainText(re.sub(r'{{c\d+::(.*?)}}', r'\1', self.txt_entrada.toPlainText()))
+        self._set_text_keeping_links(re.sub(r'{{c\d+::(.*?)}}', r'\1', self.txt_entrada.toPlainText()))
         self.previous_text = self.txt_entrada.toPlainText()
         self.update_preview()
 
@@ -1970,31 +2745,52 @@ class CustomDialog(QDialog):
                     conteudo = dados.get('conteudo', '')
                     logging.debug(f"Conteúdo carregado do CONFIG_FILE: '{conteudo}'")
                     self.real_text = conteudo
+                    # Sinais bloqueados: contagem, numeração e preview vêm nas etapas adiadas
+                    self.txt_entrada.blockSignals(True)
                     self.txt_entrada.setPlainText(conteudo)
+                    self.txt_entrada.blockSignals(False)
                     self.previous_text = conteudo
+                    self.txt_tags.blockSignals(True)
                     self.txt_tags.setPlainText(dados.get('tags', ''))
+                    self.txt_tags.blockSignals(False)
+                    self.chk_atualizar_alteradas.blockSignals(True)
+                    self.chk_atualizar_alteradas.setChecked(dados.get('atualizar_alteradas', False))
+                    self.chk_atualizar_alteradas.blockSignals(False)
+                    self.chk_export_todos_cards.blockSignals(True)
+                    self.chk_export_todos_cards.setChecked(dados.get('export_todos_cards', False))
+                    self.chk_export_todos_cards.blockSignals(False)
+                    self.chk_modo_edicao.blockSignals(True)
+                    self.chk_modo_edicao.setChecked(dados.get('modo_edicao', False))
+                    self.chk_modo_edicao.blockSignals(False)
+                    for widget in (self.show_query_input, self.show_sort_combo, self.show_page_size):
+                        widget.blockSignals(True)
+                    self.show_query_input.setText(dados.get('show_query', ''))
+                    self.show_sort_combo.setCurrentIndex(dados.get('show_ordem', 0))
+                    self.show_page_size.setValue(dados.get('show_pagina', 500))
+                    for widget in (self.show_query_input, self.show_sort_combo, self.show_page_size):
+                        widget.blockSignals(False)
+                    # Chaves que não existem mais (como 'workers') ficam de fora
+                    salvas = {k: v for k, v in dados.get('export_options', {}).items() if k in self.EXPORT_OPTIONS_PADRAO}
+                    self.export_options = {**self.EXPORT_OPTIONS_PADRAO, **salvas}
                     for nome, estado in dados.get('delimitadores', {}).items():
                         if nome in self.chk_delimitadores:
-                            self.chk_delimitadores[nome].setChecked(estado)
+                            chk = self.chk_delimitadores[nome]
+                            chk.blockSignals(True)
+                            chk.setChecked(estado)
+                            chk.blockSignals(False)
                     if 'window_geometry' in dados:
                         geo = dados['window_geometry']
                         self.resize(*geo.get('size', (1000, 600)))
                         self.move(*geo.get('pos', (100, 100)))
                         self.vertical_splitter.setSizes(geo.get('vertical_splitter', [300, 300]))
                         self.fields_splitter.setSizes(geo.get('fields_splitter', [700, 300]))
-                    for key, lista in [('deck_selecionado', self.lista_decks), ('modelo_selecionado', self.lista_notetypes)]:
-                        if dados.get(key):
-                            items = lista.findItems(dados[key], Qt.MatchFlag.MatchExactly)
-                            if items:
-                                lista.setCurrentItem(items[0])
+                    # Seleções aplicadas em _estagio_listas, quando as listas forem preenchidas
+                    self._selecao_pendente = {key: dados.get(key) for key in ('deck_selecionado', 'modelo_selecionado')}
                     self.field_mappings = dados.get('field_mappings', {})
                     self.field_images = dados.get('field_images', {})
                     self.last_preview_html = dados.get('last_preview_html', '')
-                    if self.last_preview_html:
+                    if self.last_preview_html and self.preview_widget is not None:
                         self.preview_widget.setHtml(self.last_preview_html)
-                    self.update_field_mappings()
-                    self.update_line_numbers()
-                    self.update_card_count()
                     logging.debug(f"Configurações carregadas: {dados}")
             except Exception as e:
                 logging.error(f"Erro ao carregar configurações: {str(e)}")
@@ -2003,18 +2799,20 @@ class CustomDialog(QDialog):
             logging.debug("Arquivo CONFIG_FILE não encontrado")
             self.real_text = ""
             self.last_preview_html = ""
-            self.update_line_numbers()
-            self.update_card_count()
 
     def join_lines(self):
         texto = self.txt_entrada.toPlainText()
         if '\n' not in texto:
             if hasattr(self, 'original_text'):
-                self.txt_entrada.setPlainText(self.original_text)
+                # Separar de novo devolve às linhas os vínculos com as notas guardados ao juntar
+                self._set_text_keeping_links(self.original_text, self._vinculos_antes_de_juntar)
                 del self.original_text
         else:
             self.original_text = texto
-            self.txt_entrada.setPlainText(texto.replace('\n', ' '))
+            self._vinculos_antes_de_juntar = self._snapshot_note_links()
+            self._set_text_keeping_links(texto.replace('\n', ' '), avisar=False)
+            if any(self._vinculos_antes_de_juntar):
+                tooltip(self._t("As linhas vinculadas às notas só podem ser salvas depois de separar as linhas de novo."), parent=self)
         self.previous_text = self.txt_entrada.toPlainText()
         self.update_preview()
 
@@ -2045,6 +2843,7 @@ class CustomDialog(QDialog):
         if not self.media_files:
             showWarning(self._t("Nenhum arquivo de mídia foi adicionado ou referenciado no texto!"))
             return
+        from .media_manager import MediaManagerDialog
         self.media_dialog = MediaManagerDialog(self, self.media_files, self.txt_entrada, mw, self._t)
         self.media_dialog.show()
 
@@ -2065,13 +2864,23 @@ class CustomDialog(QDialog):
         if hasattr(self, 'media_dialog') and self.media_dialog:
             self.media_dialog.close()
             self.media_dialog = None
+        if self.visualizar_dialog is not None and self.visualizar_dialog.isVisible():
+            self.visualizar_dialog.close()
+        if self.preview_widget is not None:
+            from .webview_pool import return_webview
+            return_webview(self.preview_widget)
+            self.preview_widget = None
         if hasattr(mw, 'custom_dialog_instance'):
             mw.custom_dialog_instance = None
         super().closeEvent(event)
 
     def view_cards_dialog(self):
         if self.visualizar_dialog is None or not self.visualizar_dialog.isVisible():
+            from .visualizar import VisualizarCards
             self.visualizar_dialog = VisualizarCards(self, self._t)
+            if not self.visualizar_dialog.valido:
+                self.visualizar_dialog = None
+                return
             self.visualizar_dialog.show()
         else:
             self.visualizar_dialog.raise_()
@@ -2120,15 +2929,24 @@ class CustomDialog(QDialog):
     def switch_to_text_view(self):
         active_delimiter = next((chk.simbolo for chk in self.chk_delimitadores.values() if chk.isChecked()), ';')
         
+        # A grade tem uma linha por linha do texto, então os vínculos com as notas voltam na mesma ordem
+        vinculos = self._snapshot_note_links()
         lines = []
         for row in range(self.table_widget.rowCount()):
             row_data = []
             for col in range(self.table_widget.columnCount()):
                 item = self.table_widget.item(row, col)
                 row_data.append(item.text() if item else "")
+            vinculo = vinculos[row] if row < len(vinculos) else None
+            # Colunas extras (de linhas com mais partes) ficam de fora das linhas vinculadas se vazias
+            while vinculo and len(row_data) > len(vinculo[1]) and not row_data[-1]:
+                row_data.pop()
             lines.append(active_delimiter.join(row_data))
         
-        self.txt_entrada.setPlainText("\n".join(lines))
+        if self.table_widget.rowCount() == len(vinculos):
+            self._set_text_keeping_links("\n".join(lines), vinculos)
+        else:
+            self._set_text_keeping_links("\n".join(lines))
         self.stacked_editor.setCurrentIndex(0)
 
     def add_media_to_cell(self, item):
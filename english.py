@@ -14,6 +14,7 @@ TRANSLATIONS = {
     "Erro na Exportação": "Export Error",
     "Selecionar Mídia para {}": "Select Media for {}",
     "Selecionar Mídia": "Select Media",
+    "Simulação de Adição": "Add Dry Run",
 
     # --- Labels e Textos Gerais ---
     "Idioma:": "Language:",
@@ -61,6 +62,8 @@ TRANSLATIONS = {
     "Refazer": "Redo",
     "Pesquisar": "Search",
     "Substituir Tudo": "Replace All",
+    "Substituir na Coleção": "Replace in Collection",
+    "Regex": "Regex",
     "Cloze 1 (Ctrl+Shift+D)": "Cloze 1 (Ctrl+Shift+D)",
     "Cloze 2 (Ctrl+Shift+F)": "Cloze 2 (Ctrl+Shift+F)",
     "Remover Cloze": "Remove Cloze",
@@ -68,6 +71,9 @@ TRANSLATIONS = {
     "Ocultar Decks/Modelos/Delimitadores": "Hide Decks/Models/Delimiters",
     "Mostrar Decks/Modelos/Delimitadores": "Show Decks/Models/Delimiters",
     "Adicionar Cards (Ctrl+R)": "Add Cards (Ctrl+R)",
+    "Simular": "Dry Run",
+    "Salvar nas Notas": "Save to Notes",
+    "Verifica linhas ignoradas, campos divergentes e duplicatas sem adicionar nada": "Checks skipped lines, field mismatches and duplicates without adding anything",
     "Excluir": "Delete",
     "Visualizar": "Preview",
     "Desfazer (Ctrl+Z)": "Undo (Ctrl+Z)",
@@ -77,10 +83,59 @@ TRANSLATIONS = {
     "Mostrar Lista": "Show List",
     "Aumentar Zoom": "Zoom In",
     "Diminuir Zoom": "Zoom Out",
+    "Criação (antigas primeiro)": "Created (oldest first)",
+    "Criação (recentes primeiro)": "Created (newest first)",
+    "Modificação (recentes primeiro)": "Modified (newest first)",
+    "Campo de ordenação (A-Z)": "Sort field (A-Z)",
+    "Todas": "All",
 
     # --- Placeholders e Tooltips ---
     "Exportar cards para arquivo HTML": "Export cards to an HTML file",
+    "Arquivo Único (delimit.html)": "Single File (delimit.html)",
+    "Pasta (index.html + media/)": "Folder (index.html + media/)",
+    "Opções de Exportação...": "Export Options...",
+    "Opções de Exportação": "Export Options",
+    "Cards por página:": "Cards per page:",
+    "Não dividir": "Don't split",
+    "Na exportação em pasta, divide em páginas com este número de cards, com índice e navegação": "In folder exports, splits into pages with this many cards, with an index and navigation",
+    "{} páginas em {}": "{} pages in {}",
+    "Anterior": "Previous",
+    "Índice": "Index",
+    "Próxima": "Next",
+    "Página {}": "Page {}",
+    "Página {} (cards {}–{})": "Page {} (cards {}–{})",
+    "Exportação em andamento...": "Export in progress...",
+    "PDF...": "PDF...",
+    "Salvar PDF": "Save PDF",
+    "PDF salvo: {}": "PDF saved: {}",
+    "Não foi possível gerar o PDF.": "Could not generate the PDF.",
+    "Gerando PDF...": "Generating PDF...",
+    "Gerando as páginas do PDF...": "Generating the PDF pages...",
+    "Gerando PDF: lote {} de {}...": "Generating PDF: batch {} of {}...",
+    "PDF - tamanho da página:": "PDF - page size:",
+    "PDF - cards por linha:": "PDF - cards per row:",
+    "PDF - margens:": "PDF - margins:",
+    "PDF - cards por lote:": "PDF - cards per batch:",
+    "Cards impressos de cada vez; os PDFs dos lotes são juntados no final": "Cards printed at a time; the batch PDFs are merged at the end",
+    "{} linhas reaproveitadas do cache": "{} lines reused from the cache",
+    "Reaproveitar cards das linhas que não mudaram": "Reuse cards from lines that did not change",
+    "Guarda em disco os cards já processados; a próxima exportação só renderiza as linhas alteradas": "Keeps processed cards on disk; the next export only renders the changed lines",
+    "Limpar cache": "Clear cache",
+    "Cache de exportação apagado.": "Export cache cleared.",
+    "Cache:": "Cache:",
+    "Sem limite": "No limit",
+    "No arquivo único, mídias maiores que isto são vinculadas à pasta de mídia do Anki em vez de embutidas": "In the single file, media larger than this is linked to Anki's media folder instead of embedded",
+    "Embutir mídias até:": "Embed media up to:",
+    "Escolha a pasta da exportação": "Choose the export folder",
+    "Mídia: {} vinculados, {} clonados, {} copiados, {} já existentes": "Media: {} linked, {} cloned, {} copied, {} already present",
+    "Ao adicionar de novo, linhas já importadas e editadas atualizam a nota existente em vez de criar outra": "When adding again, already imported lines that were edited update the existing note instead of creating another",
     "Mostra todos os cards do deck em 'Digite seus cards'": "Shows all cards from the selected deck in the 'Enter your cards' area",
+    "Busca do Anki (vazio = deck selecionado)": "Anki search (empty = selected deck)",
+    "Ao usar 'Mostrar', mantém cada linha vinculada à sua nota para gravar as correções de volta": "When using 'Show', keeps each line linked to its note so corrections can be written back",
+    "Grava as linhas editadas de volta nas notas vinculadas (Modo Edição)": "Writes edited lines back to their linked notes (Edit Mode)",
+    "Campo (vazio = todos)": "Field (empty = all)",
+    "Substitui nas notas da busca do Anki (ou do deck selecionado), com prévia antes de gravar": "Replaces in the notes matching the Anki search (or the selected deck), with a preview before saving",
+    "Notas por página (as próximas carregam ao rolar até o fim)": "Notes per page (more load when scrolling to the end)",
     "Aplicar cor ao texto": "Apply color to text",
     "Aplicar cor de fundo ao texto": "Apply background color to text",
     "Digite seus cards aqui...": "Enter your cards here...",
@@ -108,6 +163,15 @@ TRANSLATIONS = {
     # --- Checkboxes ---
     "Numerar Tags": "Number Tags",
     "Repetir Tags": "Repeat Tags",
+    "Atualizar Notas Alteradas": "Update Changed Notes",
+    "Exportar Todos os Cards": "Export All Cards",
+    "Exporta todos os cards gerados por cada nota (verso, clozes), não só o primeiro": "Exports every card generated by each note (reverse, clozes), not just the first one",
+    "Card da nota a visualizar": "Card of the note to preview",
+    "Card {}": "Card {}",
+    "{:.0f} ms": "{:.0f} ms",
+    "Card {}: {:.0f} ms": "Card {}: {:.0f} ms",
+    "{} cards, {:.1f} MB em {:.1f} s ({:.0f} cards/s)": "{} cards, {:.1f} MB in {:.1f} s ({:.0f} cards/s)",
+    "Modo Edição": "Edit Mode",
 
     # --- Mensagens de Status e Avisos ---
     "Salvando...": "Saving...",
@@ -120,9 +184,39 @@ TRANSLATIONS = {
     "Selecione um deck e um modelo!": "Please select a deck and a note type!",
     "Digite algum conteúdo!": "Please enter some content!",
     "{} cards adicionados com sucesso!": "{} cards added successfully!",
+    "Adicionando cards...": "Adding cards...",
+    "Nenhum card válido para adicionar!": "No valid cards to add!",
+    "Erro ao adicionar cards: {}": "Error adding cards: {}",
+    "{} notas atualizadas.": "{} notes updated.",
+    "O número de linhas mudou: as linhas deixaram de estar vinculadas às notas de origem e não poderão mais ser salvas nelas.": "The number of lines changed: the lines are no longer linked to their source notes and can no longer be saved to them.",
+    "{} notas não foram salvas porque foram alteradas fora do editor depois de carregadas.": "{} notes were not saved because they were changed outside the editor after being loaded.",
+    "As linhas vinculadas às notas só podem ser salvas depois de separar as linhas de novo.": "Lines linked to notes can only be saved after splitting the lines again.",
+    "{} linhas já importadas foram ignoradas.": "{} already imported lines were skipped.",
+    "Nenhuma nota vinculada foi alterada.": "No linked note was changed.",
+    "{} linhas ignoradas porque o número de campos mudou.": "{} lines skipped because their field count changed.",
+    "Salvando alterações nas notas...": "Saving changes to notes...",
+    "Expressão regular inválida: {}": "Invalid regular expression: {}",
+    "Nenhuma ocorrência encontrada em {} notas.": "No occurrences found in {} notes.",
+    "{} ocorrências em {} de {} notas ({}). Aplicar a substituição?": "{} occurrences in {} of {} notes ({}). Apply the replacement?",
+    "Substituindo nas notas...": "Replacing in notes...",
+    "Procurando ocorrências...": "Searching for occurrences...",
+    "Verificando cards...": "Checking cards...",
+    " ... (+{} linhas)": " ... (+{} lines)",
+    "Linhas: {} | Cards válidos: {}": "Lines: {} | Valid cards: {}",
+    "Linhas que serão ignoradas ({}):": "Lines that will be skipped ({}):",
+    "Linhas com número de partes diferente dos {} campos do modelo ({}):": "Lines whose part count differs from the {} note type fields ({}):",
+    "{} ({} partes)": "{} ({} parts)",
+    "Linhas duplicadas entre si ({} grupos):": "Lines duplicating each other ({} groups):",
+    "Linhas cujo primeiro campo já existe no tipo de nota ({}):": "Lines whose first field already exists in the note type ({}):",
     "Selecione um deck primeiro!": "Please select a deck first!",
     "Deck '{}' não encontrado!": "Deck '{}' not found!",
     "Nenhum card encontrado no deck '{}'!": "No cards found in deck '{}'!",
+    "Carregando notas...": "Loading notes...",
+    "Carregando notas... {}/{}": "Loading notes... {}/{}",
+    "Carregando {}/{}": "Loading {}/{}",
+    "Nenhuma nota encontrada para a busca '{}'!": "No notes found for the search '{}'!",
+    "Erro na busca '{}': {}": "Error in search '{}': {}",
+    "{} de {} notas carregadas": "{} of {} notes loaded",
     "Erro ao salvar estado antes de 'Mostrar': {}": "Error saving state before 'Show': {}",
     "Nenhum estado anterior salvo encontrado!": "No previous saved state found!",
     "Por favor, insira um texto para pesquisar.": "Please enter text to search for.",
@@ -155,6 +249,13 @@ TRANSLATIONS = {
     "Digite conteúdo para visualizar!": "Enter content to preview!",
     "Selecione um tipo de nota para visualizar!": "Select a note type to preview!",
     "Nenhum card válido para visualizar!": "No valid cards to preview!",
+    "Renderizando card {}...": "Rendering card {}...",
+    "Renderizar Todos": "Render All",
+    "Cancelar": "Cancel",
+    "Card {} (erro)": "Card {} (error)",
+    "Galeria": "Gallery",
+    "Esta nota não gera o card {}.": "This note does not generate card {}.",
+    "Memória: {} cards, {:.1f} MB (fragmentos {:.1f} MB, mídia {:.1f} MB, casca {:.1f} MB)": "Memory: {} cards, {:.1f} MB (fragments {:.1f} MB, media {:.1f} MB, shell {:.1f} MB)",
 
     # --- Strings de MediaManager ---
     "Selecione um arquivo para excluir!": "Select a file to delete!",
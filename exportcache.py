@@ -0,0 +1,100 @@
+# exportcache.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from aqt import mw
+from .utils import EXPORT_CACHE_FILE
+
+# Fragmentos de cards já processados pela exportação, guardados em disco entre uma exportação
+# e outra. A chave junta o texto da linha, a versão do tipo de nota e as opções da exportação;
+# cada entrada guarda também o hash das mídias que usou e só vale enquanto elas não mudarem.
+MAX_ENTRADAS_CACHE = 20000
+# Entra na chave: aumente sempre que mudar o HTML gerado para um card (renderização,
+# pós-processamento, rótulos), para que os fragmentos antigos deixem de ser usados
+CACHE_VERSION = 1
+
+_hashes_midia = {}  # caminho -> ((tamanho, mtime), hash), para não reler arquivos que não mudaram
+
+def open_fragment_cache(path=EXPORT_CACHE_FILE):
+    """Abre (criando se preciso) o banco do cache; devolve None se não for possível."""
+    try:
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS fragmentos ("
+            "chave TEXT PRIMARY KEY, cards TEXT NOT NULL, midia TEXT NOT NULL, usado REAL NOT NULL)"
+        )
+        return conn
+    except sqlite3.Error as e:
+        logging.error(f"Não foi possível abrir o cache de exportação: {str(e)}")
+        return None
+
+def close_fragment_cache(conn):
+    """Grava as entradas novas, descarta as menos usadas além de MAX_ENTRADAS_CACHE e fecha."""
+    try:
+        conn.execute(
+            "DELETE FROM fragmentos WHERE chave NOT IN "
+            "(SELECT chave FROM fragmentos ORDER BY usado DESC LIMIT ?)", (MAX_ENTRADAS_CACHE,)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao gravar o cache de exportação: {str(e)}")
+    finally:
+        conn.close()
+
+def clear_fragment_cache(path=EXPORT_CACHE_FILE):
+    if os.path.exists(path):
+        os.remove(path)
+
+def fragment_key(line, model, deck_id, opcoes):
+    """Chave de uma linha: muda se a linha, o tipo de nota (modelos, CSS), o baralho (inclusive o
+    nome, que {{Deck}} mostra), as opções ou o código da exportação (CACHE_VERSION) mudarem."""
+    partes = [str(CACHE_VERSION), line, str(model['id']), str(model.get('mod', 0)), str(deck_id),
+              mw.col.decks.name(deck_id), json.dumps(opcoes, sort_keys=True)]
+    return hashlib.sha1("\x1f".join(partes).encode('utf-8')).hexdigest()
+
+def media_file_hash(filename):
+    """Hash do conteúdo de um arquivo da pasta de mídia (None se não existir)."""
+    path = os.path.join(mw.col.media.dir(), filename)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    versao = (st.st_size, st.st_mtime_ns)
+    memo = _hashes_midia.get(path)
+    if memo and memo[0] == versao:
+        return memo[1]
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    _hashes_midia[path] = (versao, h.hexdigest())
+    return _hashes_midia[path][1]
+
+def lookup_fragments(conn, chave):
+    """Devolve (cards, nomes das mídias) da linha, ou None se não houver ou a mídia tiver mudado."""
+    try:
+        linha = conn.execute("SELECT cards, midia FROM fragmentos WHERE chave = ?", (chave,)).fetchone()
+        if linha is None:
+            return None
+        midia = json.loads(linha[1])
+        if any(media_file_hash(nome) != h for nome, h in midia.items()):
+            return None
+        conn.execute("UPDATE fragmentos SET usado = ? WHERE chave = ?", (time.time(), chave))
+        return json.loads(linha[0]), list(midia)
+    except (sqlite3.Error, ValueError) as e:
+        logging.error(f"Erro ao ler o cache de exportação: {str(e)}")
+        return None
+
+def store_fragments(conn, chave, cards, nomes_midia):
+    try:
+        midia = {nome: media_file_hash(nome) for nome in nomes_midia}
+        conn.execute(
+            "INSERT OR REPLACE INTO fragmentos (chave, cards, midia, usado) VALUES (?, ?, ?, ?)",
+            (chave, json.dumps(cards), json.dumps(midia), time.time())
+        )
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao gravar no cache de exportação: {str(e)}")
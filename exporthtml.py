@@ -3,22 +3,151 @@
 import os
 import re
 import base64
+import time
+import itertools
+import hashlib
+import shutil
+import urllib.parse
+from pathlib import Path
+import copy
+import html
+import logging
 from aqt import mw
 from aqt.utils import showWarning
+from anki.cards import Card
+from anki.models import MODEL_STD
+from anki.template import TemplateRenderContext
+from .exportcache import open_fragment_cache, close_fragment_cache, fragment_key, lookup_fragments, store_fragments
 
 # --- FUNÇÕES AUXILIARES DO EXEMPLO FORNECIDO ---
 # Estas funções foram copiadas e adaptadas do seu código de referência.
 
+# Um padrão por construção, cada um começando por um literal: o re só consegue saltar direto para
+# as ocorrências quando o padrão não começa por lookbehind ou alternância (que o deixavam ~15x
+# mais lento em cards pequenos). Se "id"/"for" é um atributo e não o fim de data-id= é checado à parte.
+_ID_ATTR_RE = re.compile(r'''id\s*=\s*(["'])([^"']+)\1''')
+_FOR_ATTR_RE = re.compile(r'''for\s*=\s*(["'])([^"']+)\1''')
+_GET_BY_ID_RE = re.compile(r'''getElementById\s*\(\s*(["'])([^"'#]+)\1\s*\)''')
+_QUERY_ID_RE = re.compile(r'''(querySelector(?:All)?)\s*\(\s*(["'])#([-\w]+)\2\s*\)''')
+_CSS_ID_RE = re.compile(r'#([-\w]+)')
+
+def _is_attribute(texto, inicio):
+    """True se o nome casado em inicio não é a cauda de outro nome (data-id=, valid=, transform=)."""
+    return inicio == 0 or not (texto[inicio - 1].isalnum() or texto[inicio - 1] in "-_")
+
+def html_ids(html_content):
+    """Nomes usados em atributos id= do HTML."""
+    return {m.group(2) for m in _ID_ATTR_RE.finditer(html_content) if _is_attribute(html_content, m.start())}
+
 def make_ids_unique(html_content, css_content, card_id):
-    """Adiciona um sufixo único a todos os IDs no HTML e CSS para evitar conflitos."""
+    """Adiciona um sufixo único a todos os IDs no HTML e CSS para evitar conflitos.
+
+    Reescreve id=, for=, getElementById("id"), querySelector("#id") e os seletores #id do CSS
+    com uma passada por construção, qualquer que seja o número de ids.
+    """
+    ids = html_ids(html_content)
+    if not ids:
+        return html_content, css_content
     suffix = f"_{card_id}"
-    ids_to_replace = set(re.findall(r'id\s*=\s*["\']([^"\']+)["\']', html_content))
-    for original_id in ids_to_replace:
-        new_id = f"{original_id}{suffix}"
-        html_content = re.sub(f'id\\s*=\\s*(["\']){re.escape(original_id)}\\1', f'id="{new_id}"', html_content)
-        html_content = re.sub(f'getElementById\\s*\\(\\s*(["\']){re.escape(original_id)}\\1\\s*\\)', f'getElementById("{new_id}")', html_content)
-        css_content = re.sub(f'#{re.escape(original_id)}(?![-_a_zA-Z0-9])', f'#{new_id}', css_content)
-    return html_content, css_content
+
+    def attr_replacer(nome_attr):
+        def replacer(match):
+            nome = match.group(2)
+            if nome not in ids or not _is_attribute(match.string, match.start()):
+                return match.group(0)
+            return f'{nome_attr}="{nome}{suffix}"'
+        return replacer
+
+    def get_by_id_replacer(match):
+        nome = match.group(2)
+        return f'getElementById("{nome}{suffix}")' if nome in ids else match.group(0)
+
+    def query_replacer(match):
+        nome = match.group(3)
+        return f'{match.group(1)}("#{nome}{suffix}")' if nome in ids else match.group(0)
+
+    def css_replacer(match):
+        nome = match.group(1)
+        return f'#{nome}{suffix}' if nome in ids else match.group(0)
+
+    html_content = _ID_ATTR_RE.sub(attr_replacer("id"), html_content)
+    html_content = _FOR_ATTR_RE.sub(attr_replacer("for"), html_content)
+    html_content = _GET_BY_ID_RE.sub(get_by_id_replacer, html_content)
+    html_content = _QUERY_ID_RE.sub(query_replacer, html_content)
+    return html_content, _CSS_ID_RE.sub(css_replacer, css_content)
+
+# --- CSS POR TIPO DE NOTA ---
+# O CSS de cada tipo de nota sai uma vez, com os seletores presos à classe .nt-<id do modelo>
+# que envolve os cards daquele modelo.
+
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+_CSS_AT_RECURSIVO = ('@media', '@supports', '@container', '@layer', '@document')
+_PRECISA_IDS_UNICOS_RE = re.compile(r'<script|(?<![\w-])for\s*=', re.IGNORECASE)
+
+def split_css_rules(css_text):
+    """Divide o CSS em [(prelúdio, corpo)] no nível superior, respeitando chaves aninhadas."""
+    css_text = _CSS_COMMENT_RE.sub('', css_text)
+    regras = []
+    i = 0
+    while True:
+        abre = css_text.find('{', i)
+        if abre == -1:
+            break
+        # Regras de instrução (@charset, @import...) antes do bloco são descartadas
+        prelude = css_text[i:abre].rsplit(';', 1)[-1].strip()
+        profundidade = 1
+        j = abre + 1
+        while j < len(css_text) and profundidade:
+            if css_text[j] == '{':
+                profundidade += 1
+            elif css_text[j] == '}':
+                profundidade -= 1
+            j += 1
+        regras.append((prelude, css_text[abre + 1:j - 1]))
+        i = j
+    return regras
+
+def _split_selectors(prelude):
+    seletores, atual, profundidade = [], [], 0
+    for c in prelude:
+        if c in '([':
+            profundidade += 1
+        elif c in ')]':
+            profundidade -= 1
+        if c == ',' and profundidade == 0:
+            seletores.append(''.join(atual))
+            atual = []
+        else:
+            atual.append(c)
+    seletores.append(''.join(atual))
+    return [sel.strip() for sel in seletores if sel.strip()]
+
+def _scope_selector(seletor, escopo):
+    seletor = re.sub(r'^(?:html|:root)(?![-\w])\s*', '', seletor)
+    if re.match(r'body(?![-\w])', seletor):
+        # body vira o próprio escopo: "body.nightMode .x" -> ".nt-1.nightMode .x"
+        return escopo + seletor[4:]
+    return f"{escopo} {seletor}" if seletor else escopo
+
+def scope_css(css_text, escopo):
+    """Prefixa os seletores com o escopo (html/body/:root passam a ser o próprio escopo)."""
+    partes = []
+    for prelude, corpo in split_css_rules(css_text):
+        if prelude.startswith(_CSS_AT_RECURSIVO):
+            partes.append(f"{prelude}{{{scope_css(corpo, escopo)}}}")
+        elif prelude.startswith('@'):
+            partes.append(f"{prelude}{{{corpo}}}")
+        else:
+            partes.append(f"{', '.join(_scope_selector(sel, escopo) for sel in _split_selectors(prelude))}{{{corpo}}}")
+    return "\n".join(partes)
+
+def id_rules(css_text, ids):
+    """Só as regras de nível superior cujo seletor cita algum dos ids."""
+    if not ids:
+        return ""
+    padrao = re.compile(r'#(?:' + '|'.join(re.escape(i) for i in ids) + r')(?![-\w])')
+    return "\n".join(f"{prelude}{{{corpo}}}" for prelude, corpo in split_css_rules(css_text)
+                     if not prelude.startswith('@') and padrao.search(prelude))
 
 def media_to_data_url(filename):
     """Converte um nome de arquivo de mídia em uma URL de dados Base64."""
@@ -30,26 +159,198 @@ def media_to_data_url(filename):
     file_path = os.path.join(media_dir, filename)
     if not os.path.exists(file_path): return None
     
+    try:
+        # Em blocos: só a URL final fica inteira na memória, não o arquivo e o Base64 dele
+        return f"data:{_mime_type(filename)};base64,{''.join(_iter_base64_file(file_path))}"
+    except Exception:
+        return None
+
+def _mime_type(filename):
     ext = os.path.splitext(filename)[1].lower()
-    mime_type = {
+    return {
         '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png',
         '.gif': 'image/gif', '.svg': 'image/svg+xml', '.mp3': 'audio/mpeg',
         '.wav': 'audio/wav', '.ogg': 'audio/ogg', '.mp4': 'video/mp4',
         '.webm': 'video/webm'
     }.get(ext, 'application/octet-stream')
-    
+
+# --- REGISTRO DE MÍDIA DA EXPORTAÇÃO ---
+# Cada arquivo é lido uma vez e identificado pelo hash do conteúdo; os dados saem uma única
+# vez no documento, no mapa JS __dm; <img>/<audio> recebem o dado pelo atributo data-media e
+# os url() do CSS viram variáveis --dm-<hash> definidas pelo mesmo mapa.
+# Os cards só guardam a referência, então o tamanho cresce com a mídia única, não com o uso.
+
+# Arquivos a partir de MIDIA_STREAM_MIN bytes não ficam na memória: o registro guarda só o caminho
+# e o Base64 é gerado em blocos direto na saída (iter_media_registry). Acima de limite_embutir
+# o arquivo nem é embutido, só vinculado pelo caminho na pasta de mídia.
+
+_MEDIA_REF_SRC_RE = re.compile(r' src="dmhash:(\w+)"')
+_MEDIA_REF_CSS_RE = re.compile(r'url\("dmhash:(\w+)"\)')
+
+MIDIA_STREAM_MIN = 1024 * 1024
+BLOCO_BASE64 = 3 * 256 * 1024  # múltiplo de 3: os blocos em Base64 emendam sem padding no meio
+
+def new_media_registry(limite_embutir=0):
+    """Registro de mídia da exportação; limite_embutir (bytes, 0 = sem limite) vincula os arquivos maiores."""
+    return {'arquivos': {}, 'emitidos': set(), 'pendentes': [], 'limite_embutir': limite_embutir}
+
+def register_media(registro, filename):
+    """Registra o arquivo e devolve o hash do conteúdo (None se não existir)."""
+    filename = filename.strip('\'"')
+    if filename in registro['arquivos']:
+        return registro['arquivos'][filename]
+    media_dir = mw.col.media.dir()
+    file_path = os.path.join(media_dir, filename) if media_dir and filename else None
+    h = None
+    data_url = None
+    if file_path and os.path.exists(file_path):
+        try:
+            if os.path.getsize(file_path) >= MIDIA_STREAM_MIN:
+                h = _file_hash(file_path)[:16]
+            else:
+                with open(file_path, 'rb') as f:
+                    dados = f.read()
+                h = hashlib.sha1(dados).hexdigest()[:16]
+                data_url = f"data:{_mime_type(filename)};base64,{base64.b64encode(dados).decode('utf-8')}"
+        except Exception:
+            h = None
+    if h and h not in registro['emitidos']:
+        registro['emitidos'].add(h)
+        registro['pendentes'].append((h, data_url, file_path))
+    registro['arquivos'][filename] = h
+    return h
+
+def media_registry_resolver(registro):
+    """Resolver para embed_media_in_html/process_css_for_embedding que usa o registro."""
+    def resolver(filename):
+        if filename.startswith(('data:', 'http')):
+            return filename
+        if registro['limite_embutir']:
+            file_path = os.path.join(mw.col.media.dir(), filename.strip('\'"'))
+            if os.path.isfile(file_path) and os.path.getsize(file_path) > registro['limite_embutir']:
+                return Path(file_path).as_uri()
+        h = register_media(registro, filename)
+        return f"dmhash:{h}" if h else None
+    return resolver
+
+def _iter_base64_file(file_path):
+    """Base64 do arquivo em pedaços, lendo um bloco por vez."""
+    with open(file_path, 'rb') as f:
+        for bloco in iter(lambda: f.read(BLOCO_BASE64), b''):
+            yield base64.b64encode(bloco).decode('ascii')
+
+def iter_media_registry(registro):
+    """Gera, em pedaços, o HTML com os dados das mídias registradas desde a última chamada.
+
+    As mídias grandes saem bloco a bloco, sem nunca ficarem inteiras na memória.
+    """
+    pendentes, registro['pendentes'] = registro['pendentes'], []
+    if not pendentes:
+        return
+    pequenos = []
+    for h, url, file_path in pendentes:
+        if url is not None:
+            pequenos.append(f'__dm["{h}"]="{url}";')
+            continue
+        if pequenos:
+            yield f"<script>{''.join(pequenos)}</script>"
+            pequenos = []
+        yield f'<script>__dm["{h}"]="data:{_mime_type(file_path)};base64,'
+        try:
+            yield from _iter_base64_file(file_path)
+        except OSError as e:
+            logging.error(f"Erro ao embutir {file_path}: {str(e)}")
+        yield '";</script>'
+    if pequenos:
+        yield f"<script>{''.join(pequenos)}</script>"
+
+def link_registered_media(html_content):
+    """Troca os marcadores do resolver pelas referências ao dado compartilhado."""
+    html_content = _MEDIA_REF_SRC_RE.sub(r' data-media="\1"', html_content)
+    return _MEDIA_REF_CSS_RE.sub(r'var(--dm-\1)', html_content)
+
+# --- EXPORTAÇÃO EM PASTA (index.html + media/) ---
+
+_IMG_SEM_LOADING_RE = re.compile(r'<img(?![^>]*\bloading=)', re.IGNORECASE)
+
+def media_folder_resolver(arquivos):
+    """Resolver da exportação em pasta: aponta para media/<arquivo> e anota os arquivos usados."""
+    def resolver(filename):
+        if filename.startswith(('data:', 'http')):
+            return filename
+        filename = filename.strip('\'"')
+        media_dir = mw.col.media.dir()
+        if not media_dir or not filename or not os.path.exists(os.path.join(media_dir, filename)):
+            return None
+        arquivos.add(filename)
+        return "media/" + urllib.parse.quote(filename)
+    return resolver
+
+def _file_hash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+def _reflink(src, dst):
+    """Clona o arquivo com o ioctl FICLONE (Btrfs, XFS e afins); False se não for suportado."""
     try:
-        with open(file_path, 'rb') as f:
-            data = base64.b64encode(f.read()).decode('utf-8')
-        return f"data:{mime_type};base64,{data}"
-    except Exception:
-        return None
+        import fcntl
+    except ImportError:
+        return False
+    FICLONE = 0x40049409
+    try:
+        with open(src, 'rb') as fs, open(dst, 'wb') as fd:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+def link_media_file(src, dst):
+    """Coloca src em dst sem duplicar dados quando possível.
+
+    Pula arquivos já presentes com o mesmo conteúdo; senão tenta hardlink (mesmo sistema de
+    arquivos), depois reflink, e por fim copia. Devolve o modo usado.
+    """
+    if os.path.exists(dst):
+        if os.path.samefile(src, dst):
+            return 'existente'
+        if os.path.getsize(src) == os.path.getsize(dst) and _file_hash(src) == _file_hash(dst):
+            return 'existente'
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+        return 'hardlink'
+    except OSError:
+        pass
+    if _reflink(src, dst):
+        return 'reflink'
+    shutil.copy2(src, dst)
+    return 'copia'
 
-def embed_media_in_html(html_content, note):
-    """Encontra referências de mídia no HTML e as converte para Base64."""
+def get_js_media_resolver():
+    """Script do rodapé que aplica o mapa __dm aos elementos com data-media e às variáveis CSS."""
+    return """
+    <script>
+        Object.keys(__dm).forEach(h => { document.documentElement.style.setProperty('--dm-' + h, `url("${__dm[h]}")`); });
+        document.querySelectorAll('[data-media]').forEach(el => { el.src = __dm[el.dataset.media]; });
+    </script>
+    """
+
+def embed_media_in_html(html_content, note, resolver=None):
+    """Encontra referências de mídia no HTML e as converte para Base64.
+
+    resolver troca a conversão (nome do arquivo -> URL); a pré-visualização usa marcadores
+    resolvidos por um registro compartilhado em vez de repetir o Base64 em cada card.
+    """
+    resolver = resolver or media_to_data_url
     def img_replacer(match):
         filename = match.group(1)
-        data_url = media_to_data_url(filename)
+        data_url = resolver(filename)
         return f'<img src="{data_url}"' if data_url else match.group(0)
     html_content = re.sub(r'<img src=[\'"]([^"\']+)[\'"]', img_replacer, html_content)
     
@@ -62,7 +363,7 @@ def embed_media_in_html(html_content, note):
         idx = int(match.group(1))
         if idx < len(audio_files):
             filename = audio_files[idx]
-            data_url = media_to_data_url(filename)
+            data_url = resolver(filename)
             if data_url:
                 return f'<audio controls src="{data_url}" style="max-width: 100%; height: 30px;"></audio>'
         return ""
@@ -70,20 +371,24 @@ def embed_media_in_html(html_content, note):
     html_content = re.sub(play_tag_regex, audio_replacer, html_content)
     return html_content
 
-def process_css_for_embedding(css_text):
+def process_css_for_embedding(css_text, resolver=None):
     """Encontra referências de URL no CSS e as converte para Base64."""
     if not css_text: return ""
+    resolver = resolver or media_to_data_url
     css_text = re.sub(r'@import url\(.*?\);', '', css_text)
     def url_replacer(match):
         filename = match.group(1).strip().strip('\'"')
         if filename.startswith(('http', 'data:')): return match.group(0)
-        data_url = media_to_data_url(filename)
+        data_url = resolver(filename)
         return f'url("{data_url}")' if data_url else 'url("")'
     return re.sub(r'url\(([^)]+)\)', url_replacer, css_text, flags=re.IGNORECASE)
 
 def get_pure_back_content(card):
     """Extrai apenas o conteúdo do verso do card, de forma inteligente."""
-    answer_html = card.render_output(True, False).answer_text
+    return pure_back_from_answer(card.render_output(True, False).answer_text)
+
+def pure_back_from_answer(answer_html):
+    """O verso a partir do HTML da resposta já renderizado (ver get_pure_back_content)."""
     parts = re.split(r'<hr id=[\'"]?answer[\'"]?>', answer_html, maxsplit=1)
     if len(parts) > 1:
         return parts[1]
@@ -100,7 +405,7 @@ def get_pure_back_content(card):
         return answer_html[cut_position:]
     return answer_html
 
-def get_common_css(cards_per_row):
+def get_common_css(cards_per_row, page_size="A4", margin_mm=10):
     """Retorna o CSS comum para o layout da grade e controle de altura."""
     return f"""
     <style>
@@ -123,9 +428,9 @@ def get_common_css(cards_per_row):
     .front-title, .back-title {{ text-align: center; font-size: 1.1em; font-weight: bold; margin: 10px 0 5px 0; color: #555; }}
     .separator {{ border-top: 2px solid #EEE; margin: 15px 0; }}
     @media print {{
-        @page {{ size: A4; margin: 1cm; }}
+        @page {{ size: {page_size}; margin: {margin_mm}mm; }}
         body {{ background-color: #FFF !important; -webkit-print-color-adjust: exact; print-color-adjust: exact; margin: 0; }}
-        h1, .front-title, .back-title, .separator {{ display: none; }}
+        h1, .front-title, .back-title, .separator, .page-nav {{ display: none; }}
         .card-container {{ grid-template-columns: repeat({cards_per_row}, 1fr); gap: 10px; }}
         .card-item {{ box-shadow: none; border: 1px solid #DDD; page-break-inside: avoid !important; height: auto !important; max-height: none; overflow: visible; }}
         .card-content-wrapper {{ max-height: none; overflow: visible; padding: 5px; }}
@@ -157,7 +462,71 @@ def get_js_equalizers():
 
 # --- FUNÇÃO PRINCIPAL DE EXPORTAÇÃO ---
 
-def generate_export_html(self, translator):
+def render_note_cards(note, ords=None):
+    """Renderiza os cards gerados de uma nota já adicionada, em ordem de ordinal.
+
+    ords limita quais ordinais são renderizados (None = todos). Devolve uma lista de
+    (card, frente, verso, ms) com o custo de renderização de cada ordinal.
+    """
+    renderizados = []
+    for card in sorted(note.cards(), key=lambda c: c.ord):
+        if ords is not None and card.ord not in ords:
+            continue
+        inicio = time.perf_counter()
+        raw_front_html = card.render_output(True, False).question_text
+        raw_back_html = get_pure_back_content(card)
+        renderizados.append((card, raw_front_html, raw_back_html, (time.perf_counter() - inicio) * 1000))
+    return renderizados
+
+_DECK_FIELD_RE = re.compile(r'\{\{(Deck|Subdeck)\}\}')
+
+def _render_unsaved_card(note, model, ord, deck_id):
+    """Card renderizado de uma nota que não está na coleção (como Note.ephemeral_card, mas no baralho dado)."""
+    card = Card(note.col)
+    card.ord = ord
+    card.did = deck_id
+    template = copy.copy(model['tmpls'][ord if model['type'] == MODEL_STD else 0])
+    template['ord'] = ord
+    # Fora da coleção o Anki mostra "(Deck)": o nome do baralho entra direto no modelo copiado
+    baralho = note.col.decks.name(deck_id)
+    nomes = {'Deck': baralho, 'Subdeck': baralho.split('::')[-1]}
+    for lado in ('qfmt', 'afmt'):
+        template[lado] = _DECK_FIELD_RE.sub(lambda m: html.escape(nomes[m.group(1)]), template[lado])
+    card.set_render_output(TemplateRenderContext.from_card_layout(note, card, notetype=model, template=template, fill_empty=False).render())
+    card._note = note
+    return card
+
+def render_unsaved_note_cards(note, deck_id, ords=None):
+    """Como render_note_cards, mas para uma nota que não foi adicionada: nada é gravado na coleção.
+
+    Os ordinais gerados são os que o Anki criaria: os números de cloze dos campos ou, nos tipos
+    comuns, os modelos cuja frente muda com os campos preenchidos. Devolve (ordinais gerados,
+    [(card, frente, verso, ms)]).
+    """
+    model = note.note_type()
+    cards = {}
+    if model['type'] == MODEL_STD:
+        vazia = note.col.new_note(model)
+        gerados = []
+        for ord in range(len(model['tmpls'])):
+            card = _render_unsaved_card(note, model, ord, deck_id)
+            if card.render_output().question_text != _render_unsaved_card(vazia, model, ord, deck_id).render_output().question_text:
+                gerados.append(ord)
+                cards[ord] = card
+    else:
+        gerados = sorted(numero - 1 for numero in note.cloze_numbers_in_fields()) or [0]
+    renderizados = []
+    for ord in gerados:
+        if ords is not None and ord not in ords:
+            continue
+        inicio = time.perf_counter()
+        card = cards.get(ord) or _render_unsaved_card(note, model, ord, deck_id)
+        saida = card.render_output()
+        renderizados.append((card, saida.question_text, pure_back_from_answer(saida.answer_text), (time.perf_counter() - inicio) * 1000))
+    return gerados, renderizados
+
+def _export_source(self, translator):
+    """Valida o que será exportado; devolve (model, deck_id, linhas) ou None."""
     _t = translator
 
     if not self.lista_notetypes.currentItem():
@@ -171,59 +540,296 @@ def generate_export_html(self, translator):
 
     model = mw.col.models.by_name(self.lista_notetypes.currentItem().text())
     deck_id = mw.col.decks.current()['id']
-    cards_per_row = 3
-    
-    buf = []
-    buf.append(f"<html><head><meta charset='utf-8'>{mw.baseHTML()}{get_common_css(cards_per_row)}</head><body>")
-    buf.append(f'<h1>{_t("Cards Exportados")}</h1><div class="card-container">')
-    
-    mw.progress.start(label=_t("Renderizando e processando cards..."), max=len(cards_text_lines))
-    
-    for i, line in enumerate(cards_text_lines):
-        mw.progress.update(value=i)
-        if not line.strip():
-            continue
+    return model, deck_id, cards_text_lines
 
-        note = None
-        try:
-            note = mw.col.new_note(model)
-            parts = re.split(r';(?=(?:[^"]*"[^"]*")*[^"]*$)', line)
-            for idx, field_content in enumerate(parts):
-                if idx < len(note.fields):
-                    note.fields[idx] = field_content.strip()
-            
-            mw.col.add_note(note, deck_id)
-            card = note.cards()[0]
-            
-            raw_front_html = card.render_output(True, False).question_text
-            raw_back_html = get_pure_back_content(card)
-            raw_css = note.model().get("css", "")
-            
-            combined_html = (
-                f'<div class="front-content"><div class="front-title">{_t("Frente")}</div>{raw_front_html}</div>'
-                '<div class="separator"></div>'
-                f'<div class="back-content"><div class="back-title">{_t("Verso")}</div>{raw_back_html}</div>'
-            )
-            
-            unique_html, unique_css = make_ids_unique(combined_html, raw_css, card.id)
-            processed_css = process_css_for_embedding(unique_css)
-            processed_html = embed_media_in_html(unique_html, note)
-            
-            buf.append(
-                f'<div class="card-item">'
-                f'<style>{processed_css}</style>'
-                f'<div class="card-content-wrapper">'
-                f'<div class="card">{processed_html}</div>'
-                '</div></div>'
-            )
-        finally:
-            if note and note.id:
-                mw.col.remove_notes([note.id])
-
-    mw.progress.finish()
-    
-    buf.append("</div>")
-    buf.append(get_js_equalizers())
-    buf.append("</body></html>")
-    
-    return "".join(buf)
\ No newline at end of file
+def _postprocess_card(combined_html, raw_css, escopo, card_id, note, resolver, em_pasta):
+    """Etapa puramente Python de um card (ids, CSS, mídia, Base64), depois da renderização."""
+    # Ids só precisam de sufixo quando scripts ou <label for> dependem deles; nesse
+    # caso as regras #id do modelo são repetidas, já renomeadas, só para este card
+    estilo_card = ""
+    if _PRECISA_IDS_UNICOS_RE.search(combined_html):
+        regras_id = id_rules(raw_css, html_ids(combined_html))
+        combined_html, regras_id = make_ids_unique(combined_html, regras_id, card_id)
+        if regras_id:
+            estilo_card = f"<style>{process_css_for_embedding(scope_css(regras_id, '.' + escopo), resolver)}</style>"
+    processed_html = embed_media_in_html(combined_html, note, resolver)
+
+    card_html = (
+        f'<div class="card-item {escopo}">'
+        f'{estilo_card}'
+        f'<div class="card-content-wrapper">'
+        f'<div class="card">{processed_html}</div>'
+        '</div></div>'
+    )
+    if em_pasta:
+        return _IMG_SEM_LOADING_RE.sub('<img loading="lazy"', card_html)
+    return link_registered_media(card_html)
+
+def _iter_export_head(model, resolver, registro, em_pasta, titulo="", layout=None):
+    """Cabeçalho de uma página exportada, em pedaços, com o CSS do tipo de nota (escopado) uma única vez.
+
+    As mídias que o CSS registra saem pelo mesmo caminho em blocos dos cards (iter_media_registry).
+    layout pode trazer cards_per_row, page_size e margin_mm para get_common_css.
+    """
+    estilo_modelo = process_css_for_embedding(scope_css(model.get("css", ""), f".nt-{model['id']}"), resolver)
+    if not em_pasta:
+        # Como nos cards: os url("dmhash:...") do resolver viram as variáveis --dm-<hash>
+        estilo_modelo = link_registered_media(estilo_modelo)
+    titulo = f"<title>{titulo}</title>" if titulo else ""
+    yield (
+        f"<html><head><meta charset='utf-8'>{titulo}{mw.baseHTML()}{get_common_css(**{'cards_per_row': 3, **(layout or {})})}"
+        "<script>var __dm = {};</script>"
+    )
+    yield from iter_media_registry(registro)
+    yield f"<style>{estilo_modelo}</style></head><body>"
+
+def _export_tail():
+    return get_js_media_resolver() + get_js_equalizers() + "</body></html>"
+
+def _recording_resolver(resolver, usados):
+    """Envolve o resolver anotando em usados os arquivos de mídia resolvidos (para o cache)."""
+    def gravando(filename):
+        url = resolver(filename)
+        if url and not filename.startswith(('data:', 'http')):
+            usados.add(filename.strip('\'"'))
+        return url
+    return gravando
+
+def _iter_export_cards(self, translator, fonte, resolver, registro, em_pasta, all_ords, stats, contador, cache=False,
+                       progresso=None):
+    """Renderiza e pós-processa os cards da fonte; cada item gerado é o HTML de um card, na ordem
+    (fora da exportação em pasta, precedido pelos dados das mídias que ele registrou).
+
+    Com cache, as linhas que não mudaram desde a última exportação saem do cache em disco sem renderizar
+    (contador['cache'] recebe quantas).
+
+    progresso(feitas, total), se dado, substitui a barra do Anki (que não processa eventos e
+    por isso não cancela) e é chamado a cada linha; devolvendo True, a geração para ali e
+    contador['cancelado'] fica True.
+    """
+    _t = translator
+    model, deck_id, cards_text_lines = fonte
+    conexao = open_fragment_cache() if cache else None
+    opcoes_chave = {'em_pasta': em_pasta, 'all_ords': all_ords, 'rotulos': [_t("Frente"), _t("Verso")],
+                    'limite_embutir': registro['limite_embutir']}
+    chaves_vistas = set()
+
+    def saida(card_html):
+        if not em_pasta:
+            yield from iter_media_registry(registro)
+        yield card_html
+
+    if progresso is None:
+        mw.progress.start(label=_t("Renderizando e processando cards..."), max=len(cards_text_lines))
+    try:
+        for i, line in enumerate(cards_text_lines):
+            if progresso is None:
+                mw.progress.update(value=i)
+            elif progresso(i, len(cards_text_lines)):
+                if contador is not None:
+                    contador['cancelado'] = True
+                return
+            if not line.strip():
+                continue
+
+            chave = None
+            guardado = None
+            if conexao is not None:
+                chave = fragment_key(line, model, deck_id, opcoes_chave)
+                if chave in chaves_vistas:
+                    # Linha repetida no lote: os ids do cache colidiriam, então renderiza de novo
+                    chave = None
+                else:
+                    chaves_vistas.add(chave)
+                    guardado = lookup_fragments(conexao, chave)
+
+            if guardado is not None:
+                cards, nomes_midia = guardado
+                # A mídia dos cards guardados ainda precisa entrar no registro ou em media/
+                for nome in nomes_midia:
+                    resolver(nome)
+                if contador is not None:
+                    contador['cards'] = contador.get('cards', 0) + len(cards)
+                    contador['cache'] = contador.get('cache', 0) + 1
+            else:
+                note = None
+                try:
+                    note = mw.col.new_note(model)
+                    parts = re.split(r';(?=(?:[^"]*"[^"]*")*[^"]*$)', line)
+                    for idx, field_content in enumerate(parts):
+                        if idx < len(note.fields):
+                            note.fields[idx] = field_content.strip()
+                    
+                    mw.col.add_note(note, deck_id)
+                    raw_css = note.model().get("css", "")
+                    escopo = f"nt-{note.mid}"
+                    renderizados = render_note_cards(note, ords=None if all_ords else {note.cards()[0].ord})
+                finally:
+                    if note and note.id:
+                        mw.col.remove_notes([note.id])
+
+                usados = set()
+                resolver_linha = _recording_resolver(resolver, usados) if chave else resolver
+                cards = []
+                for card, raw_front_html, raw_back_html, ms in renderizados:
+                    if stats is not None:
+                        stats[card.ord] = stats.get(card.ord, 0) + ms
+                    if contador is not None:
+                        contador['cards'] = contador.get('cards', 0) + 1
+
+                    combined_html = (
+                        f'<div class="front-content"><div class="front-title">{_t("Frente")}</div>{raw_front_html}</div>'
+                        '<div class="separator"></div>'
+                        f'<div class="back-content"><div class="back-title">{_t("Verso")}</div>{raw_back_html}</div>'
+                    )
+                    # Com cache o sufixo dos ids vem da chave, para o fragmento servir em outra exportação
+                    sufixo_ids = f"{chave[:12]}{card.ord}" if chave else card.id
+                    cards.append(_postprocess_card(combined_html, raw_css, escopo, sufixo_ids, note, resolver_linha, em_pasta))
+                if chave is not None:
+                    store_fragments(conexao, chave, cards, usados)
+
+            for card_html in cards:
+                yield from saida(card_html)
+    finally:
+        if progresso is None:
+            mw.progress.finish()
+        if conexao is not None:
+            close_fragment_cache(conexao)
+
+def iter_export_html(self, translator, all_ords=False, stats=None, contador=None, arquivos_midia=None, cache=False,
+                     limite_embutir=0):
+    """Gera o HTML de exportação em pedaços: cabeçalho, um card por vez e rodapé.
+
+    all_ords exporta todos os cards de cada nota, não só o primeiro. Se stats for um
+    dicionário, recebe o tempo total de renderização por ordinal ({ord: ms}); contador['cards']
+    recebe quantos cards foram gerados. Com o conjunto arquivos_midia, a mídia é referenciada
+    em media/ (exportação em pasta) e os nomes usados são acumulados nele. cache reaproveita
+    os cards das linhas que não mudaram.
+    Arquivos acima de limite_embutir bytes são vinculados em vez de embutidos (0 = sem limite).
+    """
+    _t = translator
+    fonte = _export_source(self, translator)
+    if fonte is None:
+        return
+
+    registro = new_media_registry(limite_embutir)
+    em_pasta = arquivos_midia is not None
+    resolver = media_folder_resolver(arquivos_midia) if em_pasta else media_registry_resolver(registro)
+
+    yield from _iter_export_head(fonte[0], resolver, registro, em_pasta)
+    yield f'<h1>{_t("Cards Exportados")}</h1><div class="card-container">'
+    yield from _iter_export_cards(self, translator, fonte, resolver, registro, em_pasta, all_ords, stats, contador, cache)
+    yield "</div>"
+    yield _export_tail()
+
+def write_export_html(self, translator, path, all_ords=False, stats=None, buffer_size=1024 * 1024, arquivos_midia=None,
+                      cache=False, limite_embutir=0):
+    """Grava a exportação direto no arquivo, card a card, por um writer com buffer.
+
+    A memória usada não cresce com o número de cards nem com o tamanho das mídias, que são
+    codificadas em blocos direto no arquivo. Devolve {'bytes', 'cards', 'segundos', 'do_cache'}
+    ou None se não havia o que exportar.
+    """
+    contador = {'cards': 0, 'cache': 0}
+    inicio = time.perf_counter()
+    pedacos = iter_export_html(self, translator, all_ords, stats, contador, arquivos_midia, cache, limite_embutir)
+    primeiro = next(pedacos, None)
+    if primeiro is None:
+        return None
+    total_bytes = 0
+    with open(path, 'wb', buffering=buffer_size) as f:
+        for pedaco in itertools.chain([primeiro], pedacos):
+            dados = pedaco.encode('utf-8')
+            f.write(dados)
+            total_bytes += len(dados)
+    return {'bytes': total_bytes, 'cards': contador['cards'], 'segundos': time.perf_counter() - inicio, 'do_cache': contador['cache']}
+
+# --- EXPORTAÇÃO PAGINADA ---
+
+def _page_name(numero):
+    return f"page-{numero:04d}.html"
+
+def _page_nav(translator, numero, proxima):
+    _t = translator
+    links = []
+    if numero > 1:
+        links.append(f'<a href="{_page_name(numero - 1)}">&larr; {_t("Anterior")}</a>')
+    links.append(f'<a href="index.html">{_t("Índice")}</a>')
+    if proxima:
+        links.append(f'<a href="{_page_name(numero + 1)}">{_t("Próxima")} &rarr;</a>')
+    return f'<nav class="page-nav" style="margin: 15px 0;">{" | ".join(links)}</nav>'
+
+def _write_page_index(translator, pasta, paginas, concluida):
+    """(Re)grava o index.html com as páginas já fechadas; é pequeno, então é refeito a cada página."""
+    _t = translator
+    itens = "".join(
+        f'<li><a href="{_page_name(numero)}">{_t("Página {} (cards {}–{})").format(numero, primeiro, ultimo)}</a></li>'
+        for numero, primeiro, ultimo in paginas
+    )
+    aviso = "" if concluida else f'<p><i>{_t("Exportação em andamento...")}</i></p>'
+    with open(os.path.join(pasta, "index.html"), 'w', encoding='utf-8') as f:
+        f.write(f"<html><head><meta charset='utf-8'><title>{_t('Cards Exportados')}</title></head>"
+                f"<body><h1>{_t('Cards Exportados')}</h1>{aviso}<ol>{itens}</ol></body></html>")
+
+def write_paginated_export(self, translator, pasta, cards_por_pagina, arquivos_midia, all_ords=False, stats=None,
+                           ao_primeira_pagina=None, buffer_size=1024 * 1024, layout=None, cache=False,
+                           progresso=None):
+    """Exporta em páginas de cards_por_pagina cards (page-0001.html...) com index.html e navegação.
+
+    Cada página é gravada enquanto os cards são renderizados e fechada quando o primeiro card
+    da seguinte chega (assim se sabe se ela tem "Próxima"); ao_primeira_pagina(caminho) é chamado
+    assim que a primeira página fica pronta. A mídia vai para media/ (nomes acumulados em
+    arquivos_midia). layout segue para get_common_css (ver _iter_export_head); cache como em
+    iter_export_html e progresso como em _iter_export_cards. Devolve {'bytes', 'cards',
+    'segundos', 'paginas', 'do_cache', 'cancelado'} ou None; se cancelada, a última página fica incompleta.
+    """
+    _t = translator
+    fonte = _export_source(self, translator)
+    if fonte is None:
+        return None
+    contador = {'cards': 0, 'cache': 0}
+    inicio = time.perf_counter()
+    registro = new_media_registry()
+    resolver = media_folder_resolver(arquivos_midia)
+    # Em pasta a mídia vai para media/ e o registro fica vazio: o cabeçalho é curto e se repete em cada página
+    cabecalho = "".join(_iter_export_head(fonte[0], resolver, registro, True, layout=layout))
+
+    paginas = []
+    estado = {'arquivo': None, 'numero': 0, 'cards': 0, 'escritos': 0, 'bytes': 0}
+
+    def escrever(texto):
+        dados = texto.encode('utf-8')
+        estado['arquivo'].write(dados)
+        estado['bytes'] += len(dados)
+
+    def fechar_pagina(proxima):
+        escrever("</div>" + _page_nav(_t, estado['numero'], proxima) + _export_tail())
+        estado['arquivo'].close()
+        estado['arquivo'] = None
+        paginas.append((estado['numero'], estado['escritos'] - estado['cards'] + 1, estado['escritos']))
+        _write_page_index(_t, pasta, paginas, concluida=not proxima)
+        if estado['numero'] == 1 and ao_primeira_pagina:
+            ao_primeira_pagina(os.path.join(pasta, _page_name(1)))
+
+    try:
+        for card_html in _iter_export_cards(self, translator, fonte, resolver, registro, True, all_ords, stats, contador, cache,
+                                            progresso):
+            if estado['arquivo'] is not None and estado['cards'] >= cards_por_pagina:
+                fechar_pagina(proxima=True)
+            if estado['arquivo'] is None:
+                estado['numero'] += 1
+                estado['cards'] = 0
+                estado['arquivo'] = open(os.path.join(pasta, _page_name(estado['numero'])), 'wb', buffering=buffer_size)
+                escrever(cabecalho + _page_nav(_t, estado['numero'], False)
+                         + f'<h1>{_t("Cards Exportados")} — {_t("Página {}").format(estado["numero"])}</h1><div class="card-container">')
+            escrever(card_html)
+            estado['cards'] += 1
+            estado['escritos'] += 1
+        if estado['arquivo'] is not None and not contador.get('cancelado'):
+            fechar_pagina(proxima=False)
+    finally:
+        if estado['arquivo'] is not None:
+            estado['arquivo'].close()
+
+    return {'bytes': estado['bytes'], 'cards': contador['cards'], 'segundos': time.perf_counter() - inicio, 'paginas': len(paginas),
+            'do_cache': contador['cache'], 'cancelado': contador.get('cancelado', False)}
\ No newline at end of file
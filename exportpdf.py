@@ -0,0 +1,254 @@
+# exportpdf.py
+
+import os
+import re
+import shutil
+import logging
+from aqt.qt import *
+from .webview_pool import shared_profile
+
+PDF_PAGE_SIZES = {
+    'A4': QPageSize.PageSizeId.A4,
+    'A3': QPageSize.PageSizeId.A3,
+    'A5': QPageSize.PageSizeId.A5,
+    'Letter': QPageSize.PageSizeId.Letter,
+    'Legal': QPageSize.PageSizeId.Legal,
+}
+
+def pdf_page_layout(page_size, margin_mm):
+    return QPageLayout(
+        QPageSize(PDF_PAGE_SIZES.get(page_size, QPageSize.PageSizeId.A4)),
+        QPageLayout.Orientation.Portrait,
+        QMarginsF(margin_mm, margin_mm, margin_mm, margin_mm),
+        QPageLayout.Unit.Millimeter,
+    )
+
+class PdfExporter(QObject):
+    """Imprime as páginas HTML da exportação em PDF, uma por vez, numa QWebEnginePage fora da tela.
+
+    Cada página (um lote de cards) vira um PDF parcial; no fim os parciais são concatenados
+    em destino (merge_pdfs) ou, se algum não puder ser lido, renomeados para destino-001.pdf...
+    ao_terminar(sucesso, arquivos) é chamado ao concluir, falhar ou cancelar.
+    """
+
+    def __init__(self, parent, translator, paginas, destino, page_size, margin_mm, ao_terminar):
+        super().__init__(parent)
+        self._t = translator
+        self.paginas = paginas
+        self.destino = destino
+        self.layout = pdf_page_layout(page_size, margin_mm)
+        self.ao_terminar = ao_terminar
+        self.parciais = []
+        self.indice = 0
+        # Só um Cancelar do usuário; falhas terminam com cancelado False e são avisadas
+        self.cancelado = False
+        self._terminado = False
+
+        self.page = QWebEnginePage(shared_profile(), self)
+        self.page.loadFinished.connect(self._on_load_finished)
+        self.page.pdfPrintingFinished.connect(self._on_pdf_finished)
+
+        self.progresso = QProgressDialog(self._t("Gerando PDF..."), self._t("Cancelar"), 0, len(paginas), parent)
+        self.progresso.setWindowModality(Qt.WindowModality.WindowModal)
+        self.progresso.setMinimumDuration(0)
+        self.progresso.canceled.connect(self.cancel)
+
+    def start(self):
+        self.progresso.setValue(0)
+        self._print_next()
+
+    def cancel(self):
+        # close() do QProgressDialog também emite canceled: depois do fim não é o usuário
+        if not self._terminado:
+            self.cancelado = True
+
+    def _print_next(self):
+        if self.cancelado:
+            self._finish(False)
+            return
+        if self.indice >= len(self.paginas):
+            self._finish(True)
+            return
+        self.progresso.setLabelText(self._t("Gerando PDF: lote {} de {}...").format(self.indice + 1, len(self.paginas)))
+        self.page.load(QUrl.fromLocalFile(self.paginas[self.indice]))
+
+    def _on_load_finished(self, ok):
+        if self.cancelado:
+            self._finish(False)
+            return
+        if not ok:
+            logging.error(f"Falha ao carregar {self.paginas[self.indice]} para o PDF")
+            self._finish(False)
+            return
+        parcial = os.path.splitext(self.paginas[self.indice])[0] + ".pdf"
+        # Dá um ciclo para imagens e scripts da página (mapa de mídia) assentarem antes de imprimir
+        QTimer.singleShot(200, lambda: self._print_loaded(parcial))
+
+    def _print_loaded(self, parcial):
+        if self.cancelado:
+            self._finish(False)
+        elif not self._terminado:
+            self.page.printToPdf(parcial, self.layout)
+
+    def _on_pdf_finished(self, caminho, sucesso):
+        if not sucesso:
+            logging.error(f"Falha ao imprimir {caminho}")
+            self._finish(False)
+            return
+        self.parciais.append(caminho)
+        self.indice += 1
+        self.progresso.setValue(self.indice)
+        self._print_next()
+
+    def _finish(self, sucesso):
+        if self._terminado:
+            return
+        self._terminado = True
+        self.progresso.canceled.disconnect(self.cancel)
+        self.progresso.close()
+        arquivos = []
+        if sucesso:
+            try:
+                arquivos = self._merge()
+            except Exception as e:
+                logging.error(f"Erro ao juntar os PDFs: {str(e)}")
+                sucesso = False
+        self.page.deleteLater()
+        self.ao_terminar(sucesso, arquivos)
+
+    def _merge(self):
+        if len(self.parciais) == 1:
+            shutil.move(self.parciais[0], self.destino)
+            return [self.destino]
+        try:
+            merge_pdfs(self.parciais, self.destino)
+            return [self.destino]
+        except ValueError as e:
+            logging.warning(f"PDFs não concatenados ({str(e)}); salvando um arquivo por lote")
+            if os.path.exists(self.destino):
+                os.remove(self.destino)
+        base = os.path.splitext(self.destino)[0]
+        arquivos = []
+        for numero, parcial in enumerate(self.parciais, start=1):
+            caminho = f"{base}-{numero:03d}.pdf"
+            shutil.move(parcial, caminho)
+            arquivos.append(caminho)
+        return arquivos
+
+# --- CONCATENAÇÃO DOS LOTES ---
+# Os lotes impressos pelo Chromium são PDFs simples: tabela xref clássica, sem criptografia nem
+# atualizações incrementais. Para juntá-los basta renumerar os objetos de cada um e pendurar as
+# árvores de páginas sob uma raiz nova. Qualquer outra estrutura levanta ValueError.
+
+_PDF_OBJ_RE = re.compile(rb'(\d+)\s+(\d+)\s+obj\b')
+_PDF_REF_RE = re.compile(rb'(\d+)\s+(\d+)\s+R\b')
+_PDF_STREAM_RE = re.compile(rb'\bstream\r?\n')
+
+def _pdf_objects(dados):
+    """Objetos em uso de um PDF ({número: corpo entre obj e endobj}) e os números do catálogo e do /Info."""
+    fim = dados.rfind(b'startxref')
+    startxref = re.match(rb'startxref\s+(\d+)', dados[fim:]) if fim >= 0 else None
+    if startxref is None:
+        raise ValueError("startxref não encontrado")
+    inicio_xref = int(startxref.group(1))
+    inicio_trailer = dados.find(b'trailer', inicio_xref)
+    if not dados.startswith(b'xref', inicio_xref) or inicio_trailer < 0:
+        raise ValueError("tabela xref em stream não é suportada")
+    trailer = dados[inicio_trailer:fim]
+    if b'/Encrypt' in trailer or b'/Prev' in trailer:
+        raise ValueError("PDF criptografado ou com atualização incremental")
+    raiz = re.search(rb'/Root\s+(\d+)\s+\d+\s+R', trailer)
+    if raiz is None:
+        raise ValueError("trailer sem /Root")
+    info = re.search(rb'/Info\s+(\d+)\s+\d+\s+R', trailer)
+
+    tokens = dados[inicio_xref + len(b'xref'):inicio_trailer].split()
+    posicoes = {}
+    i = 0
+    while i < len(tokens):
+        primeiro, quantidade = map(int, tokens[i:i + 2])
+        i += 2
+        if i + 3 * quantidade > len(tokens):
+            raise ValueError("tabela xref incompleta")
+        for numero in range(primeiro, primeiro + quantidade):
+            deslocamento, geracao, tipo = tokens[i:i + 3]
+            i += 3
+            if tipo == b'n':
+                if int(geracao) != 0:
+                    raise ValueError(f"objeto {numero} com geração {int(geracao)}")
+                posicoes[numero] = int(deslocamento)
+
+    # Cada objeto vai até o início do seguinte (ou da tabela xref)
+    limites = sorted([*posicoes.values(), inicio_xref, len(dados)])
+    seguinte = dict(zip(limites, limites[1:]))
+    objetos = {}
+    for numero, deslocamento in posicoes.items():
+        cabecalho = _PDF_OBJ_RE.match(dados, deslocamento)
+        if cabecalho is None or int(cabecalho.group(1)) != numero:
+            raise ValueError(f"objeto {numero} fora da posição indicada na xref")
+        corpo = dados[cabecalho.end():seguinte[deslocamento]].rstrip()
+        if not corpo.endswith(b'endobj'):
+            raise ValueError(f"objeto {numero} sem endobj")
+        objetos[numero] = corpo[:-len(b'endobj')]
+    return objetos, int(raiz.group(1)), int(info.group(1)) if info else None
+
+def _renumber(corpo, deslocamento):
+    """Soma deslocamento às referências "N G R" do objeto, sem tocar nos dados de um stream."""
+    def trocar(match):
+        return b'%d 0 R' % (int(match.group(1)) + deslocamento)
+    stream = _PDF_STREAM_RE.search(corpo)
+    if stream is None:
+        return _PDF_REF_RE.sub(trocar, corpo)
+    return _PDF_REF_RE.sub(trocar, corpo[:stream.start()]) + corpo[stream.start():]
+
+def merge_pdfs(parciais, destino):
+    """Concatena os PDFs parciais em destino, na ordem, lendo um de cada vez.
+
+    Levanta ValueError se algum parcial tiver uma estrutura que a concatenação não entende.
+    """
+    # 1 e 2 ficam para a nova árvore de páginas e o novo catálogo, gravados no fim
+    proximo_numero = 3
+    posicoes = {}
+    raizes = []
+    total_paginas = 0
+    with open(destino, 'wb') as saida:
+        saida.write(b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n')
+        for parcial in parciais:
+            with open(parcial, 'rb') as f:
+                objetos, catalogo, info = _pdf_objects(f.read())
+            paginas = re.search(rb'/Pages\s+(\d+)\s+\d+\s+R', objetos.get(catalogo, b''))
+            if paginas is None or int(paginas.group(1)) not in objetos:
+                raise ValueError(f"{parcial}: catálogo sem árvore de páginas")
+            raiz = int(paginas.group(1))
+            contagem = re.search(rb'/Count\s+(\d+)', objetos[raiz])
+            if contagem is None:
+                raise ValueError(f"{parcial}: árvore de páginas sem /Count")
+            deslocamento = proximo_numero
+            for numero, corpo in objetos.items():
+                # O catálogo e o /Info de cada lote são substituídos pelos do arquivo final
+                if numero in (catalogo, info):
+                    continue
+                corpo = _renumber(corpo, deslocamento)
+                if numero == raiz:
+                    corpo = corpo.replace(b'<<', b'<</Parent 1 0 R', 1)
+                posicoes[numero + deslocamento] = saida.tell()
+                saida.write(b'%d 0 obj' % (numero + deslocamento) + corpo + b'\nendobj\n')
+            raizes.append(raiz + deslocamento)
+            total_paginas += int(contagem.group(1))
+            proximo_numero = deslocamento + max(objetos) + 1
+
+        posicoes[1] = saida.tell()
+        filhos = b' '.join(b'%d 0 R' % r for r in raizes)
+        saida.write(b'1 0 obj\n<</Type /Pages /Kids [%s] /Count %d>>\nendobj\n' % (filhos, total_paginas))
+        posicoes[2] = saida.tell()
+        saida.write(b'2 0 obj\n<</Type /Catalog /Pages 1 0 R>>\nendobj\n')
+
+        inicio_xref = saida.tell()
+        linhas = [b'xref\n0 %d\n' % proximo_numero, b'0000000000 65535 f \n']
+        for numero in range(1, proximo_numero):
+            if numero in posicoes:
+                linhas.append(b'%010d 00000 n \n' % posicoes[numero])
+            else:
+                linhas.append(b'0000000000 00001 f \n')
+        saida.write(b''.join(linhas))
+        saida.write(b'trailer\n<</Size %d /Root 2 0 R>>\nstartxref\n%d\n%%%%EOF\n' % (proximo_numero, inicio_xref))
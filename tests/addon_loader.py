@@ -0,0 +1,24 @@
+# addon_loader.py
+
+import sys
+import types
+import importlib
+from pathlib import Path
+
+# Carrega módulos do add-on fora do Anki sem executar o __init__.py (que monta menus na janela
+# principal): um pacote vazio aponta para a pasta do add-on e os imports relativos funcionam.
+PACOTE = "delimitadores_addon"
+RAIZ = Path(__file__).resolve().parent.parent
+
+def load_addon_module(nome):
+    # Mesma ordem do Anki: anki.cards sozinho cai num import circular
+    importlib.import_module("anki.collection")
+    # O Anki define o idioma ao iniciar; sem isso strip_html e afins não têm backend
+    lang = importlib.import_module("anki.lang")
+    if lang.current_i18n is None:
+        lang.set_lang("en_US")
+    if PACOTE not in sys.modules:
+        pacote = types.ModuleType(PACOTE)
+        pacote.__path__ = [str(RAIZ)]
+        sys.modules[PACOTE] = pacote
+    return importlib.import_module(f"{PACOTE}.{nome}")
@@ -0,0 +1,55 @@
+# bench_make_ids_unique.py
+#
+# Compara make_ids_unique com a versão anterior, que rodava três re.sub por id sobre o texto
+# inteiro (O(ids × tamanho)). Uso, com o Anki instalado no Python em uso:
+#     python tests/bench_make_ids_unique.py
+
+import re
+import sys
+import timeit
+
+from addon_loader import load_addon_module
+
+make_ids_unique = load_addon_module("exporthtml").make_ids_unique
+
+
+def make_ids_unique_antigo(html_content, css_content, card_id):
+    """Versão anterior, mantida só para comparação."""
+    suffix = f"_{card_id}"
+    ids_to_replace = set(re.findall(r'id\s*=\s*["\']([^"\']+)["\']', html_content))
+    for original_id in ids_to_replace:
+        new_id = f"{original_id}{suffix}"
+        html_content = re.sub(f'id\\s*=\\s*(["\']){re.escape(original_id)}\\1', f'id="{new_id}"', html_content)
+        html_content = re.sub(f'getElementById\\s*\\(\\s*(["\']){re.escape(original_id)}\\1\\s*\\)', f'getElementById("{new_id}")', html_content)
+        css_content = re.sub(f'#{re.escape(original_id)}(?![-_a_zA-Z0-9])', f'#{new_id}', css_content)
+    return html_content, css_content
+
+
+def card_sintetico(n_ids, repeticoes_texto):
+    """Card com n_ids elementos, um script que busca cada um e um seletor CSS por id."""
+    corpo = "".join(f'<div id="el{i}" class="c">texto {i}</div>' for i in range(n_ids))
+    script = "".join(f'document.getElementById("el{i}").hidden = false;' for i in range(n_ids))
+    enchimento = "<p>" + "lorem ipsum dolor sit amet " * repeticoes_texto + "</p>"
+    css = "".join(f"#el{i} {{ color: red; }}\n" for i in range(n_ids))
+    return f"{corpo}{enchimento}<script>{script}</script>", css
+
+
+def medir(func, html, css, repeticoes):
+    return min(timeit.repeat(lambda: func(html, css, 42), number=repeticoes, repeat=5)) / repeticoes
+
+
+def main():
+    print(f"{'ids':>5} {'KB':>7} {'antigo (ms)':>12} {'atual (ms)':>11} {'ganho':>7}")
+    for n_ids, repeticoes_texto in [(1, 50), (10, 200), (50, 1000), (200, 2000), (1000, 4000)]:
+        html, css = card_sintetico(n_ids, repeticoes_texto)
+        # Sem data-id, for= ou querySelector as duas versões devem produzir o mesmo texto
+        if make_ids_unique(html, css, 42) != make_ids_unique_antigo(html, css, 42):
+            sys.exit(f"saídas diferentes com {n_ids} ids")
+        repeticoes = max(1, 2000 // (n_ids * 10))
+        antigo = medir(make_ids_unique_antigo, html, css, repeticoes) * 1000
+        atual = medir(make_ids_unique, html, css, repeticoes) * 1000
+        print(f"{n_ids:>5} {len(html) / 1024:>7.1f} {antigo:>12.3f} {atual:>11.3f} {antigo / atual:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# test_export_media.py
+
+import base64
+from types import SimpleNamespace
+
+import pytest
+
+# Sem o Anki (ou com um aqt que não carrega, como sem as libs do Qt WebEngine) os testes são pulados
+pytest.importorskip("aqt", exc_type=ImportError)
+
+from addon_loader import load_addon_module
+
+exporthtml = load_addon_module("exporthtml")
+
+MODELO = {'id': 55, 'css': '.card { background: url("fundo.png"); } .x { background: url(\'fundo.png\'); }'}
+
+
+@pytest.fixture
+def pasta_midia(tmp_path, monkeypatch):
+    (tmp_path / "fundo.png").write_bytes(b"\x89PNG fundo")
+    (tmp_path / "foto.png").write_bytes(b"\x89PNG foto")
+    mw = SimpleNamespace(col=SimpleNamespace(media=SimpleNamespace(dir=lambda: str(tmp_path))),
+                         baseHTML=lambda: "")
+    monkeypatch.setattr(exporthtml, "mw", mw)
+    return tmp_path
+
+
+def exportar_arquivo_unico(card_html):
+    """Monta o documento na mesma ordem de iter_export_html, sem passar pela coleção."""
+    registro = exporthtml.new_media_registry()
+    resolver = exporthtml.media_registry_resolver(registro)
+    cabecalho = "".join(exporthtml._iter_export_head(MODELO, resolver, registro, False))
+    card = exporthtml._postprocess_card(card_html, MODELO['css'], "nt-55", 1, {}, resolver, False)
+    midia = "".join(exporthtml.iter_media_registry(registro))
+    return cabecalho + midia + card + exporthtml._export_tail()
+
+
+def test_arquivo_unico_nao_deixa_marcadores_dmhash(pasta_midia):
+    documento = exportar_arquivo_unico('<div id="a"><img src="foto.png"></div><script></script>')
+    assert "dmhash:" not in documento
+    assert documento.count("var(--dm-") == 2
+    assert 'data-media="' in documento
+
+
+def test_css_do_modelo_usa_a_mesma_midia_dos_cards(pasta_midia):
+    documento = exportar_arquivo_unico('<img src="fundo.png">')
+    registrados = documento.count('__dm["')
+    assert registrados == 1
+
+
+def test_midia_grande_do_css_sai_em_blocos(pasta_midia, monkeypatch):
+    conteudo = bytes(range(256)) * 40
+    (pasta_midia / "fundo.png").write_bytes(conteudo)
+    monkeypatch.setattr(exporthtml, "MIDIA_STREAM_MIN", 1024)
+    monkeypatch.setattr(exporthtml, "BLOCO_BASE64", 3 * 256)
+    registro = exporthtml.new_media_registry()
+    pedacos = list(exporthtml._iter_export_head(MODELO, exporthtml.media_registry_resolver(registro), registro, False))
+    codificado = base64.b64encode(conteudo).decode('ascii')
+    assert max(len(p) for p in pedacos) < len(codificado)
+    assert codificado in "".join(pedacos)
+
+
+def test_data_url_em_blocos_igual_ao_arquivo_inteiro(pasta_midia, monkeypatch):
+    conteudo = bytes(range(256)) * 40
+    (pasta_midia / "fundo.png").write_bytes(conteudo)
+    (pasta_midia / "vazio.png").write_bytes(b"")
+    monkeypatch.setattr(exporthtml, "BLOCO_BASE64", 3 * 100)
+    esperado = "data:image/png;base64," + base64.b64encode(conteudo).decode('ascii')
+    assert exporthtml.media_to_data_url("fundo.png") == esperado
+    assert exporthtml.media_to_data_url("vazio.png") == "data:image/png;base64,"
+
+
+def test_exportacao_em_pasta_aponta_para_media(pasta_midia):
+    arquivos = set()
+    resolver = exporthtml.media_folder_resolver(arquivos)
+    cabecalho = "".join(exporthtml._iter_export_head(MODELO, resolver, exporthtml.new_media_registry(), True))
+    assert 'url("media/fundo.png")' in cabecalho
+    assert "dmhash:" not in cabecalho
+    assert arquivos == {"fundo.png"}
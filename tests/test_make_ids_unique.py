@@ -0,0 +1,68 @@
+# test_make_ids_unique.py
+
+import pytest
+
+# Sem o Anki (ou com um aqt que não carrega, como sem as libs do Qt WebEngine) os testes são pulados
+pytest.importorskip("aqt", exc_type=ImportError)
+
+from addon_loader import load_addon_module
+
+make_ids_unique = load_addon_module("exporthtml").make_ids_unique
+
+
+def test_sem_ids_devolve_o_mesmo_conteudo():
+    html, css = '<div class="a">#a</div>', "#a { color: red; }"
+    assert make_ids_unique(html, css, 7) == (html, css)
+
+
+def test_data_id_nao_e_reescrito():
+    html, _ = make_ids_unique('<div id="a" data-id="a" aria-id="a"></div>', "", 7)
+    assert html == '<div id="a_7" data-id="a" aria-id="a"></div>'
+
+
+def test_data_id_sozinho_nao_conta_como_id():
+    html = '<div data-id="a"></div><script>document.getElementById("a")</script>'
+    assert make_ids_unique(html, "#a {}", 7) == (html, "#a {}")
+
+
+def test_prefixos_ficam_separados_no_css():
+    _, css = make_ids_unique('<div id="a"></div>', "#a, #ab, #a-b, #a_b { x: 1 } #a:hover {}", 7)
+    assert css == "#a_7, #ab, #a-b, #a_b { x: 1 } #a_7:hover {}"
+
+
+def test_prefixos_ficam_separados_com_os_dois_ids():
+    html, css = make_ids_unique('<p id="a"></p><p id="ab"></p>', "#ab {} #a {} #abc {}", 7)
+    assert html == '<p id="a_7"></p><p id="ab_7"></p>'
+    assert css == "#ab_7 {} #a_7 {} #abc {}"
+
+
+def test_aspas_sao_normalizadas():
+    html, _ = make_ids_unique(
+        "<div id='a'></div><div id = \"b\"></div>"
+        "<script>getElementById('a'); getElementById( \"b\" )</script>", "", 7)
+    assert html == ('<div id="a_7"></div><div id="b_7"></div>'
+                    '<script>getElementById("a_7"); getElementById("b_7")</script>')
+
+
+def test_aspas_misturadas_nao_casam():
+    html = '<div id="a"></div><script>getElementById("a\')</script>'
+    assert make_ids_unique(html, "", 7)[0] == '<div id="a_7"></div><script>getElementById("a\')</script>'
+
+
+def test_for_de_label():
+    html, _ = make_ids_unique("<input id='a'><label for='a'></label><label for=\"x\"></label>", "", 7)
+    assert html == '<input id="a_7"><label for="a_7"></label><label for="x"></label>'
+
+
+def test_query_selector():
+    html, _ = make_ids_unique(
+        "<div id=\"a\"></div><script>querySelector('#a'); querySelectorAll(\"#a\"); "
+        "querySelector('#ab'); querySelector('.a')</script>", "", 7)
+    assert html == ('<div id="a_7"></div><script>querySelector("#a_7"); querySelectorAll("#a_7"); '
+                    "querySelector('#ab'); querySelector('.a')</script>")
+
+
+def test_ids_de_outro_card_nao_sao_tocados():
+    html, css = make_ids_unique('<div id="a"></div><a href="#b">b</a>', "#b {}", 7)
+    assert html == '<div id="a_7"></div><a href="#b">b</a>'
+    assert css == "#b {}"
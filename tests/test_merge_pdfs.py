@@ -0,0 +1,82 @@
+# test_merge_pdfs.py
+
+import re
+
+import pytest
+
+# Sem o Anki (ou com um aqt que não carrega, como sem as libs do Qt WebEngine) os testes são pulados
+pytest.importorskip("aqt", exc_type=ImportError)
+
+from addon_loader import load_addon_module
+
+exportpdf = load_addon_module("exportpdf")
+
+
+def escrever_pdf(caminho, textos):
+    """PDF mínimo com uma página por texto, no formato dos lotes (xref clássica)."""
+    n = len(textos)
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(n))
+    objetos = [b"<</Type /Catalog /Pages 2 0 R>>",
+               f"<</Type /Pages /Kids [{kids}] /Count {n}>>".encode()]
+    for i, texto in enumerate(textos):
+        conteudo = f"BT /F1 12 Tf 72 720 Td ({texto}) Tj ET".encode()
+        objetos.append(f"<</Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R>>".encode())
+        objetos.append(b"<</Length %d>>\nstream\n%s\nendstream" % (len(conteudo), conteudo))
+    objetos.append(b"<</Producer (teste)>>")
+    dados = bytearray(b"%PDF-1.4\n")
+    posicoes = []
+    for numero, corpo in enumerate(objetos, start=1):
+        posicoes.append(len(dados))
+        dados += b"%d 0 obj\n%s\nendobj\n" % (numero, corpo)
+    inicio_xref = len(dados)
+    dados += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    dados += b"".join(b"%010d 00000 n \n" % p for p in posicoes)
+    dados += b"trailer\n<</Size %d /Root 1 0 R /Info %d 0 R>>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objetos) + 1, len(objetos), inicio_xref)
+    caminho.write_bytes(bytes(dados))
+    return caminho
+
+
+def textos_das_paginas(caminho):
+    """Percorre a árvore de páginas do PDF e devolve o texto de cada página, na ordem."""
+    objetos, catalogo, _ = exportpdf._pdf_objects(caminho.read_bytes())
+    ref = lambda chave, corpo: int(re.search(rb"/" + chave + rb"\s+(\d+) 0 R", corpo).group(1))
+
+    def visitar(numero):
+        corpo = objetos[numero]
+        if b"/Type /Pages" in corpo:
+            filhos = re.search(rb"/Kids\s*\[([^\]]*)\]", corpo).group(1)
+            for filho in re.findall(rb"(\d+) 0 R", filhos):
+                yield from visitar(int(filho))
+        else:
+            yield re.search(rb"\((.*?)\) Tj", objetos[ref(b"Contents", corpo)]).group(1).decode()
+
+    return list(visitar(ref(b"Pages", objetos[catalogo])))
+
+
+def test_concatena_na_ordem(tmp_path):
+    lotes = [escrever_pdf(tmp_path / "a.pdf", ["a1"]),
+             escrever_pdf(tmp_path / "b.pdf", ["b1", "b2", "b3"]),
+             escrever_pdf(tmp_path / "c.pdf", ["c1", "c2"])]
+    destino = tmp_path / "final.pdf"
+    exportpdf.merge_pdfs([str(p) for p in lotes], str(destino))
+    assert textos_das_paginas(destino) == ["a1", "b1", "b2", "b3", "c1", "c2"]
+    raiz = exportpdf._pdf_objects(destino.read_bytes())[0][1]
+    assert b"/Count 6" in raiz
+
+
+def test_sub_arvores_apontam_para_a_nova_raiz(tmp_path):
+    lotes = [escrever_pdf(tmp_path / f"{i}.pdf", [f"p{i}"]) for i in range(3)]
+    destino = tmp_path / "final.pdf"
+    exportpdf.merge_pdfs([str(p) for p in lotes], str(destino))
+    objetos = exportpdf._pdf_objects(destino.read_bytes())[0]
+    sub_raizes = [corpo for numero, corpo in objetos.items() if numero != 1 and b"/Type /Pages" in corpo]
+    assert len(sub_raizes) == 3
+    assert all(corpo.lstrip().startswith(b"<</Parent 1 0 R") for corpo in sub_raizes)
+
+
+def test_estrutura_nao_suportada_levanta_value_error(tmp_path):
+    lote = tmp_path / "xref_stream.pdf"
+    lote.write_bytes(b"%PDF-1.5\n1 0 obj\n<</Type /XRef>>\nstream\n\nendstream\nendobj\nstartxref\n9\n%%EOF\n")
+    with pytest.raises(ValueError):
+        exportpdf.merge_pdfs([str(lote)], str(tmp_path / "final.pdf"))
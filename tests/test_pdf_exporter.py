@@ -0,0 +1,73 @@
+# test_pdf_exporter.py
+
+import pytest
+
+# Sem o Anki (ou com um aqt que não carrega, como sem as libs do Qt WebEngine) os testes são pulados
+pytest.importorskip("aqt", exc_type=ImportError)
+
+from aqt.qt import QApplication, QObject, QPushButton, QWidget, pyqtSignal
+
+from addon_loader import load_addon_module
+
+exportpdf = load_addon_module("exportpdf")
+
+
+class PaginaFalsa(QObject):
+    """Substitui a QWebEnginePage: os testes emitem os sinais à mão."""
+    loadFinished = pyqtSignal(bool)
+    pdfPrintingFinished = pyqtSignal(str, bool)
+
+    def __init__(self, perfil, parent):
+        super().__init__(parent)
+        self.carregadas = []
+
+    def load(self, url):
+        self.carregadas.append(url)
+
+    def printToPdf(self, caminho, layout):
+        pass
+
+
+@pytest.fixture
+def exportador(tmp_path, monkeypatch):
+    app = QApplication.instance() or QApplication([])
+    monkeypatch.setattr(exportpdf, "QWebEnginePage", PaginaFalsa)
+    monkeypatch.setattr(exportpdf, "shared_profile", lambda: None)
+    janela = QWidget()
+    resultados = []
+    paginas = [str(tmp_path / "page-0001.html"), str(tmp_path / "page-0002.html")]
+    exp = exportpdf.PdfExporter(janela, lambda s: s, paginas, str(tmp_path / "final.pdf"), "A4", 10,
+                                lambda sucesso, arquivos: resultados.append((sucesso, arquivos)))
+    exp.resultados = resultados
+    yield exp
+    janela.deleteLater()
+    app.processEvents()
+
+
+def test_falha_nao_vira_cancelamento(exportador):
+    exportador.start()
+    exportador._finish(False)
+    assert exportador.resultados == [(False, [])]
+    assert not exportador.cancelado
+
+
+def test_falha_ao_carregar_e_avisada(exportador):
+    exportador.start()
+    exportador.page.loadFinished.emit(False)
+    assert exportador.resultados == [(False, [])]
+    assert not exportador.cancelado
+
+
+def test_cancelar_do_usuario_e_registrado(exportador):
+    exportador.start()
+    exportador.progresso.findChild(QPushButton).click()
+    exportador.page.loadFinished.emit(True)
+    assert exportador.resultados == [(False, [])]
+    assert exportador.cancelado
+
+
+def test_termina_uma_vez_so(exportador):
+    exportador.start()
+    exportador._finish(False)
+    exportador._finish(False)
+    assert len(exportador.resultados) == 1
@@ -0,0 +1,86 @@
+# test_plan_readd.py
+
+import re
+
+import pytest
+
+# Sem o Anki (ou com um aqt que não carrega, como sem as libs do Qt WebEngine) os testes são pulados
+pytest.importorskip("aqt", exc_type=ImportError)
+
+from addon_loader import load_addon_module
+
+bulk_notes = load_addon_module("bulk_notes")
+
+
+class ColecaoFalsa:
+    """Só o que plan_readd usa: col.db.list devolve os ids consultados que ainda existem."""
+
+    def __init__(self, existentes):
+        self.db = self
+        self.existentes = set(existentes)
+
+    def list(self, sql):
+        return [nid for nid in map(int, re.findall(r"\d+", sql.split(" in ")[1])) if nid in self.existentes]
+
+
+def linha(frente, verso, tags=()):
+    return {'valores': {0: frente, 1: verso}, 'tags': list(tags)}
+
+
+def registrar(registro, row, nid):
+    registro[bulk_notes.row_hash(row)] = {'nid': nid, 'chave': bulk_notes.row_key(row)}
+
+
+def test_linha_alterada_atualiza_a_nota():
+    registro = {}
+    registrar(registro, linha("gato", "cat"), 100)
+    novas, alteradas, inalteradas = bulk_notes.plan_readd(ColecaoFalsa({100}), registro, [linha("gato", "kitty")])
+    assert (novas, inalteradas) == ([], 0)
+    assert [(row['valores'][1], nid) for row, nid, _ in alteradas] == [("kitty", 100)]
+
+
+def test_linha_inalterada_protege_a_nota_de_outra_com_mesma_chave():
+    registro = {}
+    a = linha("gato", "cat")
+    registrar(registro, a, 100)
+    b = linha("gato", "kitty")
+    novas, alteradas, inalteradas = bulk_notes.plan_readd(ColecaoFalsa({100}), registro, [a, b])
+    assert alteradas == []
+    assert novas == [b]
+    assert inalteradas == 1
+
+
+def test_chave_casada_nao_e_reaproveitada_por_outra_entrada():
+    registro = {}
+    a = linha("gato", "cat")
+    registrar(registro, a, 100)
+    registrar(registro, linha("gato", "felino"), 200)
+    b = linha("gato", "kitty")
+    novas, alteradas, _ = bulk_notes.plan_readd(ColecaoFalsa({100, 200}), registro, [a, b])
+    assert (novas, alteradas) == ([b], [])
+
+
+def test_chave_ambigua_vira_nota_nova():
+    registro = {}
+    registrar(registro, linha("gato", "cat"), 100)
+    registrar(registro, linha("gato", "felino"), 200)
+    b = linha("gato", "kitty")
+    novas, alteradas, _ = bulk_notes.plan_readd(ColecaoFalsa({100, 200}), registro, [b])
+    assert (novas, alteradas) == ([b], [])
+
+
+def test_uma_nota_so_recebe_uma_linha():
+    registro = {}
+    registrar(registro, linha("gato", "cat"), 100)
+    b, c = linha("gato", "kitty"), linha("gato", "felino")
+    novas, alteradas, _ = bulk_notes.plan_readd(ColecaoFalsa({100}), registro, [b, c])
+    assert [row for row, _, _ in alteradas] == [b]
+    assert novas == [c]
+
+
+def test_entradas_de_notas_apagadas_saem_do_registro():
+    registro = {}
+    registrar(registro, linha("gato", "cat"), 100)
+    novas, alteradas, _ = bulk_notes.plan_readd(ColecaoFalsa(set()), registro, [linha("gato", "kitty")])
+    assert registro == {}
+    assert len(novas) == 1 and alteradas == []
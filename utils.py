@@ -3,4 +3,9 @@
 import os
 
 # Caminho para o arquivo de configuração
-CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.json')
\ No newline at end of file
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.json')
+
+# Registro das linhas já importadas (hash do conteúdo -> id da nota criada)
+IMPORT_REGISTRY_FILE = os.path.join(os.path.dirname(__file__), 'imported_lines.json')
+# Cache em disco dos fragmentos de cards já processados pela exportação
+EXPORT_CACHE_FILE = os.path.join(os.path.dirname(__file__), 'export_cache.sqlite3')
\ No newline at end of file
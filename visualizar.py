@@ -2,13 +2,261 @@
 
 import os
 import re
+import json
+import urllib.parse
 import base64
 import html
+from collections import OrderedDict
 from aqt import mw
 from aqt.qt import *
+from aqt.operations import QueryOp
 from aqt.utils import showWarning, showInfo
-from aqt.webview import QWebEngineView
-from .exporthtml import embed_media_in_html, process_css_for_embedding, get_pure_back_content
+from .webview_pool import borrow_webview, return_webview
+from .exporthtml import embed_media_in_html, process_css_for_embedding, media_to_data_url, render_unsaved_note_cards
+
+# Quantos fragmentos renderizados ficam em memória e quantos vizinhos são pré-carregados
+MAX_PAGINAS_CACHE = 300
+PREFETCH_VIZINHOS = 3
+# Linhas renderizadas por operação em segundo plano no "Renderizar Todos"
+LOTE_RENDERIZAR_TODOS = 10
+
+def is_card_line(linha):
+    return bool(linha) and ";" in linha and any(c.isalpha() for c in linha)
+
+# Casca compartilhada: baseHTML e CSS entram uma vez por diálogo; cada card guarda só frente/verso.
+PAGINA_SHELL = """
+<html>
+<head>
+    <meta charset='utf-8'>
+    __BASE_HTML__
+    <style>
+        body {{ 
+            background-color: #F0F0F0; 
+            font-family: sans-serif; 
+            margin: 10px;
+            overflow: hidden; 
+        }}
+        .preview-scaler {{
+            transform: scale(0.55); 
+            transform-origin: top left;
+            width: 181.81%;
+            height: 181.81%;
+        }}
+        .card-preview-wrapper {{
+            background-color: #FFF; 
+            box-shadow: 0 2px 5px rgba(0,0,0,0.1); 
+            border-radius: 5px; 
+            padding: 15px; 
+            overflow-x: auto;
+        }}
+        .separator {{ border-top: 2px solid #EEE; margin: 15px 0; }}
+        __CSS__
+    </style>
+</head>
+<body>
+    <div class="preview-scaler">
+        <div class="card-preview-wrapper card">{frente}</div>
+        <div class="separator"></div>
+        <div class="card-preview-wrapper card">{verso}</div>
+    </div>
+</body>
+</html>
+"""
+
+# Marcador de mídia nos fragmentos, trocado pela data URL do registro só na hora de exibir
+_MEDIA_MARKER_RE = re.compile(r'dmedia:([^"\'\s>]+)')
+
+def media_marker(filename):
+    return "dmedia:" + urllib.parse.quote(filename.strip('\'"'))
+
+def build_page_shell(base_html, css):
+    """Monta a casca da página uma vez; o resultado recebe frente e verso com str.format."""
+    return PAGINA_SHELL.replace("__BASE_HTML__", base_html.replace("{", "{{").replace("}", "}}")).replace(
+        "__CSS__", css.replace("{", "{{").replace("}", "}}"))
+
+def render_card_page(col, contexto, linha, i, translator):
+    """Renderiza uma linha como fragmento compacto (frente e verso com marcadores de mídia); pode rodar em segundo plano."""
+    return render_card_page_status(col, contexto, linha, i, translator)[0]
+
+def render_card_page_status(col, contexto, linha, i, translator):
+    """Como render_card_page, mas devolve (fragmento, erro) para quem precisa marcar falhas.
+
+    A nota não é adicionada à coleção (nada de escrita nem de passos de desfazer enquanto
+    o usuário usa o Anki): os cards são renderizados a partir da nota em memória.
+    """
+    model = contexto['model']
+    field_mappings = contexto['field_mappings']
+    try:
+        note = col.new_note(model)
+        parts = re.split(r';(?=(?:[^"]*"[^"]*")*[^"]*$)', linha)
+
+        if not field_mappings:
+            for idx, field_content in enumerate(parts):
+                if idx < len(note.fields):
+                    note.fields[idx] = field_content.strip()
+        else:
+            field_names = [f['name'] for f in model['flds']]
+            for part_idx, field_content in enumerate(parts):
+                target_field_name = field_mappings.get(str(part_idx))
+                if target_field_name and target_field_name in field_names:
+                    field_idx = field_names.index(target_field_name)
+                    note.fields[field_idx] = field_content.strip()
+
+        # Só o ordinal escolhido é renderizado; os demais ficam para quando forem pedidos
+        ords, renderizados = render_unsaved_note_cards(note, contexto['deck_id'], ords={contexto['ord']})
+        if not renderizados:
+            aviso = translator('Esta nota não gera o card {}.').format(contexto['ord'] + 1)
+            return {'frente': aviso, 'verso': '', 'ords': ords, 'ms': 0.0}, None
+        _, raw_front_html, raw_back_html, ms = renderizados[0]
+
+        return {
+            'frente': embed_media_in_html(raw_front_html, note, resolver=media_marker),
+            'verso': embed_media_in_html(raw_back_html, note, resolver=media_marker),
+            'ords': ords,
+            'ms': ms,
+        }, None
+
+    except Exception as e:
+        erro_html = translator('Erro ao renderizar card {}:<br><pre>{}</pre>').format(i+1, html.escape(str(e)))
+        return {'erro': erro_html}, str(e)
+
+# Página da galeria: grade virtualizada com um conjunto fixo de blocos reciclados durante a rolagem.
+# Cada bloco usa um iframe (srcdoc) para isolar o CSS do card; o conteúdo é pedido via
+# IntersectionObserver e buscado pelo Python com __galeriaTake(), que responde com __galeriaSet().
+GALERIA_HTML = """
+<html>
+<head>
+<meta charset='utf-8'>
+<style>
+    html, body { margin: 0; height: 100%; background-color: #E8E8E8; font-family: sans-serif; }
+    #viewport { position: absolute; top: 0; right: 0; bottom: 0; left: 0; overflow-y: auto; }
+    #spacer { position: relative; }
+    .tile {
+        position: absolute; width: __TW__px; height: __TH__px; overflow: hidden;
+        background-color: #FFF; box-shadow: 0 2px 5px rgba(0,0,0,0.1); border-radius: 5px;
+    }
+    .tile.selecionado { outline: 3px solid #3A7BD5; }
+    .tile .rotulo { height: 20px; line-height: 20px; padding: 0 6px; font-size: 12px; background-color: #DDD; }
+    .tile iframe { position: absolute; top: 20px; left: 0; width: 100%; height: calc(100% - 20px); border: 0; }
+    .tile .capa { position: absolute; top: 0; right: 0; bottom: 0; left: 0; cursor: pointer; }
+</style>
+</head>
+<body>
+<div id="viewport"><div id="spacer"></div></div>
+<script>
+(function () {
+    const TOTAL = __TOTAL__, TW = __TW__, TH = __TH__, GAP = 12, MAX_CACHE = 200;
+    const viewport = document.getElementById('viewport');
+    const spacer = document.getElementById('spacer');
+    const cache = new Map();
+    const pendentes = new Set();
+    const pool = [];
+    let colunas = 1, selecionado = -1, clique = null, agendado = false;
+
+    const observer = new IntersectionObserver(function (entries) {
+        for (const entry of entries) {
+            const i = +entry.target.dataset.index;
+            if (entry.isIntersecting && i >= 0 && !cache.has(i)) pendentes.add(i);
+        }
+    }, { root: viewport, rootMargin: '300px 0px' });
+
+    function novoTile() {
+        const tile = document.createElement('div');
+        tile.className = 'tile';
+        tile.dataset.index = -1;
+        tile.innerHTML = '<div class="rotulo"></div><iframe></iframe><div class="capa"></div>';
+        tile.addEventListener('click', function () { clique = +tile.dataset.index; });
+        spacer.appendChild(tile);
+        pool.push(tile);
+        return tile;
+    }
+
+    function posicionar(tile, i) {
+        tile.dataset.index = i;
+        tile.style.display = '';
+        tile.style.left = (GAP + (i % colunas) * (TW + GAP)) + 'px';
+        tile.style.top = (GAP + Math.floor(i / colunas) * (TH + GAP)) + 'px';
+        tile.querySelector('.rotulo').textContent = 'Card ' + (i + 1);
+        tile.querySelector('iframe').srcdoc = cache.get(i) || '';
+        tile.classList.toggle('selecionado', i === selecionado);
+        // Reobserva para receber a interseção na nova posição
+        observer.unobserve(tile);
+        observer.observe(tile);
+    }
+
+    function desenhar() {
+        agendado = false;
+        const linhaAltura = TH + GAP;
+        const primeira = Math.max(0, (Math.floor(viewport.scrollTop / linhaAltura) - 1) * colunas);
+        const ultima = Math.min(TOTAL, (Math.ceil((viewport.scrollTop + viewport.clientHeight) / linhaAltura) + 1) * colunas);
+        const livres = [];
+        const ocupados = new Set();
+        for (const tile of pool) {
+            const i = +tile.dataset.index;
+            if (i >= primeira && i < ultima) ocupados.add(i);
+            else livres.push(tile);
+        }
+        for (let i = primeira; i < ultima; i++) {
+            if (ocupados.has(i)) continue;
+            posicionar(livres.pop() || novoTile(), i);
+        }
+        for (const tile of livres) {
+            tile.dataset.index = -1;
+            tile.style.display = 'none';
+            tile.querySelector('iframe').srcdoc = '';
+        }
+    }
+
+    function agendar() {
+        if (!agendado) { agendado = true; requestAnimationFrame(desenhar); }
+    }
+
+    function layout() {
+        const novas = Math.max(1, Math.floor((viewport.clientWidth - GAP) / (TW + GAP)));
+        if (novas !== colunas) {
+            colunas = novas;
+            for (const tile of pool) tile.dataset.index = -1;
+        }
+        spacer.style.height = (GAP + Math.ceil(TOTAL / colunas) * (TH + GAP)) + 'px';
+        agendar();
+    }
+
+    window.__galeriaTake = function () {
+        const pedidos = Array.from(pendentes).filter(function (i) { return !cache.has(i); });
+        pendentes.clear();
+        const resultado = JSON.stringify({ pedidos: pedidos, clique: clique });
+        clique = null;
+        return resultado;
+    };
+
+    window.__galeriaSet = function (i, html) {
+        cache.delete(i);
+        cache.set(i, html);
+        if (cache.size > MAX_CACHE) cache.delete(cache.keys().next().value);
+        for (const tile of pool) {
+            if (+tile.dataset.index === i) tile.querySelector('iframe').srcdoc = html;
+        }
+    };
+
+    window.__galeriaSelect = function (i) {
+        selecionado = i;
+        for (const tile of pool) tile.classList.toggle('selecionado', +tile.dataset.index === i);
+        const topo = GAP + Math.floor(i / colunas) * (TH + GAP);
+        if (topo < viewport.scrollTop || topo + TH > viewport.scrollTop + viewport.clientHeight) {
+            viewport.scrollTop = topo - GAP;
+        }
+    };
+
+    viewport.addEventListener('scroll', agendar, { passive: true });
+    window.addEventListener('resize', layout);
+    layout();
+})();
+</script>
+</body>
+</html>
+"""
+GALERIA_TILE_LARGURA = 260
+GALERIA_TILE_ALTURA = 300
 
 class ForceLabelButton(QPushButton):
     def __init__(self, text, text_color=Qt.GlobalColor.black, parent=None):
@@ -31,10 +279,24 @@ class VisualizarCards(QDialog):
         super().__init__(None, Qt.WindowType.Window | Qt.WindowType.WindowMinimizeButtonHint | Qt.WindowType.WindowCloseButtonHint | Qt.WindowType.WindowMaximizeButtonHint)
         self.parent = parent
         self._t = translator  # Armazena a função de tradução
-        self.cards_preview_list = []
+        self.linhas = []
+        self.render_context = None
+        self.paginas_cache = OrderedDict()  # índice da linha -> página HTML renderizada (LRU)
+        self._render_fila = []
+        self._renderizando = []
+        self._fechado = False
+        self.cards_preview_list = []  # fragmentos do "Renderizar Todos", na ordem da lista
+        self.media_registry = {}  # nome do arquivo -> data URL, lido uma única vez
+        self._render_todos_ativo = False
+        self._render_todos_cancelado = False
+        self.galeria_ativa = False
+        self._galeria_timer = QTimer(self)
+        self._galeria_timer.setInterval(150)
+        self._galeria_timer.timeout.connect(self._poll_gallery)
         self.cards_visible = True
         self.setup_ui()
-        self.view_cards_dialog()
+        # False quando não há o que visualizar: o diálogo já foi fechado e não deve ser exibido
+        self.valido = self.view_cards_dialog()
 
     def setup_ui(self):
         self.setWindowTitle(self._t("Visualizar Todos os Cards"))
@@ -46,7 +308,26 @@ class VisualizarCards(QDialog):
         self.toggle_cards_button = QPushButton(self._t("Ocultar Lista"), self)
         self.toggle_cards_button.clicked.connect(self.toggle_cards_visibility)
         top_controls_layout.addWidget(self.toggle_cards_button)
+        self.render_all_button = QPushButton(self._t("Renderizar Todos"), self)
+        self.render_all_button.clicked.connect(self.toggle_render_all)
+        top_controls_layout.addWidget(self.render_all_button)
+        self.render_all_progress = QProgressBar(self)
+        self.render_all_progress.setMaximumWidth(200)
+        self.render_all_progress.setVisible(False)
+        top_controls_layout.addWidget(self.render_all_progress)
+        self.gallery_button = QPushButton(self._t("Galeria"), self)
+        self.gallery_button.setCheckable(True)
+        self.gallery_button.toggled.connect(self.toggle_gallery)
+        top_controls_layout.addWidget(self.gallery_button)
+        self.ord_combo = QComboBox(self)
+        self.ord_combo.setToolTip(self._t("Card da nota a visualizar"))
+        self.ord_combo.currentIndexChanged.connect(self.on_ord_changed)
+        top_controls_layout.addWidget(self.ord_combo)
+        self.render_ms_label = QLabel("", self)
+        top_controls_layout.addWidget(self.render_ms_label)
         top_controls_layout.addStretch()
+        self.memoria_label = QLabel("", self)
+        top_controls_layout.addWidget(self.memoria_label)
         
         zoom_in_button = ForceLabelButton("+", parent=self)
         zoom_in_button.setFixedSize(30, 30)
@@ -70,14 +351,10 @@ class VisualizarCards(QDialog):
         self.card_list_widget.setMinimumWidth(100)
         self.splitter.addWidget(self.card_list_widget)
         
-        self.card_preview_webview = QWebEngineView()
-        settings = self.card_preview_webview.settings()
-        for attr in [QWebEngineSettings.WebAttribute.LocalContentCanAccessFileUrls, 
-                     QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, 
-                     QWebEngineSettings.WebAttribute.AllowRunningInsecureContent]:
-            settings.setAttribute(attr, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.PlaybackRequiresUserGesture, False)
+        # Webview emprestado do pool (já configurado); volta para o pool no closeEvent
+        self.card_preview_webview = borrow_webview()
         self.card_preview_webview.setMinimumWidth(300)
+        self.card_preview_webview.show()
         self.splitter.addWidget(self.card_preview_webview)
         
         self.splitter.setSizes([200, 600])
@@ -90,133 +367,338 @@ class VisualizarCards(QDialog):
     def zoom_out(self):
         self.card_preview_webview.setZoomFactor(max(0.1, self.card_preview_webview.zoomFactor() - 0.1))
 
-    def generate_card_previews(self):
-        cards_preview_list = []
-        
+    def _parse_lines(self):
+        """Separa as linhas válidas do editor sem renderizar nada (lista preenchida na hora)."""
         linhas = self.parent.txt_entrada.toPlainText().strip().split('\n')
+        return [linha.strip() for linha in linhas if is_card_line(linha.strip())]
+
+    def _render_context(self):
+        """Dados do tipo de nota/deck lidos no thread principal e usados pelas renderizações em segundo plano."""
         if not self.parent.lista_notetypes.currentItem() or not self.parent.lista_decks.currentItem():
-            return []
-            
+            return None
         model = mw.col.models.by_name(self.parent.lista_notetypes.currentItem().text())
-        deck_id = mw.col.decks.id_for_name(self.parent.lista_decks.currentItem().text())
-        field_mappings = self.parent.field_mappings
-
-        mw.progress.start(label=self._t("Renderizando pré-visualização dos cards..."), max=len(linhas))
-
-        for i, linha in enumerate(linhas):
-            mw.progress.update(value=i + 1)
-            linha = linha.strip()
-            if not linha or ";" not in linha or not any(c.isalpha() for c in linha):
-                continue
-            
-            note = None
-            try:
-                note = mw.col.new_note(model)
-                parts = re.split(r';(?=(?:[^"]*"[^"]*")*[^"]*$)', linha)
-                
-                if not field_mappings:
-                    for idx, field_content in enumerate(parts):
-                        if idx < len(note.fields):
-                            note.fields[idx] = field_content.strip()
-                else:
-                    field_names = [f['name'] for f in model['flds']]
-                    for part_idx, field_content in enumerate(parts):
-                        target_field_name = field_mappings.get(str(part_idx))
-                        if target_field_name and target_field_name in field_names:
-                            field_idx = field_names.index(target_field_name)
-                            note.fields[field_idx] = field_content.strip()
-
-                mw.col.add_note(note, deck_id)
-                card = note.cards()[0]
-
-                raw_front_html = card.render_output(True, False).question_text
-                raw_back_html = get_pure_back_content(card)
-                raw_css = note.model().get("css", "")
-
-                processed_front = embed_media_in_html(raw_front_html, note)
-                processed_back = embed_media_in_html(raw_back_html, note)
-                processed_css = process_css_for_embedding(raw_css)
-
-                final_html = f"""
-                <html>
-                <head>
-                    <meta charset='utf-8'>
-                    {mw.baseHTML()}
-                    <style>
-                        body {{ 
-                            background-color: #F0F0F0; 
-                            font-family: sans-serif; 
-                            margin: 10px;
-                            overflow: hidden; 
-                        }}
-                        .preview-scaler {{
-                            transform: scale(0.55); 
-                            transform-origin: top left;
-                            width: 181.81%;
-                            height: 181.81%;
-                        }}
-                        .card-preview-wrapper {{
-                            background-color: #FFF; 
-                            box-shadow: 0 2px 5px rgba(0,0,0,0.1); 
-                            border-radius: 5px; 
-                            padding: 15px; 
-                            overflow-x: auto;
-                        }}
-                        .separator {{ border-top: 2px solid #EEE; margin: 15px 0; }}
-                        {processed_css}
-                    </style>
-                </head>
-                <body>
-                    <div class="preview-scaler">
-                        <div class="card-preview-wrapper card">{processed_front}</div>
-                        <div class="separator"></div>
-                        <div class="card-preview-wrapper card">{processed_back}</div>
-                    </div>
-                </body>
-                </html>
-                """
-                cards_preview_list.append(final_html)
-
-            except Exception as e:
-                error_html = f"<html><body>{self._t('Erro ao renderizar card {}:<br><pre>{}</pre>').format(i+1, html.escape(str(e)))}</body></html>"
-                cards_preview_list.append(error_html)
-            
-            finally:
-                if note and note.id:
-                    mw.col.remove_notes([note.id])
-        
-        mw.progress.finish()
-        return cards_preview_list
+        return {
+            'model': model,
+            'deck_id': mw.col.decks.id_for_name(self.parent.lista_decks.currentItem().text()),
+            'field_mappings': dict(self.parent.field_mappings),
+            'shell': build_page_shell(mw.baseHTML(), process_css_for_embedding(model.get("css", ""))),
+            'ord': self.ord_combo.currentData() or 0,
+        }
+
+    def toggle_render_all(self):
+        if self._render_todos_ativo:
+            self._render_todos_cancelado = True
+            self.render_all_button.setEnabled(False)
+        else:
+            self.generate_card_previews()
+
+    def generate_card_previews(self):
+        """Renderiza todas as linhas em segundo plano, acrescentando "Card N" à lista conforme cada uma termina."""
+        if self._render_todos_ativo or not self.linhas or not self.render_context:
+            return
+        self._render_todos_ativo = True
+        self._render_todos_cancelado = False
+        self.cards_preview_list = []
+        self.card_list_widget.clear()
+        self.render_all_button.setText(self._t("Cancelar"))
+        self.render_all_progress.setRange(0, len(self.linhas))
+        self.render_all_progress.setValue(0)
+        self.render_all_progress.setVisible(True)
+        self.ord_combo.setEnabled(False)
+        self._render_next_chunk()
+
+    def _render_next_chunk(self):
+        inicio = len(self.cards_preview_list)
+        if self._fechado or self._render_todos_cancelado or inicio >= len(self.linhas):
+            self._finish_render_all()
+            return
+        lote = list(enumerate(self.linhas[inicio:inicio + LOTE_RENDERIZAR_TODOS], start=inicio))
+        contexto = dict(self.render_context)
+
+        def op(col):
+            resultados = []
+            for i, linha in lote:
+                if self._render_todos_cancelado:
+                    break
+                resultados.append(render_card_page_status(col, contexto, linha, i, self._t))
+            return resultados
+
+        QueryOp(parent=self, op=op, success=self._on_chunk_rendered).failure(
+            lambda erro: self._finish_render_all()
+        ).run_in_background()
+
+    def _on_chunk_rendered(self, resultados):
+        if self._fechado:
+            return
+        for pagina, erro in resultados:
+            n = len(self.cards_preview_list) + 1
+            self.cards_preview_list.append(pagina)
+            if erro:
+                item = QListWidgetItem(self._t("Card {} (erro)").format(n))
+                item.setForeground(QColor("red"))
+                item.setToolTip(erro)
+            else:
+                item = QListWidgetItem(f"Card {n}")
+            self.card_list_widget.addItem(item)
+        if self.card_list_widget.currentRow() < 0 and self.card_list_widget.count():
+            self.card_list_widget.setCurrentRow(0)
+        self.render_all_progress.setValue(len(self.cards_preview_list))
+        self._update_memory_label()
+        self._render_next_chunk()
+
+    def _finish_render_all(self):
+        self._render_todos_ativo = False
+        if self._fechado:
+            return
+        if len(self.cards_preview_list) < len(self.linhas):
+            # Cancelado: as linhas restantes voltam a ser renderizadas sob demanda
+            self.card_list_widget.addItems([f"Card {i+1}" for i in range(len(self.cards_preview_list), len(self.linhas))])
+        self.render_all_button.setText(self._t("Renderizar Todos"))
+        self.render_all_button.setEnabled(True)
+        self.render_all_progress.setVisible(False)
+        self.ord_combo.setEnabled(True)
 
     def view_cards_dialog(self):
         if not self.parent.txt_entrada.toPlainText().strip():
             showWarning(self._t("Digite conteúdo para visualizar!"))
             self.close()
-            return
+            return False
         if not self.parent.lista_notetypes.currentItem():
             showWarning(self._t("Selecione um tipo de nota para visualizar!"))
             self.close()
-            return
-            
-        self.cards_preview_list = self.generate_card_previews()
-        
-        if not self.cards_preview_list:
+            return False
+
+        self.linhas = self._parse_lines()
+        self._fill_ord_combo()
+        self.render_context = self._render_context()
+
+        if not self.linhas or not self.render_context:
             showWarning(self._t("Nenhum card válido para visualizar!"))
             self.close()
-            return
-            
+            return False
+
         self.card_list_widget.clear()
-        self.card_list_widget.addItems([f"Card {i+1}" for i in range(len(self.cards_preview_list))])
-        if self.cards_preview_list:
-            self.card_list_widget.setCurrentRow(0)
+        self.card_list_widget.addItems([f"Card {i+1}" for i in range(len(self.linhas))])
+        self.card_list_widget.setCurrentRow(0)
+        return True
 
     def update_card_preview(self, current, previous):
-        if current:
-            index = self.card_list_widget.row(current)
-            if 0 <= index < len(self.cards_preview_list):
-                self.card_preview_webview.setHtml(self.cards_preview_list[index])
-        else:
+        if self.galeria_ativa:
+            if current:
+                self.card_preview_webview.page().runJavaScript(f"window.__galeriaSelect && __galeriaSelect({self.card_list_widget.row(current)})")
+            return
+        if not current:
             self.card_preview_webview.setHtml("")
+            return
+        index = self.card_list_widget.row(current)
+        if not 0 <= index < len(self.linhas):
+            return
+        if index < len(self.cards_preview_list):
+            self._show_fragment(self.cards_preview_list[index])
+            return
+        pagina = self._cached_page(index)
+        if pagina is not None:
+            self._show_fragment(pagina)
+        else:
+            self.card_preview_webview.setHtml(f"<html><body>{self._t('Renderizando card {}...').format(index + 1)}</body></html>")
+            self._request_render([index])
+        vizinhos = [i for d in range(1, PREFETCH_VIZINHOS + 1) for i in (index + d, index - d)]
+        self._request_render([i for i in vizinhos if 0 <= i < len(self.linhas)])
+
+    def _show_fragment(self, fragmento):
+        self.card_preview_webview.setHtml(self.assemble_page(fragmento))
+        self._extend_ord_combo(fragmento.get('ords', []))
+        if 'ms' in fragmento:
+            self.render_ms_label.setText(self._t("{:.0f} ms").format(fragmento['ms']))
+
+    def _fill_ord_combo(self):
+        """Preenche os ordinais pelo tipo de nota: modelos pelo nome, cloze conforme aparecem."""
+        self.ord_combo.blockSignals(True)
+        self.ord_combo.clear()
+        model = mw.col.models.by_name(self.parent.lista_notetypes.currentItem().text())
+        if model['type'] == 1:
+            self.ord_combo.addItem("Cloze 1", 0)
+        else:
+            for tmpl in model['tmpls']:
+                self.ord_combo.addItem(tmpl['name'], tmpl['ord'])
+        self.ord_combo.blockSignals(False)
+
+    def _extend_ord_combo(self, ords):
+        existentes = {self.ord_combo.itemData(i) for i in range(self.ord_combo.count())}
+        novos = [o for o in ords if o not in existentes]
+        if not novos or self.render_context['model']['type'] != 1:
+            return
+        self.ord_combo.blockSignals(True)
+        for o in sorted(existentes | set(novos)):
+            if o not in existentes:
+                posicao = sum(1 for e in existentes if e < o)
+                self.ord_combo.insertItem(posicao, f"Cloze {o + 1}", o)
+                existentes.add(o)
+        self.ord_combo.blockSignals(False)
+
+    def on_ord_changed(self, index):
+        """Troca o ordinal: o que foi renderizado para o anterior é descartado e refeito sob demanda."""
+        if index < 0 or not self.render_context:
+            return
+        self.render_context['ord'] = self.ord_combo.currentData()
+        self.paginas_cache.clear()
+        self._render_fila = []
+        if self.cards_preview_list:
+            self.cards_preview_list = []
+            self.card_list_widget.blockSignals(True)
+            atual = max(self.card_list_widget.currentRow(), 0)
+            self.card_list_widget.clear()
+            self.card_list_widget.addItems([f"Card {i+1}" for i in range(len(self.linhas))])
+            self.card_list_widget.setCurrentRow(atual)
+            self.card_list_widget.blockSignals(False)
+        if self.galeria_ativa:
+            self.toggle_gallery(True)
+        else:
+            self.update_card_preview(self.card_list_widget.currentItem(), None)
+        self._update_memory_label()
+
+    def _cached_page(self, index):
+        pagina = self.paginas_cache.get(index)
+        if pagina is not None:
+            self.paginas_cache.move_to_end(index)
+        return pagina
+
+    def _store_page(self, index, pagina):
+        self.paginas_cache[index] = pagina
+        self.paginas_cache.move_to_end(index)
+        while len(self.paginas_cache) > MAX_PAGINAS_CACHE:
+            self.paginas_cache.popitem(last=False)
+
+    def _request_render(self, indices):
+        """Enfileira renderizações; só uma operação em segundo plano roda por vez."""
+        for index in indices:
+            if index not in self.paginas_cache and index not in self._render_fila and index not in self._renderizando:
+                self._render_fila.append(index)
+        self._start_next_render()
+
+    def _start_next_render(self):
+        if self._renderizando or not self._render_fila or self._fechado:
+            return
+        # O card selecionado sempre passa na frente dos vizinhos
+        atual = self.card_list_widget.currentRow()
+        if atual in self._render_fila:
+            self._render_fila.remove(atual)
+            self._render_fila.insert(0, atual)
+        self._renderizando = self._render_fila[:PREFETCH_VIZINHOS]
+        del self._render_fila[:PREFETCH_VIZINHOS]
+        lote = [(i, self.linhas[i]) for i in self._renderizando]
+        contexto = dict(self.render_context)
+
+        def op(col):
+            return [(i, render_card_page(col, contexto, linha, i, self._t)) for i, linha in lote]
+
+        QueryOp(
+            parent=self, op=op, success=lambda paginas: self._on_pages_rendered(paginas, contexto['ord'])
+        ).failure(self._on_render_failed).run_in_background()
+
+    def _on_pages_rendered(self, paginas, ord_renderizado):
+        self._renderizando = []
+        if self._fechado:
+            return
+        if ord_renderizado != self.render_context['ord']:
+            # Renderizado para um ordinal que não está mais selecionado
+            self._start_next_render()
+            return
+        atual = self.card_list_widget.currentRow()
+        for index, pagina in paginas:
+            self._store_page(index, pagina)
+            if self.galeria_ativa:
+                self._push_gallery_page(index, pagina)
+            elif index == atual:
+                self._show_fragment(pagina)
+        self._update_memory_label()
+        if not self.galeria_ativa:
+            # Descarta vizinhos que ficaram longe da seleção atual
+            self._render_fila = [i for i in self._render_fila if abs(i - atual) <= PREFETCH_VIZINHOS]
+        self._start_next_render()
+
+    def _on_render_failed(self, erro):
+        self._renderizando = []
+        if not self._fechado:
+            self._start_next_render()
+
+    def toggle_gallery(self, ativa):
+        """Alterna entre o card selecionado e a galeria com todos os cards em miniatura."""
+        self.galeria_ativa = ativa
+        if ativa:
+            self._render_fila = []
+            self.card_preview_webview.setHtml(
+                GALERIA_HTML.replace("__TOTAL__", str(len(self.linhas)))
+                .replace("__TW__", str(GALERIA_TILE_LARGURA))
+                .replace("__TH__", str(GALERIA_TILE_ALTURA))
+            )
+            self._galeria_timer.start()
+        else:
+            self._galeria_timer.stop()
+            self._render_fila = []
+            self.update_card_preview(self.card_list_widget.currentItem(), None)
+
+    def _poll_gallery(self):
+        self.card_preview_webview.page().runJavaScript("window.__galeriaTake ? __galeriaTake() : null", self._on_gallery_requests)
+
+    def _on_gallery_requests(self, resultado):
+        if not resultado or not self.galeria_ativa or self._fechado:
+            return
+        dados = json.loads(resultado)
+        if dados['clique'] is not None and dados['clique'] < self.card_list_widget.count():
+            self.card_list_widget.setCurrentRow(dados['clique'])
+        faltando = []
+        for index in dados['pedidos']:
+            if index < len(self.cards_preview_list):
+                self._push_gallery_page(index, self.cards_preview_list[index])
+            elif index in self.paginas_cache:
+                self._push_gallery_page(index, self._cached_page(index))
+            elif 0 <= index < len(self.linhas):
+                faltando.append(index)
+        self._request_render(faltando)
+
+    def _push_gallery_page(self, index, pagina):
+        self.card_preview_webview.page().runJavaScript(f"window.__galeriaSet && __galeriaSet({index}, {json.dumps(self.assemble_page(pagina))})")
+
+    def assemble_page(self, fragmento):
+        """Monta a página completa de um fragmento só na hora de exibir."""
+        if 'erro' in fragmento:
+            return f"<html><body>{fragmento['erro']}</body></html>"
+        return self.render_context['shell'].format(
+            frente=self._resolve_media(fragmento['frente']),
+            verso=self._resolve_media(fragmento['verso']),
+        )
+
+    def _resolve_media(self, texto):
+        def replacer(match):
+            filename = urllib.parse.unquote(match.group(1))
+            if filename not in self.media_registry:
+                self.media_registry[filename] = media_to_data_url(filename) or filename
+            return self.media_registry[filename]
+        return _MEDIA_MARKER_RE.sub(replacer, texto)
+
+    def _update_memory_label(self):
+        fragmentos = list(self.cards_preview_list) + list(self.paginas_cache.values())
+        tamanho_fragmentos = sum(len(texto) for fragmento in fragmentos for texto in fragmento.values() if isinstance(texto, str))
+        tamanho_midia = sum(len(url) for url in self.media_registry.values())
+        tamanho_casca = len(self.render_context['shell']) if self.render_context else 0
+        self.memoria_label.setText(self._t("Memória: {} cards, {:.1f} MB (fragmentos {:.1f} MB, mídia {:.1f} MB, casca {:.1f} MB)").format(
+            len(fragmentos), (tamanho_fragmentos + tamanho_midia + tamanho_casca) / 1048576,
+            tamanho_fragmentos / 1048576, tamanho_midia / 1048576, tamanho_casca / 1048576))
+
+    def closeEvent(self, event):
+        self._fechado = True
+        self._galeria_timer.stop()
+        self._render_todos_cancelado = True
+        self._render_fila = []
+        self.cards_preview_list = []
+        self.paginas_cache.clear()
+        self.media_registry.clear()
+        if self.card_preview_webview is not None:
+            self.card_preview_webview.setMinimumWidth(0)
+            return_webview(self.card_preview_webview)
+            self.card_preview_webview = None
+        super().closeEvent(event)
 
     def toggle_cards_visibility(self):
         self.cards_visible = not self.cards_visible
@@ -0,0 +1,82 @@
+# webview_pool.py
+
+import logging
+from aqt import mw, gui_hooks
+from aqt.qt import *
+
+# Webviews prontos para reuso. Criar um QWebEngineView custa centenas de ms e dezenas de MB,
+# então os diálogos pegam um emprestado daqui e devolvem ao fechar.
+MAX_WEBVIEWS_LIVRES = 2
+
+_profile = None
+_livres = []
+_emprestados = set()
+
+def shared_profile():
+    """Perfil único (sem gravação em disco) com as configurações usadas por todos os previews."""
+    global _profile
+    if _profile is None:
+        _profile = QWebEngineProfile(mw)
+        settings = _profile.settings()
+        for attr in [QWebEngineSettings.WebAttribute.LocalContentCanAccessFileUrls,
+                     QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls,
+                     QWebEngineSettings.WebAttribute.AllowRunningInsecureContent]:
+            settings.setAttribute(attr, True)
+        settings.setAttribute(QWebEngineSettings.WebAttribute.PlaybackRequiresUserGesture, False)
+        # O perfil é filho da janela principal; os webviews (sem pai) precisam ir antes dele
+        gui_hooks.profile_will_close.append(_teardown)
+    return _profile
+
+def _create_webview():
+    from aqt.webview import QWebEngineView
+    view = QWebEngineView()
+    view.setPage(QWebEnginePage(shared_profile(), view))
+    # Carrega uma página vazia para já subir o processo de renderização
+    view.setHtml("")
+    return view
+
+def borrow_webview():
+    """Entrega um webview configurado, reaproveitando um livre quando houver."""
+    if _livres:
+        logging.debug("Webview reaproveitado do pool")
+        view = _livres.pop()
+    else:
+        logging.debug("Criando webview para o pool")
+        view = _create_webview()
+    _emprestados.add(view)
+    return view
+
+def return_webview(view):
+    """Devolve um webview ao pool; o excedente é destruído."""
+    if view is None:
+        return
+    _emprestados.discard(view)
+    view.setParent(None)
+    view.hide()
+    if _profile is None or len(_livres) >= MAX_WEBVIEWS_LIVRES:
+        view.deleteLater()
+        return
+    view.setZoomFactor(1.0)
+    view.setHtml("")
+    _livres.append(view)
+
+def prewarm():
+    """Deixa um webview pronto no pool (chamado em tempo ocioso)."""
+    if not _livres:
+        _livres.append(_create_webview())
+
+def _teardown():
+    """Desmonta o pool ao fechar o perfil do Anki: janelas e webviews primeiro, o perfil por último."""
+    global _profile
+    gui_hooks.profile_will_close.remove(_teardown)
+    # Janelas abertas com um webview emprestado o devolvem ao fechar
+    for view in list(_emprestados):
+        view.window().close()
+    for view in _livres + list(_emprestados):
+        view.deleteLater()
+    _livres.clear()
+    _emprestados.clear()
+    if _profile is not None:
+        # deleteLater segue a ordem de chegada: o perfil é destruído depois das páginas
+        _profile.deleteLater()
+        _profile = None